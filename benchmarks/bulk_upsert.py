@@ -0,0 +1,59 @@
+import argparse
+
+from benchmarks.common import add_backend_argument, benchmark_storage, fill_results, report, synthetic_results, timed
+
+
+def counted_upsert(database, records_list):
+    # The method append_records replaced: whole-table counts around every write tell inserts from updates.
+    table_name = database.my_results_table_name
+    records_count_before = database.records_count(table_name)
+    database.append_records(records_list, table_name, batch_size=len(records_list))
+    records_appended_count = database.records_count(table_name) - records_count_before
+    return records_appended_count, len(records_list) - records_appended_count
+
+
+def batched_upsert(database, records_list):
+    return database.append_records(records_list, database.my_results_table_name)
+
+
+def loaded_upsert(database, records_list):
+    return database.load_records(records_list, database.my_results_table_name)
+
+
+def run_method(database, label, upsert, table_size, batches_count, batch_size, first_new_result_number):
+    # Every batch updates half of its records, which are already stored, and inserts the other half.
+    updated_count = batch_size // 2
+    elapsed_in_seconds = 0
+    for batch_number in range(batches_count):
+        first_updated_number = (batch_number * updated_count) % max(table_size - updated_count, 1)
+        records_list = synthetic_results(updated_count, first_updated_number, application_link_suffix=f"?{label}") + \
+                       synthetic_results(batch_size - updated_count, first_new_result_number + batch_number * batch_size)
+        elapsed_in_seconds += timed(upsert, database, records_list)[1]
+    report(label, batches_count * batch_size, elapsed_in_seconds)
+
+
+def run(backends, table_size, batches_count, batch_size):
+    for backend in backends:
+        with benchmark_storage(backend) as database:
+            print(f"{backend}: filling results with {table_size} rows...")
+            fill_results(database, table_size)
+            methods = [("COUNT(*) bracketed upsert", counted_upsert), ("batched upsert", batched_upsert)]
+            if hasattr(database, "load_records"):
+                methods.append(("LOAD DATA upsert", loaded_upsert))
+            first_new_result_number = table_size
+            for label, upsert in methods:
+                run_method(database, f"{backend} {label}", upsert, table_size, batches_count, batch_size,
+                           first_new_result_number)
+                first_new_result_number += batches_count * batch_size
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="benchmarks.bulk_upsert",
+                                     description="compare upserting results with whole-table counts, in batches "
+                                                 "and, on MySQL, through LOAD DATA")
+    add_backend_argument(parser)
+    parser.add_argument("--table-size", type=int, default=200000, help="results stored before measuring")
+    parser.add_argument("--batches", type=int, default=20, help="upserts measured per method")
+    parser.add_argument("--batch-size", type=int, default=50, help="records per upsert, results_batch_size by default")
+    arguments = parser.parse_args()
+    run(arguments.backends or ["sqlite"], arguments.table_size, arguments.batches, arguments.batch_size)
@@ -0,0 +1,86 @@
+import os, tempfile, time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from scrapper.enums.tasks import TaskKeys
+from scrapper.enums.results import ResultKeys
+from scrapper.storage.factory import storage_backends, storage_by_settings
+from scrapper.utils.settings import Settings
+
+title_words = ["Senior", "Junior", "Lead", "Principal", "Staff", "Python", "Java", "Go", "Rust", "C++", "Data",
+               "Backend", "Frontend", "Full", "Stack", "Cloud", "Platform", "Site", "Reliability", "Machine",
+               "Learning", "Security", "Mobile", "Embedded", "Test", "Automation", "Analytics", "Developer",
+               "Engineer", "Architect", "Scientist", "Analyst", "Manager", "Consultant", "Specialist", "Remote"]
+
+
+def add_backend_argument(parser):
+    parser.add_argument("--backend", dest="backends", choices=storage_backends, action="append",
+                        help="storage backend to measure, can be repeated, sqlite by default")
+
+
+@contextmanager
+def benchmark_storage(backend):
+    # Benchmarks never touch scraped data: SQLite runs on a temporary file and MySQL on a separate database.
+    if backend == "sqlite":
+        with tempfile.TemporaryDirectory() as database_directory:
+            database = storage_by_settings({"backend": backend,
+                                            "database_name": "benchmark",
+                                            "sqlite_path": os.path.join(database_directory, "benchmark.sqlite3")})
+            try:
+                yield database
+            finally:
+                database.close_thread_connection()
+        return
+
+    config_dict = dict(Settings.database())
+    config_dict["backend"] = backend
+    config_dict["database_name"] = f"{config_dict['database_name']}_benchmark"
+    database = storage_by_settings(config_dict)
+    database.recreate_tables()
+    yield database
+
+
+def synthetic_job_title(result_number):
+    # Titles are built from the result number alone, so the same number always gives the same result.
+    words_count = len(title_words)
+    return f"{title_words[result_number % words_count]} {title_words[(result_number * 7) % words_count]} " \
+           f"{title_words[(result_number * 13 + 5) % words_count]} {result_number}"
+
+
+def synthetic_results(results_count, first_result_number=0, task_number=1, application_link_suffix=""):
+    scrapped_datetime = datetime.now()
+    return [{
+        ResultKeys.job_title.name: synthetic_job_title(result_number),
+        ResultKeys.application_link.name: f"https://www.glassdoor.com/job-listing/{result_number}{application_link_suffix}",
+        ResultKeys.company_name.name: f"Company {result_number % 1000}",
+        ResultKeys.task_number.name: task_number,
+        ResultKeys.scrapped_datetime.name: scrapped_datetime,
+        } for result_number in range(first_result_number, first_result_number + results_count)]
+
+
+def synthetic_tasks(tasks_count, first_task_number=0, due_in_minutes=-1):
+    scrapping_datetime = datetime.now() + timedelta(minutes=due_in_minutes)
+    return [{
+        TaskKeys.site_name.name: "glassdoor",
+        TaskKeys.search_keywords.name: f"keywords {task_number}",
+        TaskKeys.scrapping_link.name: f"https://www.glassdoor.com/Job/jobs.htm?task={task_number}",
+        TaskKeys.scrapping_period_in_hours.name: 24,
+        TaskKeys.scrapping_datetime.name: scrapping_datetime,
+        } for task_number in range(first_task_number, first_task_number + tasks_count)]
+
+
+def fill_results(database, results_count, batch_size=50000):
+    for first_result_number in range(0, results_count, batch_size):
+        database.append_results(synthetic_results(min(batch_size, results_count - first_result_number), first_result_number))
+
+
+def timed(function, *args, **kwargs):
+    started_at = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - started_at
+
+
+def report(label, items_count, elapsed_in_seconds, unit="rows"):
+    elapsed_in_seconds = max(elapsed_in_seconds, 1e-9)
+    print(f"{label:<48} {items_count:>10} {unit} in {elapsed_in_seconds:9.3f} s " \
+          f"{items_count / elapsed_in_seconds:>12.0f} {unit}/s")
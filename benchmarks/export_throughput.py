@@ -0,0 +1,60 @@
+import argparse, os, tempfile, tracemalloc
+
+from scrapper.enums.results import ResultKeys
+from scrapper.export import export_formats, export_results
+from benchmarks.common import add_backend_argument, benchmark_storage, report, synthetic_results, synthetic_tasks, timed
+
+
+def fill_task_results(database, first_result_number, results_count, tasks_count, batch_size=50000):
+    for batch_start in range(first_result_number, first_result_number + results_count, batch_size):
+        batch_count = min(batch_size, first_result_number + results_count - batch_start)
+        results_list = synthetic_results(batch_count, batch_start)
+        for result_number, result in enumerate(results_list, start=batch_start):
+            result[ResultKeys.task_number.name] = result_number % tasks_count + 1
+        database.append_results(results_list)
+
+
+def export(database, output_path, export_format, batch_size):
+    return export_results(database.read_results_for_export(batch_size=batch_size), output_path, export_format)
+
+
+def peak_memory_in_bytes(function, *args):
+    tracemalloc.start()
+    try:
+        function(*args)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run(backends, results_counts, tasks_count, batch_size, formats):
+    for backend in backends:
+        with benchmark_storage(backend) as database, tempfile.TemporaryDirectory() as output_directory:
+            database.append_tasks(synthetic_tasks(tasks_count))
+            stored_results_count = 0
+            # Peak memory is measured at every table size, so it shows whether it stays flat as the table grows.
+            for results_count in sorted(results_counts):
+                fill_task_results(database, stored_results_count, results_count - stored_results_count, tasks_count)
+                stored_results_count = results_count
+                for export_format in formats:
+                    output_path = os.path.join(output_directory, f"results.{export_format}")
+                    rows_count, elapsed_in_seconds = timed(export, database, output_path, export_format, batch_size)
+                    report(f"{backend} export {export_format}", rows_count, elapsed_in_seconds)
+                    peak_in_bytes = peak_memory_in_bytes(export, database, output_path, export_format, batch_size)
+                    print(f"{'':<48} peak memory {peak_in_bytes / 2 ** 20:.1f} MiB, " \
+                          f"file {os.path.getsize(output_path) / 2 ** 20:.1f} MiB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="benchmarks.export_throughput",
+                                     description="measure export throughput and peak memory at growing table sizes")
+    add_backend_argument(parser)
+    parser.add_argument("--results", dest="results_counts", type=int, action="append",
+                        help="table size to export at, can be repeated, 20000 and 100000 by default")
+    parser.add_argument("--tasks", type=int, default=100, help="tasks the results are spread over")
+    parser.add_argument("--batch-size", type=int, default=10000, help="results read per batch")
+    parser.add_argument("--format", dest="formats", choices=export_formats, action="append",
+                        help="export format, can be repeated, all formats by default")
+    arguments = parser.parse_args()
+    run(arguments.backends or ["sqlite"], arguments.results_counts or [20000, 100000], arguments.tasks,
+        arguments.batch_size, arguments.formats or export_formats)
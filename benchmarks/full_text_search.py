@@ -0,0 +1,70 @@
+import argparse
+
+from scrapper.enums.results import ResultKeys
+from scrapper.storage.storage import searched_result_keys
+from benchmarks.common import add_backend_argument, benchmark_storage, fill_results, report, timed
+
+placeholders = {"mysql": "%s", "sqlite": "?"}
+
+
+def search_first_pages(database, query, limit, queries_count):
+    for query_number in range(queries_count):
+        database.search_results(query, limit)
+
+
+def search_pages(database, query, limit, pages_count):
+    # Walks the pages with keyset pagination and returns how long the first and the last page took.
+    elapsed_list = []
+    after = None
+    for page_number in range(pages_count):
+        search_results, elapsed_in_seconds = timed(database.search_results, query, limit, after)
+        elapsed_list.append(elapsed_in_seconds)
+        after = database.next_search_page(search_results)
+        if after is None:
+            break
+    return elapsed_list
+
+
+def scan_first_pages(database, placeholder, word, limit, queries_count):
+    # What searching costs without a full-text index: every row is read until a page of matches is found.
+    conditions = " OR ".join(f"{result_key.name} LIKE {placeholder}" for result_key in searched_result_keys)
+    sql_query = f"SELECT {ResultKeys.result_number.name} FROM {database.my_results_table_name} " \
+                f"WHERE {conditions} ORDER BY {ResultKeys.result_number.name} DESC LIMIT {placeholder};"
+    values = [f"%{word}%"] * len(searched_result_keys) + [limit]
+    for query_number in range(queries_count):
+        with database.cursor() as my_database_cursor:
+            my_database_cursor.execute(sql_query, values)
+            my_database_cursor.fetchall()
+
+
+def run(backends, results_count, queries, limit, queries_count, pages_count):
+    for backend in backends:
+        with benchmark_storage(backend) as database:
+            print(f"{backend}: filling results with {results_count} rows...")
+            fill_results(database, results_count)
+            for query in queries:
+                elapsed_in_seconds = timed(search_first_pages, database, query, limit, queries_count)[1]
+                report(f"{backend} search '{query}'", queries_count, elapsed_in_seconds, "queries")
+                elapsed_list = search_pages(database, query, limit, pages_count)
+                print(f"{'':<48} page 1 in {elapsed_list[0] * 1000:.1f} ms, " \
+                      f"page {len(elapsed_list)} in {elapsed_list[-1] * 1000:.1f} ms")
+                elapsed_in_seconds = timed(scan_first_pages, database, placeholders[backend], query.split()[0], limit,
+                                           queries_count)[1]
+                report(f"{backend} LIKE scan '{query.split()[0]}'", queries_count, elapsed_in_seconds, "queries")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="benchmarks.full_text_search",
+                                     description="measure full-text search and keyset pagination of results "
+                                                 "against a LIKE scan")
+    add_backend_argument(parser)
+    parser.add_argument("--results", type=int, default=100000, help="results stored before searching")
+    parser.add_argument("--query", dest="queries", action="append",
+                        help="searched words, can be repeated, a common, a rare and a multi-word query by default")
+    parser.add_argument("--limit", type=int, default=20, help="results per page")
+    parser.add_argument("--queries", dest="queries_count", type=int, default=20, help="first-page searches measured")
+    parser.add_argument("--pages", type=int, default=50, help="pages walked with keyset pagination")
+    arguments = parser.parse_args()
+    run(arguments.backends or ["sqlite"], arguments.results,
+        arguments.queries or ["Python", "Reliability Architect", "12345"], arguments.limit, arguments.queries_count,
+        arguments.pages)
@@ -0,0 +1,68 @@
+import argparse, random, re
+
+from scrapper.enums.results import ResultKeys
+from scrapper.utils.keyword_matcher import KeywordMatcher
+from benchmarks.common import report, synthetic_results, timed, title_words
+
+
+def legacy_are_keywords_in_result(result, keywords):
+    # The matching Results did before KeywordMatcher: one pattern per keyword, field and result.
+    for keyword in keywords:
+        for result_key in ResultKeys:
+            try:
+                if re.search(r"\b{}\b".format(keyword), result[result_key.name]) is not None:
+                    return True
+            except KeyError:
+                continue
+            except TypeError:
+                continue
+    return False
+
+
+def matcher_are_keywords_in_result(result, keyword_matcher):
+    return keyword_matcher.matches_any(result.get(result_key.name) for result_key in ResultKeys)
+
+
+def synthetic_keywords(keywords_count, seed):
+    # Keywords stay plain words, since the legacy matching does not escape them, and none of them
+    # is a bare title word, so results only match where a keyword is put in on purpose.
+    random_generator = random.Random(seed)
+    vocabulary = [f"{title_word}{suffix}" for title_word in title_words if title_word.isalnum()
+                  for suffix in ["s", "ing", "er", "ist", "ware", "ops", "net", "ix", "ly"]]
+    return random_generator.sample(vocabulary, min(keywords_count, len(vocabulary)))
+
+
+def run(keywords_count, results_count, matching_share, seed):
+    keywords = synthetic_keywords(keywords_count, seed)
+    results_list = synthetic_results(results_count)
+    random_generator = random.Random(seed)
+    for result in results_list:
+        result[ResultKeys.company_size.name] = None
+        if random_generator.random() < matching_share:
+            result[ResultKeys.job_title.name] += f" {random_generator.choice(keywords)}"
+
+    legacy_decisions, elapsed_in_seconds = timed(lambda: [legacy_are_keywords_in_result(result, keywords)
+                                                          for result in results_list])
+    report(f"legacy re.search per keyword, {len(keywords)} keywords", results_count, elapsed_in_seconds, "results")
+
+    keyword_matcher, compile_in_seconds = timed(KeywordMatcher, keywords)
+    matcher_decisions, elapsed_in_seconds = timed(lambda: [matcher_are_keywords_in_result(result, keyword_matcher)
+                                                           for result in results_list])
+    report(f"KeywordMatcher, {len(keywords)} keywords", results_count, compile_in_seconds + elapsed_in_seconds, "results")
+
+    matched_count = sum(matcher_decisions)
+    print(f"{matched_count} of {results_count} results matched, " \
+          f"decisions are {'identical' if legacy_decisions == matcher_decisions else 'DIFFERENT'}.")
+    return legacy_decisions == matcher_decisions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="benchmarks.keyword_matching",
+                                     description="compare keyword filtering of results with and without KeywordMatcher")
+    parser.add_argument("--keywords", type=int, default=300, help="keywords to filter by")
+    parser.add_argument("--results", type=int, default=3000, help="results filtered")
+    parser.add_argument("--matching-share", type=float, default=0.1, help="share of results holding a keyword")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the keyword sample")
+    arguments = parser.parse_args()
+    if not run(arguments.keywords, arguments.results, arguments.matching_share, arguments.seed):
+        raise SystemExit(1)
@@ -0,0 +1,55 @@
+import argparse
+
+from scrapper.enums.tasks import TaskKeys
+from benchmarks.common import add_backend_argument, benchmark_storage, report, synthetic_results, synthetic_tasks, timed
+
+
+def insert_results(database, results_count, batch_size):
+    for first_result_number in range(0, results_count, batch_size):
+        database.append_results(synthetic_results(min(batch_size, results_count - first_result_number), first_result_number))
+
+
+def query_due_tasks(database, queries_count):
+    for query_number in range(queries_count):
+        database.due_tasks()
+
+
+def query_next_due_datetime(database, queries_count):
+    for query_number in range(queries_count):
+        database.next_due_datetime()
+
+
+def claim_and_release_tasks(database, claims_count, tasks_per_claim):
+    for claim_number in range(claims_count):
+        for task_dict in database.claim_due_tasks("benchmark", tasks_per_claim, 600):
+            database.release_task_lease("benchmark", task_dict[TaskKeys.task_number.name])
+
+
+def run(backends, results_count, batch_size, tasks_count, queries_count):
+    for backend in backends:
+        with benchmark_storage(backend) as database:
+            elapsed_in_seconds = timed(database.append_tasks, synthetic_tasks(tasks_count // 2) +
+                                       synthetic_tasks(tasks_count - tasks_count // 2, tasks_count // 2, due_in_minutes=60))[1]
+            report(f"{backend} insert tasks", tasks_count, elapsed_in_seconds)
+            elapsed_in_seconds = timed(insert_results, database, results_count, batch_size)[1]
+            report(f"{backend} insert results in batches of {batch_size}", results_count, elapsed_in_seconds)
+
+            # Half of the tasks are due, like a table where most tasks wait for their next period.
+            elapsed_in_seconds = timed(query_due_tasks, database, queries_count)[1]
+            report(f"{backend} due tasks", queries_count, elapsed_in_seconds, "queries")
+            elapsed_in_seconds = timed(query_next_due_datetime, database, queries_count)[1]
+            report(f"{backend} next due time", queries_count, elapsed_in_seconds, "queries")
+            elapsed_in_seconds = timed(claim_and_release_tasks, database, queries_count, 4)[1]
+            report(f"{backend} claim and release 4 tasks", queries_count, elapsed_in_seconds, "claims")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="benchmarks.storage_backends",
+                                     description="compare storage backends on insert and due-task query throughput")
+    add_backend_argument(parser)
+    parser.add_argument("--results", type=int, default=50000, help="results inserted")
+    parser.add_argument("--batch-size", type=int, default=50, help="results per insert, results_batch_size by default")
+    parser.add_argument("--tasks", type=int, default=2000, help="tasks inserted, half of them due")
+    parser.add_argument("--queries", type=int, default=200, help="due-task queries and claims measured")
+    arguments = parser.parse_args()
+    run(arguments.backends or ["sqlite"], arguments.results, arguments.batch_size, arguments.tasks, arguments.queries)
@@ -1,4 +1,31 @@
-from scrapper import app
+import argparse
+
+from scrapper import app, daemon, export
 
 if __name__ == "__main__":
-    app.run()
\ No newline at end of file
+    parser = argparse.ArgumentParser(prog="scrapper")
+    parser.add_argument("--daemon", action="store_true",
+                        help="keep running and scrape tasks as they become due")
+    subparsers = parser.add_subparsers(dest="command")
+    export_parser = subparsers.add_parser("export", help="write stored results to a file")
+    export_parser.add_argument("output_path",
+                               help="file to write, '-' for standard output")
+    export_parser.add_argument("--format", dest="export_format", choices=export.export_formats,
+                               help="output format, by default taken from file extension")
+    export_parser.add_argument("--since", type=export.parse_date,
+                               help="export results scrapped at or after this ISO date")
+    export_parser.add_argument("--until", type=export.parse_date,
+                               help="export results scrapped before this ISO date")
+    export_parser.add_argument("--task", dest="task_numbers", type=int, action="append",
+                               help="export results of this task number, can be repeated")
+    export_parser.add_argument("--batch-size", type=int, default=100000,
+                               help="results read per batch and written per Parquet row group")
+    arguments = parser.parse_args()
+
+    if arguments.command == "export":
+        export.run(arguments.output_path, arguments.export_format, arguments.since, arguments.until,
+                   arguments.task_numbers, arguments.batch_size)
+    elif arguments.daemon:
+        daemon.run()
+    else:
+        app.run()
@@ -1,21 +1,29 @@
 import logging
 
-from scrapper.storage.database import Database
+from scrapper.storage.factory import storage_by_settings
+from scrapper.utils.webbrowser import WebBrowser
 from scrapper.utils.webbrowser_singleton import get_web_browser_instance
 from scrapper.utils.mail import Mail
-from scrapper.utils.task import Task
-from scrapper.utils.results import Results
+from scrapper.utils.workers import Worker, WorkerPool
+from scrapper.utils.known_results import KnownResults
+from scrapper.utils.near_duplicates import NearDuplicates
 from scrapper.utils.settings import Settings
 from scrapper.utils.resources import Resources
 from scrapper.utils.proxies import Proxies
+from scrapper.utils.proxy_validator import ProxyValidator
+from scrapper.utils.forward_proxy import ForwardProxy
+from scrapper.utils.scheduler import Scheduler
+from scrapper.utils.leases import LeaseKeeper
 from scrapper.utils.processes import ensure_web_browser_is_not_running, is_another_scrapper_instance_present
 
 logger = logging.getLogger(__name__)
 
 def run():
-    if is_another_scrapper_instance_present():
-        return
-    ensure_web_browser_is_not_running()
+    # Leasing lets several instances share one task table, so only unleased runs stay single-instance.
+    if not Settings.task_leasing():
+        if is_another_scrapper_instance_present():
+            return
+        ensure_web_browser_is_not_running()
 
     try:
         run_unguarded()
@@ -29,50 +37,155 @@ def run_unguarded():
     my_settings = Settings()
     my_settings.setup_logging()
 
-    my_database = Database(Settings.database())
+    my_database = storage_by_settings(Settings.database())
 
     my_mail = None
     if my_settings.notify_by_mail():
         my_mail = Mail(Settings.smtp())
 
     if my_settings.tasks_from_yaml():
-        my_task_list = Resources.read_tasks()
-        my_database.append_tasks(my_task_list)
-
-    my_web_browser = get_web_browser_instance(my_settings.headless_web_browser())
-
-    my_proxies = None
-    if my_settings.use_proxy():
-        my_proxies = Proxies(my_web_browser)
-        if my_settings.download_proxy_list():
-            my_proxies.download_new_proxies(my_settings.proxy()["address"])
-        if my_settings.prune_invalid_proxies():
-            my_proxies.prune_invalid_proxies()
-
-    my_task_list = my_database.due_tasks()
-    for my_task_dict in my_task_list:
-        my_task_object = Task(task_dict=my_task_dict,
-                              database=my_database,
-                              web_browser=my_web_browser,
-                              mail=my_mail,
-                              proxies=my_proxies,
-                              settings=my_settings)
-
-        try:
-            my_task_object.run()
-        except Exception:
-            raise
-
-        my_results_object = Results(results=my_task_object.results(),
-                              database=my_database,
-                              mail=my_mail,
-                              settings=my_settings)
-
-        my_results_object.exclude_by_keywords(my_task_object.keywords_list())
-        my_results_object.check_count(my_task_object.minimal_results_count())
-        my_results_object.save()
-        my_task_object.set_new_due_time()
+        append_tasks_from_yaml(my_database)
+
+    my_web_browser = get_web_browser_instance(my_settings.headless_web_browser(),
+                                              my_settings.lean_web_browser(),
+                                              my_settings.log_web_page_statistics())
+
+    my_proxies = prepare_proxies(my_settings, my_web_browser, my_database)
+
+    my_lease_keeper = prepare_lease_keeper(my_settings, my_database)
+    if my_lease_keeper:
+        my_task_list = my_lease_keeper.claim(my_settings.workers())
+    else:
+        my_task_list = my_database.due_tasks()
+    my_known_results = KnownResults(my_database)
+    my_near_duplicates = prepare_near_duplicates(my_settings, my_database)
+
+    my_workers, my_forward_proxies = prepare_workers(min(my_settings.workers(), len(my_task_list)),
+                                                     my_settings, my_web_browser, my_database,
+                                                     my_mail, my_proxies, my_known_results, my_near_duplicates,
+                                                     my_lease_keeper)
+
+    try:
+        if my_lease_keeper:
+            run_leased_tasks(my_workers, my_lease_keeper, my_task_list)
+        else:
+            WorkerPool(my_workers).run_tasks(my_task_list)
+    finally:
+        for my_forward_proxy in my_forward_proxies:
+            my_forward_proxy.stop()
+        if my_lease_keeper:
+            my_lease_keeper.stop()
+
     if my_proxies:
         my_proxies.save()
     if my_database:
-        del my_database
\ No newline at end of file
+        del my_database
+
+def append_tasks_from_yaml(database):
+    my_task_list = Resources.read_tasks()
+    if my_task_list:
+        database.append_tasks(my_task_list)
+
+def prepare_proxies(settings, web_browser, database):
+    if not settings.use_proxy():
+        return None
+
+    my_proxy_settings = settings.proxy()
+    my_proxy_validator = ProxyValidator(validation_url=my_proxy_settings["validation_url"],
+                                        workers_count=my_proxy_settings["validation_workers"],
+                                        connect_timeout_in_seconds=my_proxy_settings["validation_connect_timeout_in_seconds"],
+                                        read_timeout_in_seconds=my_proxy_settings["validation_read_timeout_in_seconds"],
+                                        validation_text=my_proxy_settings["validation_text"])
+    my_proxies = Proxies(web_browser, database,
+                         validator=my_proxy_validator,
+                         validation_ttl_in_hours=my_proxy_settings["validation_ttl_in_hours"])
+    if settings.download_proxy_list():
+        my_proxies.download_new_proxies(my_proxy_settings["address"])
+    if settings.prune_invalid_proxies():
+        my_proxies.prune_invalid_proxies()
+    return my_proxies
+
+def run_leased_tasks(workers, lease_keeper, task_list):
+    # Claim, run and release batches until no due task is left unleased, so nodes share the work.
+    try:
+        while task_list:
+            WorkerPool(workers).run_tasks(task_list)
+            task_list = lease_keeper.claim(len(workers))
+    finally:
+        lease_keeper.abandon_all()
+
+def prepare_lease_keeper(settings, database):
+    my_task_leasing_settings = settings.task_leasing()
+    if not my_task_leasing_settings:
+        return None
+    my_lease_keeper = LeaseKeeper(database,
+                                  lease_in_seconds=my_task_leasing_settings["lease_in_seconds"],
+                                  renew_interval_in_seconds=my_task_leasing_settings["renew_interval_in_seconds"])
+    my_lease_keeper.start()
+    return my_lease_keeper
+
+def prepare_near_duplicates(settings, database):
+    my_near_duplicates_settings = settings.near_duplicates()
+    if not my_near_duplicates_settings:
+        return None
+    return NearDuplicates(database,
+                          similarity_threshold=my_near_duplicates_settings["similarity_threshold"],
+                          bands=my_near_duplicates_settings["bands"],
+                          rows=my_near_duplicates_settings["rows"])
+
+def prepare_workers(workers_count, settings, web_browser, database, mail, proxies, known_results, near_duplicates=None, lease_keeper=None):
+    my_forward_proxy_settings = None
+    if settings.use_proxy():
+        my_forward_proxy_settings = settings.forward_proxy()
+    my_blocked_domains = None
+    my_lean_web_browser_settings = settings.lean_web_browser()
+    if my_lean_web_browser_settings:
+        my_blocked_domains = my_lean_web_browser_settings.get("blocked_domains")
+
+    my_scheduler = None
+    my_scheduler_settings = settings.scheduler()
+    if my_scheduler_settings:
+        my_scheduler = Scheduler(site_rate_per_minute=my_scheduler_settings["site_rate_per_minute"],
+                                 proxy_rate_per_minute=my_scheduler_settings["proxy_rate_per_minute"],
+                                 burst=my_scheduler_settings["burst"],
+                                 min_rate_per_minute=my_scheduler_settings["min_rate_per_minute"],
+                                 max_rate_per_minute=my_scheduler_settings["max_rate_per_minute"],
+                                 rate_increase_per_minute=my_scheduler_settings["rate_increase_per_minute"],
+                                 rate_decrease_factor=my_scheduler_settings["rate_decrease_factor"],
+                                 target_captcha_rate=my_scheduler_settings["target_captcha_rate"],
+                                 window_size=my_scheduler_settings["window_size"],
+                                 sites=my_scheduler_settings["sites"])
+
+    my_workers = []
+    my_forward_proxies = []
+    for worker_number in range(workers_count):
+        if worker_number == 0:
+            worker_web_browser = web_browser
+        else:
+            worker_web_browser = WebBrowser(settings.headless_web_browser(),
+                                            settings.lean_web_browser(),
+                                            settings.log_web_page_statistics())
+        worker_web_browser.scheduler = my_scheduler
+        worker_forward_proxy = None
+        if my_forward_proxy_settings:
+            worker_forward_proxy = ForwardProxy(proxies,
+                                                pooled_connections_count=my_forward_proxy_settings["pooled_connections_count"],
+                                                connect_timeout_in_seconds=my_forward_proxy_settings["connect_timeout_in_seconds"],
+                                                max_upstream_switches=my_forward_proxy_settings["max_upstream_switches"],
+                                                idle_connection_ttl_in_seconds=my_forward_proxy_settings["idle_connection_ttl_in_seconds"],
+                                                blocked_domains=my_blocked_domains)
+            worker_forward_proxy.start()
+            worker_web_browser.set_proxy(worker_forward_proxy.address)
+            worker_web_browser.forward_proxy = worker_forward_proxy
+            my_forward_proxies.append(worker_forward_proxy)
+        my_workers.append(Worker(worker_number=worker_number,
+                                 web_browser=worker_web_browser,
+                                 database=database,
+                                 mail=mail,
+                                 proxies=proxies,
+                                 settings=settings,
+                                 known_results=known_results,
+                                 forward_proxy=worker_forward_proxy,
+                                 near_duplicates=near_duplicates,
+                                 lease_keeper=lease_keeper))
+    return my_workers, my_forward_proxies
@@ -1,28 +1,40 @@
 import logging
 from scrapper.crawler.glassdoor import Glassdoor
+from scrapper.crawler.glassdoor_http import GlassdoorHttp
+from scrapper.enums.crawlers import CrawlerEngines
 
 logger = logging.getLogger(__name__)
 
-crawler_objects = {}
-
 crawler_constructors = {
-        "www.glassdoor.com": Glassdoor
+        "www.glassdoor.com": {
+            CrawlerEngines.browser.name: Glassdoor,
+            CrawlerEngines.http.name: GlassdoorHttp,
+            }
         }
 
-def crawler_by_scrapping_link(web_browser, scrapping_link):
-    global crawler_objects
-    global crawler_constructors
+class CrawlerFactory():
+    def __init__(self, web_browser, settings):
+        self.__web_browser = web_browser
+        self.__settings = settings
+        self.__crawler_objects = {}
+
+    def crawler_by_scrapping_link(self, scrapping_link, crawler_engine=CrawlerEngines.browser.name):
+        is_crawler_id_found = False
+        for crawler_id, engine_constructors in crawler_constructors.items():
+            if crawler_id in scrapping_link:
+                is_crawler_id_found = True
+                break
+
+        if not is_crawler_id_found:
+            raise ValueError(f"{scrapping_link} is not supported by available crawlers.")
 
-    is_crawler_id_found = False
-    for crawler_id, crawler_constructor  in crawler_constructors.items():
-        if crawler_id in scrapping_link:
-            if crawler_id not in crawler_objects:
-                crawler_objects[crawler_id] = crawler_constructor(web_browser)
-                logger.debug(f"Selected crawler by id '{crawler_id}'")
-            is_crawler_id_found = True
-            break
+        if crawler_engine not in engine_constructors:
+            logger.warning(f"Crawler by id '{crawler_id}' has no '{crawler_engine}' engine, so using '{CrawlerEngines.browser.name}'.")
+            crawler_engine = CrawlerEngines.browser.name
 
-    if not is_crawler_id_found:
-        raise ValueError(f"{scrapping_link} is not supported by available crawlers.")
+        crawler_key = (crawler_id, crawler_engine)
+        if crawler_key not in self.__crawler_objects:
+            self.__crawler_objects[crawler_key] = engine_constructors[crawler_engine](self.__web_browser, self.__settings)
+            logger.debug(f"Selected crawler by id '{crawler_id}' with '{crawler_engine}' engine")
 
-    return crawler_objects[crawler_id]
\ No newline at end of file
+        return self.__crawler_objects[crawler_key]
@@ -2,19 +2,24 @@ import time, re, os, logging
 from collections import OrderedDict
 
 from selenium.webdriver.common.keys import Keys
-from selenium.common.exceptions import NoSuchElementException, ElementClickInterceptedException, TimeoutException
+from selenium.common.exceptions import NoSuchElementException, ElementClickInterceptedException, TimeoutException, JavascriptException
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as ec
 from selenium.webdriver.common.by import By
 
 from scrapper.utils.resources import Resources
+from scrapper.utils.sessions import Sessions
 from scrapper.enums.results import ResultKeys
 from scrapper.enums.tasks import TaskKeys
+from scrapper.enums.companies import CompanyKeys
 
 from scrapper.exceptions.exceptions import CaptchaEncountered
 
 logger = logging.getLogger(__name__)
 
+page_numbering_pattern = re.compile(r"\D*(?P<page_number>\d+)\D*(?P<pages_count>\d+)\D*")
+page_link_pattern = re.compile(r"IP(?P<page_number>\d+)\.htm")
+
 
 def get_text_excluding_children(driver, element):
     return driver.execute_script(""" return jQuery(arguments[0]).contents().filter(function() {
@@ -22,25 +27,102 @@ def get_text_excluding_children(driver, element):
     """, element)
 
 
+offer_cards_script = """
+var cards = document.querySelectorAll(".jlGrid>.jl");
+return Array.prototype.map.call(cards, function(card) {
+    var jobTitle = card.querySelector("div[class=jobContainer]>a[class~=jobLink]");
+    var companyName = card.querySelector(".jobEmpolyerName");
+    return {
+        offer_entry: card,
+        job_title: jobTitle ? jobTitle.innerText : null,
+        company_name: companyName ? companyName.innerText : null
+    };
+});
+"""
+
+offer_details_script = """
+var callback = arguments[arguments.length - 1];
+var timeoutInMilliseconds = arguments[0];
+var isCompanyTabSkipped = arguments[1];
+
+function elementByXPath(xpath) {
+    return document.evaluate(xpath, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+}
+
+function applicationLink() {
+    var applyLink = document.querySelector("div[class~=applyCTA]>a");
+    if (applyLink) {
+        return applyLink.href;
+    }
+    var applyButton = document.querySelector("div[class~=applyCTA]>button");
+    return applyButton ? applyButton.getAttribute("data-job-url") : null;
+}
+
+var details = {application_link: applicationLink(), company_size: null, company_website: null};
+var companyTab = elementByXPath("//div[@data-tab-type]/span[text()='Company']");
+if (isCompanyTabSkipped || !companyTab) {
+    callback(details);
+    return;
+}
+
+companyTab.click();
+var startedAt = Date.now();
+(function waitForCompanyTab() {
+    var companySize = elementByXPath("//label[text()='Size']/../span");
+    if (!companySize && Date.now() - startedAt < timeoutInMilliseconds) {
+        setTimeout(waitForCompanyTab, 50);
+        return;
+    }
+    var companyWebsite = elementByXPath("//span[contains(@class,'website')]/a");
+    details.company_size = companySize ? companySize.innerText : null;
+    details.company_website = companyWebsite ? companyWebsite.href : null;
+    callback(details);
+})();
+"""
+
+
 class Glassdoor():
     web_browser = None
     web_driver = None
+    crawler_id = "glassdoor"
     web_page = "https://www.glassdoor.com"
+    company_tab_timeout_in_seconds = 3
+    skipped_results_count = 0
 
-    def __init__(self, web_browser):
+    def __init__(self, web_browser, settings):
         self.web_browser = web_browser
         self.web_driver = self.web_browser.web_driver
-
-    def run_task(self, task_dict):
+        self.scrape_by_script = settings.scrape_by_script()
+        self.prefetch_result_pages = settings.prefetch_result_pages()
+        self.sessions = Sessions(web_browser, settings.session_ttl_in_hours())
+        if self.scrape_by_script:
+            self.web_driver.set_script_timeout(self.company_tab_timeout_in_seconds + 5)
+
+    def run_task(self, task_dict, known_results=None, companies=None, starting_result_page_number=1, starting_offer_index=0):
+        self.skipped_results_count = 0
+        is_session_restored = False
         if not self.is_logged_in():
-            self.web_browser.load_web_page(self.web_page)
-            cookies_path = os.path.join(os.path.abspath(os.curdir), "scrapper", "resources", "cookies", "glassdoor.json")
-            cookies = Resources.read_cookies_from_json(cookies_path)
-            self.web_browser.add_cookies(cookies)
-            self.accept_cookies()
+            proxy_address = self.web_browser.upstream_proxy_address()
+            is_session_restored = self.sessions.restore(self.crawler_id, self.web_page, proxy_address)
+            if not is_session_restored:
+                self.log_in(proxy_address)
         self.web_browser.load_web_page(task_dict[TaskKeys.scrapping_link.name])
         self.check_captcha_presence()
-        return self.scrape_results()
+        if is_session_restored and not self.is_logged_in():
+            logger.info("Restored session is no longer logged in, so discarding it.")
+            self.sessions.discard(self.crawler_id, self.web_browser.upstream_proxy_address())
+        yield from self.scrape_results(task_dict, known_results, companies, starting_result_page_number, starting_offer_index)
+
+    def log_in(self, proxy_address):
+        self.web_browser.load_web_page(self.web_page)
+        cookies_path = os.path.join(os.path.abspath(os.curdir), "scrapper", "resources", "cookies", "glassdoor.json")
+        cookies = Resources.read_cookies_from_json(cookies_path)
+        self.web_browser.add_cookies(cookies)
+        self.accept_cookies()
+        if self.is_logged_in():
+            self.sessions.save(self.crawler_id, proxy_address)
+        else:
+            logger.warning("Not logged in after adding cookies, so session is not saved.")
 
     def accept_cookies(self):
         wait = WebDriverWait(self.web_driver, 5)
@@ -66,68 +148,156 @@ class Glassdoor():
         keyword_field.send_keys("Software Developer")
         search_button.click()
 
-    def scrape_results(self):
-        results = []
+    def scrape_results(self, task_dict, known_results=None, companies=None, starting_result_page_number=1, starting_offer_index=0):
+        try:
+            yield from self.__scrape_results(task_dict, known_results, companies, starting_result_page_number, starting_offer_index)
+        finally:
+            if self.prefetch_result_pages:
+                self.web_browser.close_background_tabs()
 
+    def __scrape_results(self, task_dict, known_results, companies, starting_result_page_number, starting_offer_index):
         result_pages_count = self.scrape_result_pages_count()
         if not result_pages_count:
             logger.info("No results found.")
-            return results
+            return
 
-        max_results_to_scrape = 10
-        max_result_pages_to_scrape = 2
-        starting_result_page_number = 1
+        max_results_to_scrape = task_dict[TaskKeys.max_results_count.name]
+        max_result_pages_to_scrape = task_dict[TaskKeys.max_result_pages_count.name]
+        scraped_results_count = 0
 
         max_consecutive_failed_results_to_break = 3
         consecutive_failed_results_count  = 0
 
         current_result_number = 0
         total_results_count = 0
+        prefetched_result_page_number = None
         current_result_page_number = starting_result_page_number - 1
         while current_result_page_number < result_pages_count:
             current_result_page_number += 1
             if current_result_page_number > max_result_pages_to_scrape:
                 break
 
+            if prefetched_result_page_number == current_result_page_number:
+                self.switch_to_prefetched_result_page()
+                self.check_captcha_presence()
             self.go_to_result_page_number(current_result_page_number)
             logger.debug(f"Scrapping result page {current_result_page_number}/{result_pages_count}...")
 
-            new_results = self.web_driver.find_elements_by_css_selector(".jlGrid>.jl")
+            next_result_page_number = current_result_page_number + 1
+            prefetched_result_page_number = None
+            if self.prefetch_result_pages and \
+               next_result_page_number <= min(result_pages_count, max_result_pages_to_scrape) and \
+               self.prefetch_result_page(next_result_page_number):
+                prefetched_result_page_number = next_result_page_number
+
+            new_results = self.scrape_offer_cards()
+            if current_result_page_number == starting_result_page_number:
+                new_results = new_results[starting_offer_index:]
             new_results_count = len(new_results)
             total_results_count += new_results_count
             logger.debug(f"Got {new_results_count} new offers.")
 
             is_enought_results_gathered = False
+            known_results_count = 0
             for new_result in new_results:
+                if known_results is not None and known_results.contains(*self.scrape_offer_card_key(new_result)):
+                    known_results_count += 1
+                    self.skipped_results_count += 1
+                    continue
+
                 current_result_number += 1
                 if current_result_number > max_results_to_scrape:
                     is_enought_results_gathered = True
                     break
 
                 logger.debug(f"Scrapping result {current_result_number}/{total_results_count}...")
+                commands_count_before = self.web_browser.commands_count
+                started_at = time.monotonic()
                 try:
-                    results.append(self.scrape_result(new_result))
+                    result = self.scrape_result(new_result, companies)
                 except Exception:
                     consecutive_failed_results_count += 1
                     if consecutive_failed_results_count > max_consecutive_failed_results_to_break:
                         logger.warning(f"Failed to scrape {max_consecutive_failed_results_to_break} results in a row, so breaking.")
-                        if len(results) > 0:
-                            return results
+                        if scraped_results_count > 0:
+                            return
                         raise
                     else:
                         logger.warning(f"Failed to scrape {current_result_number}/{total_results_count} but continuing.")
                         continue
                 consecutive_failed_results_count = 0
+                logger.debug(f"Scraped result {current_result_number}/{total_results_count} " \
+                             f"with {self.web_browser.commands_count - commands_count_before} web driver commands " \
+                             f"in {time.monotonic() - started_at:.2f} seconds.")
+                scraped_results_count += 1
+                yield result
 
             if is_enought_results_gathered:
                 break
 
-        return results
+            if new_results_count and known_results_count == new_results_count:
+                logger.info(f"All {new_results_count} offers on result page {current_result_page_number} are known, so stopping.")
+                break
 
-    def scrape_result(self, offer_entry):
-        result = {}
+    def scrape_offer_cards(self):
+        if self.scrape_by_script:
+            try:
+                return self.web_driver.execute_script(offer_cards_script)
+            except JavascriptException as e:
+                logger.warning("Cannot scrape offer cards by script, so falling back to elements. " \
+                               "The error is:\n" + e.msg)
+
+        offer_entries = self.web_driver.find_elements_by_css_selector(".jlGrid>.jl")
+        return [{"offer_entry": offer_entry} for offer_entry in offer_entries]
+
+    def scrape_offer_card_key(self, offer_card):
+        if not offer_card.get(ResultKeys.job_title.name):
+            offer_card[ResultKeys.job_title.name] = self.scrape_job_title(offer_card["offer_entry"])
+        if not offer_card.get(ResultKeys.company_name.name):
+            offer_card[ResultKeys.company_name.name] = self.scrape_company_name(offer_card["offer_entry"])
+        return offer_card[ResultKeys.job_title.name], offer_card[ResultKeys.company_name.name]
+
+    def scrape_result(self, offer_card, companies=None):
+        offer_entry = offer_card["offer_entry"]
+        company_dict = None
+        if companies is not None:
+            job_title, company_name = self.scrape_offer_card_key(offer_card)
+            company_dict = companies.company(company_name)
+            if company_dict:
+                logger.debug(f"Using cached details of company '{company_name}'.")
         self.ensure_offer_is_visible(offer_entry)
 
+        result = None
+        if self.scrape_by_script and offer_card.get(ResultKeys.job_title.name) and offer_card.get(ResultKeys.company_name.name):
+            try:
+                result = self.scrape_result_by_script(offer_card, company_dict is not None)
+            except (JavascriptException, TimeoutException) as e:
+                logger.warning("Cannot scrape result by script, so falling back to scrapping by field. " \
+                               "The error is:\n" + e.msg)
+
+        if result is None:
+            result = self.scrape_result_by_field(offer_entry, company_dict is not None)
+
+        if company_dict:
+            result[ResultKeys.company_size.name] = company_dict[CompanyKeys.company_size.name]
+            result[ResultKeys.company_website.name] = company_dict[CompanyKeys.company_website.name]
+        return result
+
+    def scrape_result_by_script(self, offer_card, is_company_tab_skipped=False):
+        offer_details = self.web_driver.execute_async_script(offer_details_script,
+                                                             self.company_tab_timeout_in_seconds * 1000,
+                                                             is_company_tab_skipped)
+        return {
+            ResultKeys.job_title.name: offer_card[ResultKeys.job_title.name],
+            ResultKeys.company_name.name: offer_card[ResultKeys.company_name.name],
+            ResultKeys.application_link.name: offer_details[ResultKeys.application_link.name],
+            ResultKeys.company_size.name: offer_details[ResultKeys.company_size.name],
+            ResultKeys.company_website.name: offer_details[ResultKeys.company_website.name],
+            }
+
+    def scrape_result_by_field(self, offer_entry, is_company_tab_skipped=False):
+        result = {}
+
         scrapping_functions = OrderedDict([
             (ResultKeys.job_title.name, self.scrape_job_title),
             (ResultKeys.company_name.name, self.scrape_company_name),
@@ -135,6 +305,9 @@ class Glassdoor():
             (ResultKeys.company_size.name, self.scrape_company_size),
             (ResultKeys.company_website.name, self.scrape_company_website)
             ])
+        if is_company_tab_skipped:
+            del scrapping_functions[ResultKeys.company_size.name]
+            del scrapping_functions[ResultKeys.company_website.name]
 
         max_try_again_attempts = 3
         try_again_attempt = 0
@@ -220,8 +393,7 @@ class Glassdoor():
         except NoSuchElementException:
             logger.error("Cannot find results page numbering.")
             return result
-        p = re.compile("\D*(?P<page_number>\d+)\D*(?P<pages_count>\d+)\D*")
-        m = p.search(page_numbering.text)
+        m = page_numbering_pattern.search(page_numbering.text)
         try:
             result["page_number"] = int(m.group('page_number'))
             result["pages_count"] = int(m.group('pages_count'))
@@ -233,13 +405,8 @@ class Glassdoor():
         current_page_number = self.scrape_current_result_page_number()
         while requested_page_number != current_page_number:
             logger.debug(f"We are on page {current_page_number} but we want to be on page {requested_page_number}.")
-            some_page_button = self.web_driver.find_element_by_css_selector("div.pagingControls li.page a")
-            some_page_link = some_page_button.get_attribute("href")
-            p = re.compile(".*IP(?P<page_number>\d+).htm.*")
-            m = p.search(some_page_link)
-            try:
-                requested_page_link = some_page_link.replace("IP{}.htm".format(m.group("page_number")), "IP{}.htm".format(requested_page_number))
-            except AttributeError:
+            requested_page_link = self.result_page_link(requested_page_number)
+            if not requested_page_link:
                 logger.debug(f"Absolute navigation failed, so try relative navigation.")
                 if current_page_number > requested_page_number:
                     self.switch_to_prev_results_page()
@@ -251,6 +418,30 @@ class Glassdoor():
             current_page_number = self.scrape_current_result_page_number()
 
 
+    def result_page_link(self, requested_page_number):
+        try:
+            some_page_button = self.web_driver.find_element_by_css_selector("div.pagingControls li.page a")
+        except NoSuchElementException:
+            return None
+        some_page_link = some_page_button.get_attribute("href")
+        if not some_page_link or not page_link_pattern.search(some_page_link):
+            return None
+        return page_link_pattern.sub(f"IP{requested_page_number}.htm", some_page_link)
+
+    def prefetch_result_page(self, requested_page_number):
+        requested_page_link = self.result_page_link(requested_page_number)
+        if not requested_page_link:
+            logger.debug(f"Cannot build link to result page {requested_page_number}, so not prefetching it.")
+            return False
+        logger.debug(f"Prefetching result page {requested_page_number} in background tab...")
+        self.web_browser.open_background_tab(requested_page_link)
+        return True
+
+    def switch_to_prefetched_result_page(self):
+        logger.debug("Switching to prefetched result page...")
+        self.web_browser.close_tab_by_number(0)
+        self.web_browser.wait_for_web_page_load()
+
     def switch_to_next_results_page(self):
         next_page_button = self.web_driver.find_element_by_css_selector("div.pagingControls li.next a")
         next_page_button.click()
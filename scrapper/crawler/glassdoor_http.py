@@ -0,0 +1,181 @@
+import os, logging
+from urllib.parse import urljoin
+
+import requests
+from requests.adapters import HTTPAdapter
+from lxml import html
+
+from scrapper.crawler.glassdoor import page_numbering_pattern, page_link_pattern
+from scrapper.utils.resources import Resources
+from scrapper.enums.results import ResultKeys
+from scrapper.enums.tasks import TaskKeys
+from scrapper.enums.companies import CompanyKeys
+
+from scrapper.exceptions.exceptions import CaptchaEncountered, IncompleteResults
+
+logger = logging.getLogger(__name__)
+
+
+def class_xpath(class_name):
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {class_name} ')"
+
+
+class GlassdoorHttp():
+    web_browser = None
+    web_page = "https://www.glassdoor.com"
+    user_agent = "Mozilla/5.0 (X11; Linux x86_64; rv:68.0) Gecko/20100101 Firefox/68.0"
+    request_timeout = (5, 20)
+    skipped_results_count = 0
+    result_page_number = 1
+    result_offer_index = 0
+
+    def __init__(self, web_browser, settings):
+        self.web_browser = web_browser
+        self.session = requests.Session()
+        self.session.headers["User-Agent"] = self.user_agent
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=4)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.add_cookies()
+
+    def add_cookies(self):
+        cookies_path = os.path.join(os.path.abspath(os.curdir), "scrapper", "resources", "cookies", "glassdoor.json")
+        cookies = Resources.read_cookies_from_json(cookies_path)
+        for cookie in cookies:
+            self.session.cookies.set(cookie["name"], cookie["value"], domain=".glassdoor.com", path=cookie["path"])
+        logger.debug(f"Added {len(cookies)} cookies.")
+
+    def run_task(self, task_dict, known_results=None, companies=None):
+        self.skipped_results_count = 0
+        self.result_page_number = 1
+        self.result_offer_index = 0
+        document = self.load_web_page(task_dict[TaskKeys.scrapping_link.name])
+        yield from self.scrape_results(task_dict, document, known_results, companies)
+
+    def load_web_page(self, web_page_url):
+        logger.info(f"Loading {web_page_url} over HTTP...")
+        proxies = None
+        if self.web_browser.proxy_address:
+            proxy = f"http://{self.web_browser.proxy_address}"
+            proxies = {"http": proxy, "https": proxy}
+        if self.web_browser.scheduler:
+            self.web_browser.scheduler.acquire(web_page_url, self.web_browser.upstream_proxy_address())
+
+        try:
+            response = self.session.get(web_page_url, proxies=proxies, timeout=self.request_timeout)
+        except requests.RequestException as err:
+            raise IncompleteResults(f"Cannot load {web_page_url}.") from err
+
+        if response.status_code == requests.codes.forbidden:
+            logger.info("Captcha is present.")
+            raise CaptchaEncountered
+        if response.status_code != requests.codes.ok:
+            raise IncompleteResults(f"Loading {web_page_url} returned HTTP {response.status_code}.")
+
+        document = html.document_fromstring(response.content, base_url=response.url)
+        self.check_captcha_presence(document)
+        return document
+
+    def check_captcha_presence(self, document):
+        if document.xpath("//*[@id='recaptcha_submit']"):
+            logger.info("Captcha is present.")
+            raise CaptchaEncountered
+
+    def scrape_results(self, task_dict, document, known_results=None, companies=None):
+        result_pages_count = self.scrape_page_numbering(document)["pages_count"]
+        if not result_pages_count:
+            if self.scrape_offer_entries(document):
+                raise IncompleteResults("Cannot scrape result pages numbering.")
+            logger.info("No results found.")
+            return
+
+        max_results_to_scrape = task_dict[TaskKeys.max_results_count.name]
+        max_result_pages_to_scrape = task_dict[TaskKeys.max_result_pages_count.name]
+        scraped_results_count = 0
+
+        current_result_page_number = 1
+        while True:
+            logger.debug(f"Scrapping result page {current_result_page_number}/{result_pages_count} over HTTP...")
+            offer_entries = self.scrape_offer_entries(document)
+            if not offer_entries:
+                raise IncompleteResults(f"No offers found on result page {current_result_page_number}.")
+            logger.debug(f"Got {len(offer_entries)} new offers.")
+
+            known_results_count = 0
+            for offer_index, offer_entry in enumerate(offer_entries):
+                if scraped_results_count >= max_results_to_scrape:
+                    return
+                # A fallback to the browser engine skips the offers of the failing page that were handled already.
+                self.result_offer_index = offer_index
+                result = self.scrape_result(offer_entry)
+                if known_results is not None and known_results.contains(result[ResultKeys.job_title.name],
+                                                                         result[ResultKeys.company_name.name]):
+                    known_results_count += 1
+                    self.skipped_results_count += 1
+                    continue
+                if companies is not None:
+                    self.add_company_details(result, companies)
+                scraped_results_count += 1
+                self.result_offer_index = offer_index + 1
+                yield result
+            self.result_offer_index = len(offer_entries)
+
+            if known_results_count == len(offer_entries):
+                logger.info(f"All {known_results_count} offers on result page {current_result_page_number} are known, so stopping.")
+                break
+
+            current_result_page_number += 1
+            if current_result_page_number > min(result_pages_count, max_result_pages_to_scrape):
+                break
+            # A fallback to the browser engine resumes from the page that failed to load or scrape.
+            self.result_page_number = current_result_page_number
+            self.result_offer_index = 0
+            document = self.load_web_page(self.result_page_link(document, current_result_page_number))
+
+    def scrape_offer_entries(self, document):
+        return document.xpath(f"//*[{class_xpath('jlGrid')}]/*[{class_xpath('jl')}]")
+
+    def scrape_result(self, offer_entry):
+        job_links = offer_entry.xpath(f".//div[@class='jobContainer']/a[{class_xpath('jobLink')}]")
+        company_names = offer_entry.xpath(f".//*[{class_xpath('jobEmpolyerName')}]")
+        if not job_links or not company_names:
+            raise IncompleteResults("Offer is missing job title or company name.")
+
+        # The apply link is only in the job details the browser engine opens by clicking the offer,
+        # and the href of the listing anchor is a different link, so results scraped over HTTP have none.
+        job_link = job_links[0]
+        return {
+            ResultKeys.job_title.name: job_link.text_content().strip(),
+            ResultKeys.company_name.name: company_names[0].text_content().strip(),
+            ResultKeys.application_link.name: None,
+            ResultKeys.company_size.name: None,
+            ResultKeys.company_website.name: None,
+            }
+
+    def add_company_details(self, result, companies):
+        company_dict = companies.company(result[ResultKeys.company_name.name], allow_stale=True)
+        if company_dict:
+            result[ResultKeys.company_size.name] = company_dict[CompanyKeys.company_size.name]
+            result[ResultKeys.company_website.name] = company_dict[CompanyKeys.company_website.name]
+
+    def scrape_page_numbering(self, document):
+        result = {"page_number": 0, "pages_count": 0}
+        page_numberings = document.xpath(f"//div[@id='ResultsFooter']/div[{class_xpath('hideMob')}]")
+        if not page_numberings:
+            logger.error("Cannot find results page numbering.")
+            return result
+        m = page_numbering_pattern.search(page_numberings[0].text_content())
+        try:
+            result["page_number"] = int(m.group('page_number'))
+            result["pages_count"] = int(m.group('pages_count'))
+        except AttributeError:
+            logger.warning("Cannot scrape result pages numbering.")
+        return result
+
+    def result_page_link(self, document, requested_page_number):
+        page_links = document.xpath(f"//div[{class_xpath('pagingControls')}]//li[{class_xpath('page')}]/a/@href")
+        for page_link in page_links:
+            if page_link_pattern.search(page_link):
+                page_link = page_link_pattern.sub(f"IP{requested_page_number}.htm", page_link)
+                return urljoin(self.web_page, page_link)
+        raise IncompleteResults(f"Cannot build link to result page {requested_page_number}.")
@@ -0,0 +1,186 @@
+import json, logging, os, signal, socketserver, threading
+from datetime import datetime
+
+from scrapper import app
+from scrapper.storage.factory import storage_by_settings
+from scrapper.utils.webbrowser_singleton import get_web_browser_instance
+from scrapper.utils.mail import Mail
+from scrapper.utils.workers import WorkerPool
+from scrapper.utils.known_results import KnownResults
+from scrapper.utils.settings import Settings
+from scrapper.utils.processes import ensure_web_browser_is_not_running, is_another_scrapper_instance_present
+
+logger = logging.getLogger(__name__)
+
+def run():
+    if not Settings.task_leasing():
+        if is_another_scrapper_instance_present():
+            return
+        ensure_web_browser_is_not_running()
+
+    try:
+        Daemon().run()
+    except Exception:
+        logger.exception("Daemon met unresolvable error.")
+        if Settings.notify_by_mail():
+            my_mail = Mail(Settings.smtp())
+            my_mail.send_log()
+
+
+class HealthCheckHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        self.request.sendall(json.dumps(self.server.daemon.health(), default=str).encode() + b"\n")
+
+
+class HealthCheckServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+
+class Daemon():
+    def __init__(self):
+        self.__settings = Settings()
+        self.__settings.setup_logging()
+        self.__daemon_settings = self.__settings.daemon()
+        self.__wake_event = threading.Event()
+        self.__is_stopping = False
+        self.__is_reload_requested = False
+        self.__state = "starting"
+        self.__started_datetime = datetime.now()
+        self.__last_run_datetime = None
+        self.__last_error = None
+        self.__next_due_datetime = None
+        self.__runs_count = 0
+
+        self.__database = storage_by_settings(Settings.database())
+        self.__mail = self.__prepare_mail()
+        if self.__settings.tasks_from_yaml():
+            app.append_tasks_from_yaml(self.__database)
+
+        self.__web_browser = get_web_browser_instance(self.__settings.headless_web_browser(),
+                                                      self.__settings.lean_web_browser(),
+                                                      self.__settings.log_web_page_statistics())
+        self.__proxies = app.prepare_proxies(self.__settings, self.__web_browser, self.__database)
+        self.__known_results = KnownResults(self.__database)
+        self.__near_duplicates = app.prepare_near_duplicates(self.__settings, self.__database)
+        self.__lease_keeper = app.prepare_lease_keeper(self.__settings, self.__database)
+        self.__workers, self.__forward_proxies = app.prepare_workers(self.__settings.workers(), self.__settings,
+                                                                     self.__web_browser, self.__database,
+                                                                     self.__mail, self.__proxies, self.__known_results,
+                                                                     self.__near_duplicates, self.__lease_keeper)
+
+    def run(self):
+        signal.signal(signal.SIGHUP, self.__request_reload)
+        signal.signal(signal.SIGTERM, self.__request_stop)
+        signal.signal(signal.SIGINT, self.__request_stop)
+        health_check_server = self.__start_health_check_server()
+        logger.info(f"Daemon started with {len(self.__workers)} workers.")
+
+        try:
+            while not self.__is_stopping:
+                if self.__is_reload_requested:
+                    self.__reload()
+                self.__run_due_tasks()
+                self.__sleep_until_next_due_task()
+        finally:
+            self.__state = "stopping"
+            health_check_server.shutdown()
+            health_check_server.server_close()
+            os.remove(self.__daemon_settings["health_socket"])
+            for forward_proxy in self.__forward_proxies:
+                forward_proxy.stop()
+            if self.__lease_keeper:
+                self.__lease_keeper.stop()
+            if self.__proxies:
+                self.__proxies.save()
+            logger.info("Daemon stopped.")
+
+    def health(self):
+        return {
+            "state": self.__state,
+            "pid": os.getpid(),
+            "started_datetime": self.__started_datetime,
+            "last_run_datetime": self.__last_run_datetime,
+            "last_error": self.__last_error,
+            "next_due_datetime": self.__next_due_datetime,
+            "runs_count": self.__runs_count,
+            "workers_count": len(self.__workers),
+            }
+
+    def __run_due_tasks(self):
+        if self.__lease_keeper:
+            task_list = self.__lease_keeper.claim(len(self.__workers))
+        else:
+            task_list = self.__database.due_tasks()
+        if not task_list:
+            return
+
+        self.__state = "running"
+        self.__runs_count += 1
+        try:
+            if self.__lease_keeper:
+                app.run_leased_tasks(self.__workers, self.__lease_keeper, task_list)
+            else:
+                WorkerPool(self.__workers).run_tasks(task_list)
+        except Exception as err:
+            logger.exception("Daemon run met unresolvable error. Waiting for next due task.")
+            self.__last_error = f"{type(err).__name__}: {err}"
+            if self.__mail:
+                self.__mail.send_log()
+        else:
+            self.__last_error = None
+        self.__last_run_datetime = datetime.now()
+        if self.__proxies:
+            self.__proxies.save()
+
+    def __sleep_until_next_due_task(self):
+        max_sleep_in_seconds = self.__daemon_settings["max_sleep_in_seconds"]
+        self.__next_due_datetime = self.__database.next_due_datetime()
+        sleep_in_seconds = max_sleep_in_seconds
+        if self.__next_due_datetime:
+            sleep_in_seconds = min((self.__next_due_datetime - datetime.now()).total_seconds(), max_sleep_in_seconds)
+        if self.__last_error:
+            # A task that keeps failing without being postponed would otherwise rerun and mail in a tight loop.
+            sleep_in_seconds = max(sleep_in_seconds, self.__daemon_settings["min_sleep_after_error_in_seconds"])
+        if sleep_in_seconds <= 0:
+            return
+
+        self.__state = "sleeping"
+        logger.info(f"Sleeping {sleep_in_seconds:.0f} seconds until next due task at {self.__next_due_datetime}.")
+        self.__wake_event.wait(sleep_in_seconds)
+        self.__wake_event.clear()
+
+    def __reload(self):
+        logger.info("Reloading configuration and tasks...")
+        self.__state = "reloading"
+        self.__is_reload_requested = False
+        self.__settings.reload()
+        self.__daemon_settings = self.__settings.daemon()
+        self.__mail = self.__prepare_mail()
+        if self.__settings.tasks_from_yaml():
+            app.append_tasks_from_yaml(self.__database)
+        if self.__settings.workers() != len(self.__workers):
+            logger.warning(f"Workers count changed to {self.__settings.workers()}, restart daemon to apply it.")
+        logger.info("Reloaded configuration and tasks.")
+
+    def __prepare_mail(self):
+        if self.__settings.notify_by_mail():
+            return Mail(Settings.smtp())
+        return None
+
+    def __start_health_check_server(self):
+        health_socket = self.__daemon_settings["health_socket"]
+        if os.path.exists(health_socket):
+            os.remove(health_socket)
+        health_check_server = HealthCheckServer(health_socket, HealthCheckHandler)
+        health_check_server.daemon = self
+        threading.Thread(target=health_check_server.serve_forever, name="health-check", daemon=True).start()
+        logger.info(f"Health check listens on {health_socket}.")
+        return health_check_server
+
+    def __request_reload(self, signal_number, frame):
+        self.__is_reload_requested = True
+        self.__wake_event.set()
+
+    def __request_stop(self, signal_number, frame):
+        self.__is_stopping = True
+        self.__wake_event.set()
@@ -0,0 +1,10 @@
+from enum import Enum, auto, unique
+
+@unique
+class CompanyKeys(Enum):
+    company_number = auto()
+    normalized_company_name = auto()
+    company_name = auto()
+    company_size = auto()
+    company_website = auto()
+    refreshed_datetime = auto()
\ No newline at end of file
@@ -0,0 +1,6 @@
+from enum import Enum, auto, unique
+
+@unique
+class CrawlerEngines(Enum):
+    browser = auto()
+    http = auto()
\ No newline at end of file
@@ -0,0 +1,12 @@
+from enum import Enum, auto, unique
+
+@unique
+class ProxyKeys(Enum):
+    proxy = auto()
+    checked_datetime = auto()
+    latency_in_seconds = auto()
+    is_valid = auto()
+    successes_count = auto()
+    failures_count = auto()
+    captchas_count = auto()
+    consecutive_failures_count = auto()
@@ -7,4 +7,9 @@ class ResultKeys(Enum):
     application_link = auto()
     company_name = auto()
     company_size = auto()
-    company_website = auto()
\ No newline at end of file
+    company_website = auto()
+    company_number = auto()
+    task_number = auto()
+    scrapped_datetime = auto()
+    title_signature = auto()
+    near_duplicate_of = auto()
@@ -9,4 +9,9 @@ class TaskKeys(Enum):
     scrapping_link = auto()
     scrapping_period_in_hours = auto()
     scrapping_datetime = auto()
-    minimal_results_count = auto()
\ No newline at end of file
+    minimal_results_count = auto()
+    crawler_engine = auto()
+    max_results_count = auto()
+    max_result_pages_count = auto()
+    lease_owner = auto()
+    lease_expiry_datetime = auto()
\ No newline at end of file
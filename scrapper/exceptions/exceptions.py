@@ -1,4 +1,8 @@
 
 class CaptchaEncountered(Exception):
+    def __init__(self,*args,**kwargs):
+        Exception.__init__(self,*args,**kwargs)
+
+class IncompleteResults(Exception):
     def __init__(self,*args,**kwargs):
         Exception.__init__(self,*args,**kwargs)
\ No newline at end of file
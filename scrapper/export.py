@@ -0,0 +1,111 @@
+import csv, json, logging, os, sys, time
+from datetime import datetime
+
+from scrapper.enums.tasks import TaskKeys
+from scrapper.enums.results import ResultKeys
+from scrapper.storage.factory import storage_by_settings
+from scrapper.storage.storage import exported_result_keys
+from scrapper.utils.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+export_formats = ["parquet", "jsonl", "csv"]
+
+export_columns = [result_key.name for result_key in exported_result_keys] + \
+                 [TaskKeys.site_name.name, TaskKeys.search_keywords.name]
+
+
+def run(output_path, export_format=None, since=None, until=None, task_numbers=None, batch_size=100000):
+    Settings.setup_logging()
+    if export_format is None:
+        export_format = export_format_by_path(output_path)
+    if export_format == "parquet" and output_path == "-":
+        raise ValueError("Parquet cannot be written to standard output.")
+    database = storage_by_settings(Settings.database())
+    batches = database.read_results_for_export(since, until, task_numbers, batch_size)
+    export_results(batches, output_path, export_format)
+
+
+def export_format_by_path(output_path):
+    export_format = os.path.splitext(output_path)[1].lstrip(".").lower()
+    if export_format not in export_formats:
+        raise ValueError(f"Cannot tell export format from '{output_path}', choose one of {export_formats}.")
+    return export_format
+
+
+def export_results(batches, output_path, export_format):
+    logger.info(f"Exporting results to {output_path} as {export_format}...")
+    started_at = time.monotonic()
+    if export_format == "parquet":
+        rows_count = write_parquet(batches, output_path)
+    elif export_format == "jsonl":
+        rows_count = write_jsonl(batches, output_path)
+    elif export_format == "csv":
+        rows_count = write_csv(batches, output_path)
+    else:
+        raise ValueError(f"'{export_format}' is not one of supported export formats {export_formats}.")
+    elapsed_in_seconds = max(time.monotonic() - started_at, 1e-9)
+    logger.info(f"Exported {rows_count} results in {elapsed_in_seconds:.1f} seconds " \
+                f"({rows_count / elapsed_in_seconds:.0f} results per second).")
+    return rows_count
+
+
+def write_parquet(batches, output_path):
+    # pyarrow is needed only for Parquet, so other formats work without it.
+    import pyarrow
+    import pyarrow.parquet
+
+    schema = pyarrow.schema([
+        (ResultKeys.result_number.name, pyarrow.int64()),
+        (ResultKeys.job_title.name, pyarrow.string()),
+        (ResultKeys.application_link.name, pyarrow.string()),
+        (ResultKeys.company_name.name, pyarrow.string()),
+        (ResultKeys.company_size.name, pyarrow.string()),
+        (ResultKeys.company_website.name, pyarrow.string()),
+        (ResultKeys.company_number.name, pyarrow.int64()),
+        (ResultKeys.task_number.name, pyarrow.int64()),
+        (ResultKeys.scrapped_datetime.name, pyarrow.timestamp("s")),
+        (ResultKeys.near_duplicate_of.name, pyarrow.string()),
+        (TaskKeys.site_name.name, pyarrow.string()),
+        (TaskKeys.search_keywords.name, pyarrow.string()),
+        ])
+    rows_count = 0
+    with pyarrow.parquet.ParquetWriter(output_path, schema, compression="zstd") as parquet_writer:
+        # Every batch becomes its own row group, so only one batch is ever held in memory.
+        for rows in batches:
+            columns = {column_name: [row[column_name] for row in rows] for column_name in export_columns}
+            parquet_writer.write_table(pyarrow.Table.from_pydict(columns, schema=schema))
+            rows_count += len(rows)
+    return rows_count
+
+
+def write_jsonl(batches, output_path):
+    rows_count = 0
+    with open_output(output_path) as output_file:
+        for rows in batches:
+            output_file.writelines(json.dumps({column_name: row[column_name] for column_name in export_columns},
+                                              default=str, ensure_ascii=False) + "\n"
+                                   for row in rows)
+            rows_count += len(rows)
+    return rows_count
+
+
+def write_csv(batches, output_path):
+    rows_count = 0
+    with open_output(output_path) as output_file:
+        csv_writer = csv.DictWriter(output_file, fieldnames=export_columns, extrasaction="ignore")
+        csv_writer.writeheader()
+        for rows in batches:
+            csv_writer.writerows(rows)
+            rows_count += len(rows)
+    return rows_count
+
+
+def open_output(output_path):
+    if output_path == "-":
+        return os.fdopen(os.dup(sys.stdout.fileno()), "w", encoding="utf-8", newline="")
+    return open(output_path, "w", encoding="utf-8", newline="")
+
+
+def parse_date(date_text):
+    return datetime.fromisoformat(date_text)
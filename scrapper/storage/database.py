@@ -1,36 +1,48 @@
-import logging
+import logging, tempfile, time
+from contextlib import contextmanager
 import mysql.connector
+import mysql.connector.pooling
 from mysql.connector import errorcode
 from datetime import datetime
 from datetime import timedelta
 
 from scrapper.enums.tasks import TaskKeys
 from scrapper.enums.results import ResultKeys
+from scrapper.enums.proxies import ProxyKeys
+from scrapper.enums.companies import CompanyKeys
+from scrapper.storage.storage import Storage, searched_result_keys
 
 
 logger = logging.getLogger(__name__)
 
 
-class Database:
-    my_database_connection: mysql.connector.MySQLConnection = None
-    my_database_cursor: mysql.connector.cursor.MySQLCursor = None
-    my_task_table_name = "tasks"
-    my_results_table_name = "results"
+class Database(Storage):
+    my_database_pool: mysql.connector.pooling.MySQLConnectionPool = None
 
     def __init__(self, config_dict):
-        self.connect_to_server(config_dict["host"], config_dict["user"], config_dict["password"])
+        self.__server_config = {"host": config_dict["host"], "user": config_dict["user"], "password": config_dict["password"]}
+        self.__checkout_retries = config_dict.get("checkout_retries", 5)
+        self.__checkout_backoff_in_seconds = config_dict.get("checkout_backoff_in_seconds", 0.5)
+        self.__bulk_batch_size = config_dict.get("bulk_batch_size", 500)
+        self.__bulk_load_threshold = config_dict.get("bulk_load_threshold", 0)
+        self.__allow_local_infile = bool(self.__bulk_load_threshold)
+        self.__upsert_statements = {}
+        self.__primary_key_names = {}
         my_database_name = config_dict["database_name"]
         if not self.is_database_created(my_database_name):
             self.create_database(my_database_name)
-        self.my_database_connection.database = my_database_name
+        self.connect_to_server(my_database_name, config_dict.get("pool_size", 4))
 
-        self.create_tasks_table()
-        self.create_results_table()
+        self.migrate()
 
-    def connect_to_server(self, host, user, password):
+    def connect_to_server(self, database_name, pool_size):
         logger.debug("Connecting to MySQL server...")
         try:
-            self.my_database_connection = mysql.connector.connect(host=host, user=user, password=password)
+            self.my_database_pool = mysql.connector.pooling.MySQLConnectionPool(pool_name=f"scrapper-{id(self)}",
+                                                                                pool_size=pool_size,
+                                                                                database=database_name,
+                                                                                allow_local_infile=self.__allow_local_infile,
+                                                                                **self.__server_config)
         except mysql.connector.errors.ProgrammingError as err:
             logger.error(err)
             raise
@@ -38,79 +50,356 @@ class Database:
             logger.error(err)
             raise
         else:
-            logger.info("Connected to MySQL server.")
+            logger.info(f"Connected to MySQL server with pool of {pool_size} connections.")
 
-        self.my_database_cursor = self.my_database_connection.cursor()
+    @contextmanager
+    def connection(self):
+        my_database_connection = self.__checkout_connection()
+        try:
+            yield my_database_connection
+        finally:
+            my_database_connection.close()
+
+    @contextmanager
+    def cursor(self, **cursor_options):
+        # Buffered by default, so a connection never goes back to the pool with unread rows.
+        cursor_options.setdefault("buffered", True)
+        with self.connection() as my_database_connection:
+            my_database_cursor = my_database_connection.cursor(**cursor_options)
+            try:
+                yield my_database_cursor
+                my_database_connection.commit()
+            except Exception:
+                my_database_connection.rollback()
+                raise
+            finally:
+                my_database_cursor.close()
+
+    def __checkout_connection(self):
+        for try_no in range(self.__checkout_retries + 1):
+            try:
+                my_database_connection = self.my_database_pool.get_connection()
+            except mysql.connector.errors.PoolError as err:
+                last_error = err
+                logger.debug(f"No free connection in pool, try {try_no}.")
+            except (mysql.connector.errors.InterfaceError, mysql.connector.errors.OperationalError) as err:
+                last_error = err
+                logger.warning(f"Cannot connect to MySQL server, try {try_no}: {err}")
+            else:
+                try:
+                    my_database_connection.ping(reconnect=True, attempts=1, delay=0)
+                except (mysql.connector.errors.InterfaceError, mysql.connector.errors.OperationalError) as err:
+                    last_error = err
+                    logger.warning(f"Lost connection to MySQL server, try {try_no}: {err}")
+                    my_database_connection.close()
+                else:
+                    return my_database_connection
+            time.sleep(self.__checkout_backoff_in_seconds * 2 ** try_no)
+        raise last_error
+
+    @contextmanager
+    def __server_cursor(self):
+        my_server_connection = mysql.connector.connect(**self.__server_config)
+        try:
+            my_server_cursor = my_server_connection.cursor()
+            yield my_server_cursor
+            my_server_cursor.close()
+        finally:
+            my_server_connection.close()
 
     def recreate_tables(self):
         self.delete_table(self.my_task_table_name)
         self.delete_table(self.my_results_table_name)
+        self.delete_table(self.my_proxies_table_name)
+        self.delete_table(self.my_companies_table_name)
+        self.delete_table(self.my_schema_version_table_name)
+        self.migrate()
+
+    def migrations(self):
+        return [
+            (1, "create tables", self.__create_tables),
+            (2, "widen task keys", self.__widen_task_keys),
+            (3, "index tasks by due time", lambda: self.create_index(self.my_task_table_name, "scrapping_datetime_index",
+                                                                     TaskKeys.scrapping_datetime.name)),
+            (4, "index results by task", lambda: self.create_index(self.my_results_table_name, "task_number_index",
+                                                                   ResultKeys.task_number.name)),
+            (5, "add task leases", self.__add_task_leases),
+            (6, "add proxy health counters", self.__add_proxy_health_counters),
+            (7, "flag near-duplicate results", self.__add_near_duplicate_flags),
+            (8, "search results without company details", self.__reindex_searched_columns),
+            ]
+
+    def read_schema_version(self):
+        with self.cursor() as my_database_cursor:
+            my_database_cursor.execute(f"CREATE TABLE IF NOT EXISTS {self.my_schema_version_table_name} (" \
+                                       "version INT UNSIGNED NOT NULL, " \
+                                       "description VARCHAR(255) NOT NULL, " \
+                                       "applied_datetime DATETIME NOT NULL, " \
+                                       "PRIMARY KEY (version)" \
+                                       ");")
+            my_database_cursor.execute(f"SELECT IFNULL(MAX(version), 0) FROM {self.my_schema_version_table_name};")
+            return my_database_cursor.fetchone()[0]
+
+    def write_schema_version(self, version, description):
+        with self.cursor() as my_database_cursor:
+            my_database_cursor.execute(f"INSERT INTO {self.my_schema_version_table_name} " \
+                                       "(version, description, applied_datetime) VALUES (%s, %s, %s);",
+                                       (version, description, datetime.now()))
+
+    def __create_tables(self):
         self.create_tasks_table()
+        self.create_companies_table()
         self.create_results_table()
-
-    def append_result(self, result_dict):
-        self.append_results([result_dict])
-
-    def append_results(self, results_list):
-        self.append_records(results_list, self.my_results_table_name)
-
-    def append_record(self, records_dict, table_name):
-        self.append_records([records_dict], table_name)
-
-    def append_records(self, records_list, table_name, update_records=True):
+        self.create_proxies_table()
+
+    def __add_task_leases(self):
+        self.create_column(self.my_task_table_name, TaskKeys.lease_owner.name, "VARCHAR(100) NULL")
+        self.create_column(self.my_task_table_name, TaskKeys.lease_expiry_datetime.name, "DATETIME NULL")
+
+    def __reindex_searched_columns(self):
+        if self.is_index_created(self.my_results_table_name, "results_fulltext_index"):
+            with self.cursor() as my_database_cursor:
+                my_database_cursor.execute(f"ALTER TABLE {self.my_results_table_name} DROP INDEX results_fulltext_index;")
+        self.create_index(self.my_results_table_name, "results_fulltext_index", self.__searched_columns(), "FULLTEXT")
+
+    def __add_near_duplicate_flags(self):
+        self.create_column(self.my_results_table_name, ResultKeys.near_duplicate_of.name, "VARCHAR(100) NULL")
+        # Signatures are now computed from word shingles, so older ones are recomputed on the next load.
+        with self.cursor() as my_database_cursor:
+            my_database_cursor.execute(f"UPDATE {self.my_results_table_name} SET {ResultKeys.title_signature.name}=NULL;")
+
+    def __add_proxy_health_counters(self):
+        for proxy_key in [ProxyKeys.successes_count, ProxyKeys.failures_count,
+                          ProxyKeys.captchas_count, ProxyKeys.consecutive_failures_count]:
+            self.create_column(self.my_proxies_table_name, proxy_key.name, "INT UNSIGNED NOT NULL DEFAULT 0")
+
+    def __widen_task_keys(self):
+        # TINYINT capped tasks at 255; results already keep task numbers as INT UNSIGNED.
+        with self.cursor() as my_database_cursor:
+            my_database_cursor.execute(f"ALTER TABLE {self.my_task_table_name} " \
+                                       f"MODIFY {TaskKeys.task_number.name} INT UNSIGNED NOT NULL AUTO_INCREMENT, " \
+                                       f"MODIFY {TaskKeys.minimal_results_count.name} INT DEFAULT 0;")
+
+    def read_result_keys(self, batch_size=10000):
+        sql_query = f"SELECT {ResultKeys.job_title.name}, {ResultKeys.company_name.name} " \
+                    f"FROM {self.my_results_table_name};"
+        with self.cursor(buffered=False) as my_database_cursor:
+            my_database_cursor.execute(sql_query)
+            while True:
+                rows = my_database_cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield from rows
+
+    def read_result_signatures(self, batch_size=10000):
+        sql_query = f"SELECT {ResultKeys.job_title.name}, {ResultKeys.company_name.name}, " \
+                    f"{ResultKeys.title_signature.name} " \
+                    f"FROM {self.my_results_table_name} " \
+                    f"WHERE {ResultKeys.near_duplicate_of.name} IS NULL;"
+        with self.cursor(buffered=False) as my_database_cursor:
+            my_database_cursor.execute(sql_query)
+            while True:
+                rows = my_database_cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield from rows
+
+    def search_results(self, query, limit=20, after=None):
+        searched_columns = ", ".join(f"r.{result_key.name}" for result_key in searched_result_keys)
+        match_expression = f"MATCH ({searched_columns}) AGAINST (%s IN NATURAL LANGUAGE MODE)"
+        matches_query = f"SELECT {', '.join(self.result_columns())}, " \
+                        f"{match_expression} AS score " \
+                        f"FROM {self.my_results_table_name} r " \
+                        f"{self.companies_join()} " \
+                        f"WHERE {match_expression}"
+        sql_query, values = self.search_page_query(matches_query, "%s", limit, after)
+        with self.cursor(dictionary=True) as my_database_cursor:
+            my_database_cursor.execute(sql_query, [query, query] + values)
+            search_results = my_database_cursor.fetchall()
+        logger.debug(f"Found {len(search_results)} results matching '{query}'.")
+        return search_results
+
+    def __searched_columns(self):
+        return ", ".join(result_key.name for result_key in searched_result_keys)
+
+    def read_results_for_export(self, since=None, until=None, task_numbers=None, batch_size=10000):
+        sql_query, values = self.export_query("%s", since, until, task_numbers)
+        # Unbuffered cursor streams rows from the server instead of holding the whole table in memory.
+        with self.cursor(buffered=False, dictionary=True) as my_database_cursor:
+            my_database_cursor.execute(sql_query, values)
+            while True:
+                rows = my_database_cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield rows
+
+    def append_records(self, records_list, table_name, update_records=True, batch_size=None):
         records_to_append_count = len(records_list)
         if records_to_append_count == 0:
             logger.debug("No records to append.")
-            return
+            return 0, 0
+        self.table_name(table_name)
+        if self.__bulk_load_threshold and records_to_append_count >= self.__bulk_load_threshold:
+            return self.load_records(records_list, table_name, update_records)
         logger.debug(f"Appending {records_to_append_count} records to table '{table_name}'...")
 
-        value_names = ""
-        value_placeholders = ""
-        value_replacements = ""
-
-        for record_key in records_list[0]:
-            value_names += f"{record_key},"
-            value_placeholders += f"%({record_key})s,"
-            value_replacements += f"{record_key}=VALUES({record_key}),"
-
+        if not batch_size:
+            batch_size = self.__bulk_batch_size
+        value_names = list(records_list[0])
+        records_appended_count = 0
+        records_updated_count = 0
+        with self.cursor() as my_database_cursor:
+            for batch_start in range(0, records_to_append_count, batch_size):
+                records_batch = records_list[batch_start:batch_start + batch_size]
+                sql_query = self.__upsert_statement(my_database_cursor, table_name, value_names, len(records_batch),
+                                                    update_records)
+                values = [record[value_name] for record in records_batch for value_name in value_names]
+                existing_records_count = None
+                if update_records:
+                    existing_records_count = self.__existing_records_count(my_database_cursor, table_name, records_batch)
+                my_database_cursor.execute(sql_query, values)
+                batch_appended_count, batch_updated_count = self.__upsert_counts(len(records_batch),
+                                                                                 my_database_cursor.rowcount,
+                                                                                 existing_records_count)
+                records_appended_count += batch_appended_count
+                records_updated_count += batch_updated_count
+
+        self.__log_appended_records(records_appended_count, records_to_append_count, update_records)
+        return records_appended_count, records_updated_count
+
+    def load_records(self, records_list, table_name, update_records=True):
+        records_to_append_count = len(records_list)
+        logger.debug(f"Loading {records_to_append_count} records to table '{table_name}' from file...")
+        value_names = list(records_list[0])
+        staging_table_name = f"{table_name}_staging"
+
+        with tempfile.NamedTemporaryFile("w", encoding="utf-8", newline="\n", suffix=".tsv") as records_file:
+            for record in records_list:
+                records_file.write("\t".join(self.__infile_value(record[value_name]) for value_name in value_names))
+                records_file.write("\n")
+            records_file.flush()
+
+            # Temporary tables live as long as the connection, so the whole load runs on one.
+            with self.cursor() as my_database_cursor:
+                # LIKE would copy the FULLTEXT index of results, which InnoDB temporary tables reject.
+                my_database_cursor.execute(f"CREATE TEMPORARY TABLE {staging_table_name} " \
+                                           f"({self.__column_definitions(my_database_cursor, table_name, value_names)});")
+                try:
+                    my_database_cursor.execute(f"LOAD DATA LOCAL INFILE %s INTO TABLE {staging_table_name} " \
+                                               f"CHARACTER SET utf8mb4 " \
+                                               f"FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\' " \
+                                               f"LINES TERMINATED BY '\\n' " \
+                                               f"({','.join(value_names)});", (records_file.name,))
+                    sql_query = f"INSERT INTO {table_name} ({','.join(value_names)}) " \
+                                f"SELECT {','.join(value_names)} FROM {staging_table_name} " \
+                                f"ON DUPLICATE KEY UPDATE " \
+                                f"{self.__value_replacements(my_database_cursor, table_name, value_names, update_records)};"
+                    existing_records_count = None
+                    if update_records:
+                        existing_records_count = self.__staged_existing_records_count(my_database_cursor, table_name,
+                                                                                      staging_table_name, value_names)
+                    my_database_cursor.execute(sql_query)
+                    records_appended_count, records_updated_count = self.__upsert_counts(records_to_append_count,
+                                                                                         my_database_cursor.rowcount,
+                                                                                         existing_records_count)
+                finally:
+                    my_database_cursor.execute(f"DROP TEMPORARY TABLE {staging_table_name};")
+
+        self.__log_appended_records(records_appended_count, records_to_append_count, update_records)
+        return records_appended_count, records_updated_count
+
+    def __column_definitions(self, my_database_cursor, table_name, column_names):
+        my_database_cursor.execute("SELECT COLUMN_NAME, COLUMN_TYPE " \
+                                   "FROM information_schema.COLUMNS " \
+                                   "WHERE TABLE_SCHEMA=DATABASE() AND TABLE_NAME=%s;", (table_name,))
+        column_types = dict(my_database_cursor.fetchall())
+        return ", ".join(f"{column_name} {column_types[column_name]} NULL" for column_name in column_names)
+
+    def __upsert_statement(self, my_database_cursor, table_name, value_names, records_count, update_records):
+        statement_key = (table_name, tuple(value_names), records_count, update_records)
+        if statement_key not in self.__upsert_statements:
+            value_placeholders = "(" + ",".join(["%s"] * len(value_names)) + ")"
+            self.__upsert_statements[statement_key] = \
+                f"INSERT INTO {table_name} " \
+                f"({','.join(value_names)}) " \
+                f"VALUES {','.join([value_placeholders] * records_count)} " \
+                f"ON DUPLICATE KEY UPDATE {self.__value_replacements(my_database_cursor, table_name, value_names, update_records)};"
+        return self.__upsert_statements[statement_key]
+
+    def __value_replacements(self, my_database_cursor, table_name, value_names, update_records):
         if not update_records:
-            record_key = self.primary_key_name(table_name)
-            value_replacements = f"{record_key}=VALUES({record_key}),"
-
-        value_names = value_names.rstrip(',')
-        value_placeholders = value_placeholders.rstrip(',')
-        value_replacements = value_replacements.rstrip(',')
-
-        sql_query = f"INSERT INTO {table_name} " \
-                    f"({value_names}) " \
-                    f"VALUES ({value_placeholders}) " \
-                    f"ON DUPLICATE KEY UPDATE {value_replacements};"
-
-        records_before_appending_count = self.records_count(table_name)
-        self.my_database_cursor.executemany(sql_query, records_list)
-        self.my_database_connection.commit()
-        records_after_appending_count = self.records_count(table_name)
-        records_appended_count = records_after_appending_count - records_before_appending_count
-        records_updated_count = records_to_append_count - records_appended_count
-
-        if records_updated_count:
+            # A self-assignment leaves existing rows untouched and affects no rows.
+            primary_key_name = self.primary_key_name(table_name, my_database_cursor)
+            return f"{primary_key_name}={primary_key_name}"
+        return ",".join(f"{value_name}=VALUES({value_name})" for value_name in value_names)
+
+    def __upsert_counts(self, records_count, affected_rows_count, existing_records_count=None):
+        # MySQL counts an inserted row as 1, a changed row as 2 and an unchanged row as 0, so one changed
+        # and one unchanged row look like two inserts. Rows to update are therefore counted up front.
+        if existing_records_count is not None:
+            return records_count - existing_records_count, existing_records_count
+        # Skipped rows are never changed, so without updates the estimate below is exact.
+        if affected_rows_count >= records_count:
+            records_updated_count = affected_rows_count - records_count
+            return records_count - records_updated_count, records_updated_count
+        return affected_rows_count, 0
+
+    def __existing_records_count(self, my_database_cursor, table_name, records_list):
+        unique_columns = self.unique_columns[table_name]
+        if any(unique_column not in records_list[0] for unique_column in unique_columns):
+            return None
+        key_placeholders = "(" + ",".join(["%s"] * len(unique_columns)) + ")"
+        sql_query = f"SELECT COUNT(*) FROM {table_name} " \
+                    f"WHERE ({','.join(unique_columns)}) IN ({','.join([key_placeholders] * len(records_list))});"
+        my_database_cursor.execute(sql_query, [record[unique_column] for record in records_list
+                                               for unique_column in unique_columns])
+        return my_database_cursor.fetchone()[0]
+
+    def __staged_existing_records_count(self, my_database_cursor, table_name, staging_table_name, value_names):
+        unique_columns = self.unique_columns[table_name]
+        if any(unique_column not in value_names for unique_column in unique_columns):
+            return None
+        join_condition = " AND ".join(f"t.{unique_column}=s.{unique_column}" for unique_column in unique_columns)
+        my_database_cursor.execute(f"SELECT COUNT(*) FROM {staging_table_name} s " \
+                                   f"JOIN {table_name} t ON {join_condition};")
+        return my_database_cursor.fetchone()[0]
+
+    def __infile_value(self, value):
+        if value is None:
+            return "\\N"
+        if isinstance(value, bool):
+            return str(int(value))
+        if isinstance(value, datetime):
+            return self.format_date_for_mysql(value)
+        return str(value).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+    def __log_appended_records(self, records_appended_count, records_to_append_count, update_records):
+        if records_appended_count != records_to_append_count:
             logger.info("Appended {} from {} records and the rest has been {}.".format(records_appended_count, records_to_append_count, "updated" if update_records else "skipped"  ))
 
-    def primary_key_name(self, table_name):
-        sql_query = f"SHOW KEYS FROM {table_name} WHERE Key_name = 'PRIMARY'"
-        my_database_cursor = self.my_database_connection.cursor(named_tuple=True)
-        my_database_cursor.execute(sql_query)
-
-        for row in my_database_cursor:
-            name_of_primary_key = row.Column_name
-        my_database_cursor.close()
+    def primary_key_name(self, table_name, my_database_cursor=None):
+        if table_name in self.__primary_key_names:
+            return self.__primary_key_names[table_name]
+        if my_database_cursor is None:
+            with self.cursor() as my_database_cursor:
+                return self.primary_key_name(table_name, my_database_cursor)
+
+        # Callers holding a pooled connection pass its cursor, so a small pool is not checked out twice.
+        my_database_cursor.execute("SELECT COLUMN_NAME " \
+                                   "FROM information_schema.KEY_COLUMN_USAGE " \
+                                   "WHERE TABLE_SCHEMA=DATABASE() AND TABLE_NAME=%s AND CONSTRAINT_NAME='PRIMARY';",
+                                   (table_name,))
+        for row in my_database_cursor.fetchall():
+            name_of_primary_key = row[0]
+        self.__primary_key_names[table_name] = name_of_primary_key
         return name_of_primary_key
 
     def records_count(self, table_name):
 #        logger.debug(f"Checking records count for table named {table_name}...")
-        sql_query = f"SELECT COUNT(*) FROM {table_name}"
-        self.my_database_cursor.execute(sql_query)
-        records_count = self.my_database_cursor.fetchone()[0]
+        sql_query = f"SELECT COUNT(*) FROM {self.table_name(table_name)}"
+        with self.cursor() as my_database_cursor:
+            my_database_cursor.execute(sql_query)
+            records_count = my_database_cursor.fetchone()[0]
         logger.debug(f"Records count for table named '{table_name}' is {records_count}.")
         return records_count
 
@@ -120,24 +409,20 @@ class Database:
         if task_number > tasks_count:
             logger.error("Requested task number {} but maximum number is {}.".format(task_number, tasks_count))
 
-        my_database_cursor = self.my_database_connection.cursor(dictionary=True)
-        sql_query = f"SELECT *" \
+        sql_query = f"SELECT * " \
                     f"FROM {self.my_task_table_name} " \
-                    f"WHERE {TaskKeys.task_number.name}={task_number}"
+                    f"WHERE {TaskKeys.task_number.name}=%s;"
 
-        my_database_cursor.execute(sql_query)
-        task_dict = my_database_cursor.fetchone()
-        my_database_cursor.close()
+        with self.cursor(dictionary=True) as my_database_cursor:
+            my_database_cursor.execute(sql_query, (task_number,))
+            task_dict = my_database_cursor.fetchone()
         return task_dict
 
-    def append_task(self, task_dict):
-        self.append_tasks([task_dict])
-
-    def append_tasks(self, tasks_list):
-        self.append_records(tasks_list, self.my_task_table_name)
-
     def create_tasks_table(self):
         if self.is_table_created(self.my_task_table_name):
+            self.create_column(self.my_task_table_name, TaskKeys.crawler_engine.name, "VARCHAR(7) NULL")
+            self.create_column(self.my_task_table_name, TaskKeys.max_results_count.name, "INT UNSIGNED NOT NULL DEFAULT 10")
+            self.create_column(self.my_task_table_name, TaskKeys.max_result_pages_count.name, "SMALLINT UNSIGNED NOT NULL DEFAULT 2")
             return
 
         logger.debug(f"Creating table named '{self.my_task_table_name}'...")
@@ -149,100 +434,137 @@ class Database:
                     f"{TaskKeys.scrapping_period_in_hours.name} SMALLINT UNSIGNED NOT NULL, " \
                     f"{TaskKeys.scrapping_datetime.name} DATETIME NULL, " \
                     f"{TaskKeys.minimal_results_count.name} TINYINT DEFAULT 0, " \
+                    f"{TaskKeys.crawler_engine.name} VARCHAR(7) NULL, " \
+                    f"{TaskKeys.max_results_count.name} INT UNSIGNED NOT NULL DEFAULT 10, " \
+                    f"{TaskKeys.max_result_pages_count.name} SMALLINT UNSIGNED NOT NULL DEFAULT 2, " \
                     f"PRIMARY KEY ({TaskKeys.task_number.name}), " \
                     f"CONSTRAINT unique_task UNIQUE KEY (" \
                     f"{TaskKeys.search_keywords.name}, " \
                     f"{TaskKeys.scrapping_link.name} " \
                     ")" \
                     ");"
-        self.my_database_cursor.execute(sql_query)
+        with self.cursor() as my_database_cursor:
+            my_database_cursor.execute(sql_query)
         logger.info(f"Created table named '{self.my_task_table_name}'.")
 
     def due_tasks(self):
         logger.debug(f"Preparing list of tasks due to scrapping...")
         tasks_list = []
-        date_time = datetime.now()
-        my_sql_date_time = date_time.strftime('%Y-%m-%d %H:%M:%S')
         sql_query = f"SELECT * " \
                     f"FROM {self.my_task_table_name} " \
-                    f"WHERE {TaskKeys.scrapping_datetime.name}<='{my_sql_date_time}' " \
+                    f"WHERE {TaskKeys.scrapping_datetime.name}<=%s " \
                     f"OR {TaskKeys.scrapping_datetime.name} IS NULL" \
                     ";"
-        my_database_cursor = self.my_database_connection.cursor(dictionary=True)
-        my_database_cursor.execute(sql_query)
-        for row in my_database_cursor:
-            tasks_list.append(row)
-        my_database_cursor.close()
+        with self.cursor(dictionary=True) as my_database_cursor:
+            my_database_cursor.execute(sql_query, (datetime.now(),))
+            for row in my_database_cursor:
+                tasks_list.append(row)
         logger.debug(f"Prepared list of {len(tasks_list)} tasks due to scrapping.")
         return tasks_list
 
-    def set_new_due_time_on_task(self, task_number):
-        logger.debug(f"Setting new due time for task by number {task_number}...")
-        current_due_time = self.read_attribute_of_task(task_number, TaskKeys.scrapping_datetime.name)
-        scrapping_period_in_hours = self.read_attribute_of_task(task_number, TaskKeys.scrapping_period_in_hours.name)
-        new_due_time = datetime.now() #+ timedelta(hours = scrapping_period_in_hours)
-        self.write_attribute_of_task(task_number, TaskKeys.scrapping_datetime.name, new_due_time)
-        logger.debug(f"Set new due time {self.format_date_for_mysql(new_due_time)} " \
-                     f"from old {self.format_date_for_mysql(current_due_time)} " \
-                     f"on task by number {task_number}.")
+    def next_due_datetime(self):
+        # A task can be claimed once it is due and its lease, if any, has expired.
+        sql_query = f"SELECT MIN(GREATEST(" \
+                    f"IFNULL({TaskKeys.scrapping_datetime.name}, CAST('1000-01-01' AS DATETIME)), " \
+                    f"IFNULL({TaskKeys.lease_expiry_datetime.name}, CAST('1000-01-01' AS DATETIME)))) " \
+                    f"FROM {self.my_task_table_name}" \
+                    ";"
+        with self.cursor() as my_database_cursor:
+            my_database_cursor.execute(sql_query)
+            next_due_datetime = my_database_cursor.fetchone()[0]
+        if next_due_datetime is None:
+            return None
+        return max(next_due_datetime, datetime.now())
+
+    def claim_due_tasks(self, lease_owner, tasks_count, lease_in_seconds):
+        now = datetime.now()
+        lease_expiry_datetime = now + timedelta(seconds=lease_in_seconds)
+        # SKIP LOCKED lets every node lock a different set of due tasks without waiting for the others.
+        sql_query = f"SELECT * " \
+                    f"FROM {self.my_task_table_name} " \
+                    f"WHERE ({TaskKeys.scrapping_datetime.name}<=%s OR {TaskKeys.scrapping_datetime.name} IS NULL) " \
+                    f"AND ({TaskKeys.lease_expiry_datetime.name} IS NULL OR {TaskKeys.lease_expiry_datetime.name}<=%s) " \
+                    f"ORDER BY {TaskKeys.scrapping_datetime.name} " \
+                    f"LIMIT %s " \
+                    f"FOR UPDATE SKIP LOCKED;"
+        with self.cursor(dictionary=True) as my_database_cursor:
+            my_database_cursor.execute(sql_query, (now, now, tasks_count))
+            tasks_list = my_database_cursor.fetchall()
+            if tasks_list:
+                task_numbers = [task_dict[TaskKeys.task_number.name] for task_dict in tasks_list]
+                my_database_cursor.execute(f"UPDATE {self.my_task_table_name} " \
+                                           f"SET {TaskKeys.lease_owner.name}=%s, {TaskKeys.lease_expiry_datetime.name}=%s " \
+                                           f"WHERE {TaskKeys.task_number.name} IN ({','.join(['%s'] * len(task_numbers))});",
+                                           [lease_owner, lease_expiry_datetime] + task_numbers)
+        for task_dict in tasks_list:
+            task_dict[TaskKeys.lease_owner.name] = lease_owner
+            task_dict[TaskKeys.lease_expiry_datetime.name] = lease_expiry_datetime
+        logger.debug(f"Claimed {len(tasks_list)} due tasks for {lease_owner}.")
+        return tasks_list
+
+    def renew_task_leases(self, lease_owner, task_numbers, lease_in_seconds):
+        if not task_numbers:
+            return 0
+        lease_expiry_datetime = datetime.now() + timedelta(seconds=lease_in_seconds)
+        sql_query = f"UPDATE {self.my_task_table_name} " \
+                    f"SET {TaskKeys.lease_expiry_datetime.name}=%s " \
+                    f"WHERE {TaskKeys.lease_owner.name}=%s " \
+                    f"AND {TaskKeys.task_number.name} IN ({','.join(['%s'] * len(task_numbers))});"
+        with self.cursor() as my_database_cursor:
+            my_database_cursor.execute(sql_query, [lease_expiry_datetime, lease_owner] + list(task_numbers))
+            return my_database_cursor.rowcount
+
+    def release_task_lease(self, lease_owner, task_number):
+        sql_query = f"UPDATE {self.my_task_table_name} " \
+                    f"SET {TaskKeys.lease_owner.name}=NULL, {TaskKeys.lease_expiry_datetime.name}=NULL " \
+                    f"WHERE {TaskKeys.task_number.name}=%s AND {TaskKeys.lease_owner.name}=%s;"
+        with self.cursor() as my_database_cursor:
+            my_database_cursor.execute(sql_query, (task_number, lease_owner))
 
     def write_date_time_on_task(self, task_number, date_time):
         logger.debug(f"Writing time stamp on task by number {task_number}...")
-        my_sql_date_time = self.format_date_for_mysql(date_time)
         sql_query = f"UPDATE {self.my_task_table_name} " \
-            f"SET {TaskKeys.scrapping_datetime.name}='{my_sql_date_time}' "\
-            f"WHERE {TaskKeys.task_number.name}={task_number}" \
+            f"SET {TaskKeys.scrapping_datetime.name}=%s "\
+            f"WHERE {TaskKeys.task_number.name}=%s" \
             ";"
-        self.my_database_cursor.execute(sql_query)
-        self.my_database_connection.commit()
+        with self.cursor() as my_database_cursor:
+            my_database_cursor.execute(sql_query, (date_time, task_number))
         logger.debug(f"Wrote time stamp on task by number {task_number}.")
 
-    def format_date_for_mysql(self, date_time):
-        if date_time is None:
-            return ''
-        return date_time.strftime('%Y-%m-%d %H:%M:%S')
-
     def read_date_time_on_task(self, task_number):
         sql_query = f"SELECT {TaskKeys.scrapping_datetime.name} " \
                     f"FROM {self.my_task_table_name} "\
-                    f"WHERE {TaskKeys.task_number.name}={task_number}" \
+                    f"WHERE {TaskKeys.task_number.name}=%s" \
                     ";"
-        self.my_database_cursor.execute(sql_query)
-        return self.my_database_cursor.fetchone()[0]
+        with self.cursor() as my_database_cursor:
+            my_database_cursor.execute(sql_query, (task_number,))
+            return my_database_cursor.fetchone()[0]
 
     def write_attribute_of_task(self, task_number, attribute_name, attribute_value):
         logger.debug(f"Writing attribute by name '{attribute_name}' on task by number {task_number}...")
-        date_attribute_names = [TaskKeys.scrapping_datetime.name]
-        if attribute_name in date_attribute_names:
-            attribute_value = attribute_value.strftime('%Y-%m-%d %H:%M:%S')
         sql_query = f"UPDATE {self.my_task_table_name} " \
-            f"SET {attribute_name}='{attribute_value}' "\
-            f"WHERE {TaskKeys.task_number.name}={task_number}" \
+            f"SET {self.task_column_name(attribute_name)}=%s "\
+            f"WHERE {TaskKeys.task_number.name}=%s" \
             ";"
-        self.my_database_cursor.execute(sql_query)
-        self.my_database_connection.commit()
+        with self.cursor() as my_database_cursor:
+            my_database_cursor.execute(sql_query, (attribute_value, task_number))
         logger.info(f"Wrote attribute by name '{attribute_name}' on task by number {task_number}.")
 
     def read_attribute_of_task(self, task_number, attribute_name):
-        sql_query = f"SELECT {attribute_name} " \
+        sql_query = f"SELECT {self.task_column_name(attribute_name)} " \
                     f"FROM {self.my_task_table_name} "\
-                    f"WHERE {TaskKeys.task_number.name}={task_number}" \
+                    f"WHERE {TaskKeys.task_number.name}=%s" \
                     ";"
-        self.my_database_cursor.execute(sql_query)
-        return self.my_database_cursor.fetchone()[0]
-
-    def expected_results_count(self, task_number):
-        expected_results_count = self.read_attribute_of_task \
-            (task_number, TaskKeys.minimal_results_count.name)
-
-        if not expected_results_count:
-            expected_results_count = 0
-        return expected_results_count
+        with self.cursor() as my_database_cursor:
+            my_database_cursor.execute(sql_query, (task_number,))
+            return my_database_cursor.fetchone()[0]
 
     def is_table_created(self, table_name):
         logger.debug(f"Checking if table named '{table_name}' exists...")
         try:
-            self.my_database_cursor.execute(f"SELECT 1 FROM {table_name} LIMIT 1;")
+            with self.cursor() as my_database_cursor:
+                my_database_cursor.execute(f"SELECT 1 FROM {table_name} LIMIT 1;")
+                my_database_cursor.fetchall()
         except mysql.connector.errors.ProgrammingError as err:
             if err.errno == errorcode.ER_NO_SUCH_TABLE:
                 logger.debug(f"Table named '{table_name}' doesn't exist.")
@@ -251,14 +573,48 @@ class Database:
                 raise
             return False
         else:
-            self.my_database_cursor.fetchall()
             logger.debug(f"Table named '{table_name}' exists.")
             return True
 
+    def is_column_created(self, table_name, column_name):
+        sql_query = "SELECT COUNT(*) " \
+                    "FROM information_schema.COLUMNS " \
+                    "WHERE TABLE_SCHEMA=DATABASE() AND TABLE_NAME=%s AND COLUMN_NAME=%s;"
+        with self.cursor() as my_database_cursor:
+            my_database_cursor.execute(sql_query, (table_name, column_name))
+            return my_database_cursor.fetchone()[0] > 0
+
+    def create_column(self, table_name, column_name, column_definition):
+        if self.is_column_created(table_name, column_name):
+            return
+
+        logger.debug(f"Creating column named '{column_name}' in table named '{table_name}'...")
+        with self.cursor() as my_database_cursor:
+            my_database_cursor.execute(f"ALTER TABLE {table_name} ADD COLUMN {column_name} {column_definition};")
+        logger.info(f"Created column named '{column_name}' in table named '{table_name}'.")
+
+    def is_index_created(self, table_name, index_name):
+        sql_query = "SELECT COUNT(*) " \
+                    "FROM information_schema.STATISTICS " \
+                    "WHERE TABLE_SCHEMA=DATABASE() AND TABLE_NAME=%s AND INDEX_NAME=%s;"
+        with self.cursor() as my_database_cursor:
+            my_database_cursor.execute(sql_query, (table_name, index_name))
+            return my_database_cursor.fetchone()[0] > 0
+
+    def create_index(self, table_name, index_name, column_names, index_type=""):
+        if self.is_index_created(table_name, index_name):
+            return
+
+        logger.debug(f"Creating index named '{index_name}' in table named '{table_name}'...")
+        with self.cursor() as my_database_cursor:
+            my_database_cursor.execute(f"CREATE {index_type} INDEX {index_name} ON {table_name} ({column_names});")
+        logger.info(f"Created index named '{index_name}' in table named '{table_name}'.")
+
     def delete_table(self, table_name):
         logger.debug(f"Deleting table named '{table_name}'...")
         try:
-            self.my_database_cursor.execute(f"DROP TABLE {table_name};")
+            with self.cursor() as my_database_cursor:
+                my_database_cursor.execute(f"DROP TABLE {table_name};")
             logger.info(f"Deleted table named '{table_name}'.")
         except mysql.connector.errors.ProgrammingError as err:
             if err.errno == errorcode.ER_BAD_TABLE_ERROR:
@@ -270,20 +626,28 @@ class Database:
     def clear_table(self, table_name):
         if self.is_table_created(self.my_task_table_name):
             return
-        self.my_database_cursor.execute("SELECT COUNT(*) FROM {};".format(table_name))
-        row_count = self.my_database_cursor.fetchone()[0]
-        if not row_count:
-            return
-
-        logger.info(f"Deleting {row_count} rows from table named '{table_name}'...")
-        self.my_database_cursor.execute("TRUNCATE TABLE {};".format(table_name))
-        self.my_database_cursor.execute("SELECT COUNT(*) FROM {};".format(table_name))
-        row_count = self.my_database_cursor.fetchone()[0]
+        with self.cursor() as my_database_cursor:
+            my_database_cursor.execute("SELECT COUNT(*) FROM {};".format(table_name))
+            row_count = my_database_cursor.fetchone()[0]
+            if not row_count:
+                return
+
+            logger.info(f"Deleting {row_count} rows from table named '{table_name}'...")
+            my_database_cursor.execute("TRUNCATE TABLE {};".format(table_name))
+            my_database_cursor.execute("SELECT COUNT(*) FROM {};".format(table_name))
+            row_count = my_database_cursor.fetchone()[0]
         if row_count:
             logger.error(f"Error: row count still at {row_count}")
 
     def create_results_table(self):
         if self.is_table_created(self.my_results_table_name):
+            self.create_column(self.my_results_table_name, ResultKeys.company_number.name, "INT UNSIGNED NULL")
+            self.create_index(self.my_results_table_name, "company_number_index", ResultKeys.company_number.name)
+            self.create_column(self.my_results_table_name, ResultKeys.task_number.name, "INT UNSIGNED NULL")
+            self.create_column(self.my_results_table_name, ResultKeys.scrapped_datetime.name, "DATETIME NULL")
+            self.create_index(self.my_results_table_name, "scrapped_datetime_index", ResultKeys.scrapped_datetime.name)
+            self.create_column(self.my_results_table_name, ResultKeys.title_signature.name, "VARBINARY(64) NULL")
+            self.create_index(self.my_results_table_name, "results_fulltext_index", self.__searched_columns(), "FULLTEXT")
             return
 
         logger.debug(f"Creating table named '{self.my_results_table_name}'...")
@@ -294,19 +658,107 @@ class Database:
                     f"{ResultKeys.company_name.name} VARCHAR(100) NOT NULL, " \
                     f"{ResultKeys.company_size.name} VARCHAR(100), " \
                     f"{ResultKeys.company_website.name} VARCHAR(100), " \
+                    f"{ResultKeys.company_number.name} INT UNSIGNED NULL, " \
+                    f"{ResultKeys.task_number.name} INT UNSIGNED NULL, " \
+                    f"{ResultKeys.scrapped_datetime.name} DATETIME NULL, " \
+                    f"{ResultKeys.title_signature.name} VARBINARY(64) NULL, " \
                     f"PRIMARY KEY ({ResultKeys.result_number.name}), " \
+                    f"INDEX company_number_index ({ResultKeys.company_number.name}), " \
+                    f"INDEX scrapped_datetime_index ({ResultKeys.scrapped_datetime.name}), " \
+                    f"FULLTEXT INDEX results_fulltext_index ({self.__searched_columns()}), " \
                     f"CONSTRAINT unique_application UNIQUE KEY (" \
                     f"{ResultKeys.job_title.name}, " \
                     f"{ResultKeys.company_name.name} " \
                     ")" \
                     ");"
-        self.my_database_cursor.execute(sql_query)
+        with self.cursor() as my_database_cursor:
+            my_database_cursor.execute(sql_query)
         logger.info(f"Created table named '{self.my_results_table_name}'.")
 
+    def read_company(self, normalized_company_name):
+        sql_query = f"SELECT * " \
+                    f"FROM {self.my_companies_table_name} " \
+                    f"WHERE {CompanyKeys.normalized_company_name.name}=%s;"
+        with self.cursor(dictionary=True) as my_database_cursor:
+            my_database_cursor.execute(sql_query, (normalized_company_name,))
+            company_dict = my_database_cursor.fetchone()
+        return company_dict
+
+    def read_company_numbers(self, normalized_company_names):
+        company_numbers = {}
+        if not normalized_company_names:
+            return company_numbers
+        value_placeholders = ",".join(["%s"] * len(normalized_company_names))
+        sql_query = f"SELECT {CompanyKeys.normalized_company_name.name}, {CompanyKeys.company_number.name} " \
+                    f"FROM {self.my_companies_table_name} " \
+                    f"WHERE {CompanyKeys.normalized_company_name.name} IN ({value_placeholders});"
+        with self.cursor() as my_database_cursor:
+            my_database_cursor.execute(sql_query, list(normalized_company_names))
+            for normalized_company_name, company_number in my_database_cursor.fetchall():
+                company_numbers[normalized_company_name] = company_number
+        return company_numbers
+
+    def create_companies_table(self):
+        if self.is_table_created(self.my_companies_table_name):
+            return
+
+        logger.debug(f"Creating table named '{self.my_companies_table_name}'...")
+        sql_query = f"CREATE TABLE {self.my_companies_table_name} (" \
+                    f"{CompanyKeys.company_number.name} INT UNSIGNED NOT NULL AUTO_INCREMENT, " \
+                    f"{CompanyKeys.normalized_company_name.name} VARCHAR(100) NOT NULL, " \
+                    f"{CompanyKeys.company_name.name} VARCHAR(100) NOT NULL, " \
+                    f"{CompanyKeys.company_size.name} VARCHAR(100), " \
+                    f"{CompanyKeys.company_website.name} VARCHAR(100), " \
+                    f"{CompanyKeys.refreshed_datetime.name} DATETIME NULL, " \
+                    f"PRIMARY KEY ({CompanyKeys.company_number.name}), " \
+                    f"CONSTRAINT unique_company UNIQUE KEY ({CompanyKeys.normalized_company_name.name})" \
+                    ");"
+        with self.cursor() as my_database_cursor:
+            my_database_cursor.execute(sql_query)
+        logger.info(f"Created table named '{self.my_companies_table_name}'.")
+
+    def read_proxies(self):
+        sql_query = f"SELECT * FROM {self.my_proxies_table_name};"
+        with self.cursor(dictionary=True) as my_database_cursor:
+            my_database_cursor.execute(sql_query)
+            proxies_list = my_database_cursor.fetchall()
+        logger.debug(f"Read {len(proxies_list)} proxies.")
+        return proxies_list
+
+    def proxies_due_to_validation(self, validation_ttl_in_hours):
+        checked_before = datetime.now() - timedelta(hours=validation_ttl_in_hours)
+        sql_query = f"SELECT {ProxyKeys.proxy.name} " \
+                    f"FROM {self.my_proxies_table_name} " \
+                    f"WHERE {ProxyKeys.checked_datetime.name} IS NULL " \
+                    f"OR {ProxyKeys.checked_datetime.name}<%s;"
+        with self.cursor() as my_database_cursor:
+            my_database_cursor.execute(sql_query, (checked_before,))
+            proxies_list = [row[0] for row in my_database_cursor.fetchall()]
+        logger.debug(f"Found {len(proxies_list)} proxies checked before {self.format_date_for_mysql(checked_before)}.")
+        return proxies_list
+
+    def create_proxies_table(self):
+        if self.is_table_created(self.my_proxies_table_name):
+            return
+
+        logger.debug(f"Creating table named '{self.my_proxies_table_name}'...")
+        sql_query = f"CREATE TABLE {self.my_proxies_table_name} (" \
+                    f"{ProxyKeys.proxy.name} VARCHAR(21) NOT NULL, " \
+                    f"{ProxyKeys.checked_datetime.name} DATETIME NULL, " \
+                    f"{ProxyKeys.latency_in_seconds.name} FLOAT NULL, " \
+                    f"{ProxyKeys.is_valid.name} BOOLEAN NULL, " \
+                    f"PRIMARY KEY ({ProxyKeys.proxy.name}), " \
+                    f"INDEX checked_datetime_index ({ProxyKeys.checked_datetime.name})" \
+                    ");"
+        with self.cursor() as my_database_cursor:
+            my_database_cursor.execute(sql_query)
+        logger.info(f"Created table named '{self.my_proxies_table_name}'.")
+
     def create_database(self, database_name):
         logger.debug(f"Creating database named '{database_name}'...")
         try:
-            self.my_database_cursor.execute(f"CREATE DATABASE {database_name} CHARACTER SET utf8mb4;")
+            with self.__server_cursor() as my_server_cursor:
+                my_server_cursor.execute(f"CREATE DATABASE {database_name} CHARACTER SET utf8mb4;")
         except mysql.connector.errors.DatabaseError as err:
             if err.errno != errorcode.ER_DB_CREATE_EXISTS:
                 logger.info(err.msg)
@@ -318,7 +770,8 @@ class Database:
     def delete_database(self, database_name):
         logger.debug(f"Deleting database named '{database_name}'...")
         try:
-            self.my_database_cursor.execute(f"DROP DATABASE {database_name};")
+            with self.__server_cursor() as my_server_cursor:
+                my_server_cursor.execute(f"DROP DATABASE {database_name};")
         except mysql.connector.errors.ProgrammingError as err:
             if err.errno != errorcode.ER_BAD_DB_ERROR:
                 logger.error(err.msg)
@@ -328,22 +781,18 @@ class Database:
 
     def is_database_created(self, database_name):
         logger.debug(f"Checking if database named '{database_name}' exists.")
-        try:
-            self.my_database_connection.database = database_name
-        except mysql.connector.errors.ProgrammingError as err:
-            if err.errno != errorcode.ER_BAD_DB_ERROR:
-                logger.error(err.msg)
-                raise
-            else:
-                logger.debug(f"Database named '{database_name}' doesn't exists.")
-            return False
-        else:
+        with self.__server_cursor() as my_server_cursor:
+            my_server_cursor.execute("SELECT COUNT(*) FROM information_schema.SCHEMATA WHERE SCHEMA_NAME=%s;", (database_name,))
+            is_database_created = my_server_cursor.fetchone()[0] > 0
+        if is_database_created:
             logger.debug(f"Database named '{database_name}' exists.")
-            return True
+        else:
+            logger.debug(f"Database named '{database_name}' doesn't exists.")
+        return is_database_created
 
 
     def __del__(self):
         logger.debug("Disconnecting from MySQL server...")
-        if not self.my_database_connection is None:
-            self.my_database_connection.close()
-            logger.info("Disconnected from MySQL server.")
\ No newline at end of file
+        if not self.my_database_pool is None:
+            self.my_database_pool._remove_connections()
+            logger.info("Disconnected from MySQL server.")
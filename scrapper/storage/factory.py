@@ -0,0 +1,17 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+storage_backends = ["mysql", "sqlite"]
+
+def storage_by_settings(config_dict):
+    backend = config_dict.get("backend", "mysql")
+    logger.debug(f"Selected '{backend}' storage backend.")
+    # Backends are imported on demand, so a SQLite deployment needs no MySQL driver.
+    if backend == "mysql":
+        from scrapper.storage.database import Database
+        return Database(config_dict)
+    if backend == "sqlite":
+        from scrapper.storage.sqlite import SqliteDatabase
+        return SqliteDatabase(config_dict)
+    raise ValueError(f"'{backend}' is not one of supported storage backends {storage_backends}.")
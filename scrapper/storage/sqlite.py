@@ -0,0 +1,517 @@
+import logging, sqlite3, threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from scrapper.enums.tasks import TaskKeys
+from scrapper.enums.results import ResultKeys
+from scrapper.enums.proxies import ProxyKeys
+from scrapper.enums.companies import CompanyKeys
+from scrapper.storage.storage import Storage, searched_result_keys
+
+logger = logging.getLogger(__name__)
+
+sqlite_datetime_format = '%Y-%m-%d %H:%M:%S'
+
+sqlite3.register_adapter(datetime, lambda date_time: date_time.strftime(sqlite_datetime_format))
+sqlite3.register_converter("DATETIME", lambda value: datetime.strptime(value.decode()[:19], sqlite_datetime_format))
+sqlite3.register_converter("BOOLEAN", lambda value: bool(int(value)))
+
+
+class SqliteDatabase(Storage):
+    my_results_search_table_name = f"{Storage.my_results_table_name}_fts"
+
+    def __init__(self, config_dict):
+        self.__database_path = config_dict.get("sqlite_path", f"{config_dict['database_name']}.sqlite3")
+        self.__busy_timeout_in_seconds = config_dict.get("busy_timeout_in_seconds", 30)
+        self.__bulk_batch_size = config_dict.get("bulk_batch_size", 500)
+        self.__local = threading.local()
+        self.__connections = []
+        self.__connections_lock = threading.Lock()
+        self.__upsert_statements = {}
+
+        self.migrate()
+
+    def connection(self):
+        # SQLite connections must not be shared between threads, so each worker gets its own.
+        my_database_connection = getattr(self.__local, "connection", None)
+        if my_database_connection is None:
+            logger.debug(f"Opening SQLite database at {self.__database_path}...")
+            my_database_connection = sqlite3.connect(self.__database_path,
+                                                     timeout=self.__busy_timeout_in_seconds,
+                                                     detect_types=sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES,
+                                                     cached_statements=256,
+                                                     check_same_thread=False)
+            my_database_connection.row_factory = sqlite3.Row
+            my_database_connection.execute("PRAGMA journal_mode=WAL;")
+            my_database_connection.execute("PRAGMA synchronous=NORMAL;")
+            self.__local.connection = my_database_connection
+            with self.__connections_lock:
+                self.__connections.append(my_database_connection)
+            logger.info(f"Opened SQLite database at {self.__database_path}.")
+        return my_database_connection
+
+    def close_thread_connection(self):
+        # Worker threads end after every batch, so their connections are closed instead of piling up.
+        my_database_connection = getattr(self.__local, "connection", None)
+        if my_database_connection is None:
+            return
+        del self.__local.connection
+        with self.__connections_lock:
+            self.__connections.remove(my_database_connection)
+        my_database_connection.close()
+        logger.debug(f"Closed SQLite database at {self.__database_path} for thread {threading.current_thread().name}.")
+
+    @contextmanager
+    def cursor(self):
+        my_database_connection = self.connection()
+        my_database_cursor = my_database_connection.cursor()
+        try:
+            yield my_database_cursor
+            my_database_connection.commit()
+        except Exception:
+            my_database_connection.rollback()
+            raise
+        finally:
+            my_database_cursor.close()
+
+    def recreate_tables(self):
+        with self.cursor() as my_database_cursor:
+            for table_name in [self.my_task_table_name, self.my_results_table_name, self.my_results_search_table_name,
+                               self.my_proxies_table_name, self.my_companies_table_name, self.my_schema_version_table_name]:
+                my_database_cursor.execute(f"DROP TABLE IF EXISTS {table_name};")
+        self.migrate()
+
+    def migrations(self):
+        return [
+            (1, "create tables", self.__create_tables),
+            # SQLite integers are 64 bit whatever their declared width, so there is nothing to widen.
+            (2, "widen task keys", lambda: None),
+            (3, "index tasks by due time", lambda: self.__create_index(self.my_task_table_name, "scrapping_datetime_index",
+                                                                       TaskKeys.scrapping_datetime.name)),
+            (4, "index results by task", lambda: self.__create_index(self.my_results_table_name, "task_number_index",
+                                                                     ResultKeys.task_number.name)),
+            (5, "add task leases", self.__add_task_leases),
+            (6, "add proxy health counters", self.__add_proxy_health_counters),
+            (7, "flag near-duplicate results", self.__add_near_duplicate_flags),
+            (8, "search results without company details", self.__reindex_searched_columns),
+            ]
+
+    def read_schema_version(self):
+        with self.cursor() as my_database_cursor:
+            my_database_cursor.execute(f"CREATE TABLE IF NOT EXISTS {self.my_schema_version_table_name} (" \
+                                       "version INTEGER PRIMARY KEY, " \
+                                       "description TEXT NOT NULL, " \
+                                       "applied_datetime DATETIME NOT NULL" \
+                                       ");")
+            my_database_cursor.execute(f"SELECT IFNULL(MAX(version), 0) FROM {self.my_schema_version_table_name};")
+            return my_database_cursor.fetchone()[0]
+
+    def write_schema_version(self, version, description):
+        with self.cursor() as my_database_cursor:
+            my_database_cursor.execute(f"INSERT INTO {self.my_schema_version_table_name} " \
+                                       "(version, description, applied_datetime) VALUES (?, ?, ?);",
+                                       (version, description, datetime.now()))
+
+    def __add_task_leases(self):
+        self.__create_column(self.my_task_table_name, TaskKeys.lease_owner.name, "TEXT NULL")
+        self.__create_column(self.my_task_table_name, TaskKeys.lease_expiry_datetime.name, "DATETIME NULL")
+
+    def __reindex_searched_columns(self):
+        search_table_name = self.my_results_search_table_name
+        with self.cursor() as my_database_cursor:
+            for trigger_action in ["insert", "delete", "update"]:
+                my_database_cursor.execute(f"DROP TRIGGER IF EXISTS {search_table_name}_{trigger_action};")
+            my_database_cursor.execute(f"DROP TABLE IF EXISTS {search_table_name};")
+        self.create_results_search_table()
+
+    def __add_near_duplicate_flags(self):
+        self.__create_column(self.my_results_table_name, ResultKeys.near_duplicate_of.name, "TEXT NULL")
+        # Signatures are now computed from word shingles, so older ones are recomputed on the next load.
+        with self.cursor() as my_database_cursor:
+            my_database_cursor.execute(f"UPDATE {self.my_results_table_name} SET {ResultKeys.title_signature.name}=NULL;")
+
+    def __add_proxy_health_counters(self):
+        for proxy_key in [ProxyKeys.successes_count, ProxyKeys.failures_count,
+                          ProxyKeys.captchas_count, ProxyKeys.consecutive_failures_count]:
+            self.__create_column(self.my_proxies_table_name, proxy_key.name, "INTEGER NOT NULL DEFAULT 0")
+
+    def __create_tables(self):
+        self.create_tasks_table()
+        self.create_companies_table()
+        self.create_results_table()
+        self.create_proxies_table()
+
+    def append_records(self, records_list, table_name, update_records=True, batch_size=None):
+        records_to_append_count = len(records_list)
+        if records_to_append_count == 0:
+            logger.debug("No records to append.")
+            return 0, 0
+        self.table_name(table_name)
+        logger.debug(f"Appending {records_to_append_count} records to table '{table_name}'...")
+
+        if not batch_size:
+            batch_size = self.__bulk_batch_size
+        value_names = tuple(records_list[0])
+        sql_query = self.__upsert_statement(table_name, value_names, update_records)
+        with self.cursor() as my_database_cursor:
+            my_database_cursor.execute("BEGIN IMMEDIATE;")
+            my_database_cursor.execute(f"SELECT IFNULL(MAX(rowid), 0) FROM {table_name};")
+            last_rowid = my_database_cursor.fetchone()[0]
+            for batch_start in range(0, records_to_append_count, batch_size):
+                records_batch = records_list[batch_start:batch_start + batch_size]
+                my_database_cursor.executemany(sql_query, [tuple(record[value_name] for value_name in value_names)
+                                                           for record in records_batch])
+            # New rows always get rowids above the previous maximum, so this range scan counts inserts.
+            my_database_cursor.execute(f"SELECT COUNT(*) FROM {table_name} WHERE rowid>?;", (last_rowid,))
+            records_appended_count = my_database_cursor.fetchone()[0]
+
+        records_updated_count = records_to_append_count - records_appended_count if update_records else 0
+        if records_appended_count != records_to_append_count:
+            logger.info("Appended {} from {} records and the rest has been {}.".format(records_appended_count, records_to_append_count, "updated" if update_records else "skipped"  ))
+        return records_appended_count, records_updated_count
+
+    def __upsert_statement(self, table_name, value_names, update_records):
+        statement_key = (table_name, value_names, update_records)
+        if statement_key not in self.__upsert_statements:
+            conflict_action = "DO NOTHING"
+            value_replacements = [f"{value_name}=excluded.{value_name}" for value_name in value_names
+                                  if value_name not in self.unique_columns[table_name]]
+            if update_records and value_replacements:
+                conflict_action = f"DO UPDATE SET {','.join(value_replacements)}"
+            self.__upsert_statements[statement_key] = \
+                f"INSERT INTO {table_name} " \
+                f"({','.join(value_names)}) " \
+                f"VALUES ({','.join(['?'] * len(value_names))}) " \
+                f"ON CONFLICT ({','.join(self.unique_columns[table_name])}) {conflict_action};"
+        return self.__upsert_statements[statement_key]
+
+    def records_count(self, table_name):
+        with self.cursor() as my_database_cursor:
+            my_database_cursor.execute(f"SELECT COUNT(*) FROM {self.table_name(table_name)};")
+            records_count = my_database_cursor.fetchone()[0]
+        logger.debug(f"Records count for table named '{table_name}' is {records_count}.")
+        return records_count
+
+    def read_result_keys(self, batch_size=10000):
+        sql_query = f"SELECT {ResultKeys.job_title.name}, {ResultKeys.company_name.name} " \
+                    f"FROM {self.my_results_table_name};"
+        my_database_cursor = self.connection().execute(sql_query)
+        try:
+            while True:
+                rows = my_database_cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield tuple(row)
+        finally:
+            my_database_cursor.close()
+
+    def read_result_signatures(self, batch_size=10000):
+        sql_query = f"SELECT {ResultKeys.job_title.name}, {ResultKeys.company_name.name}, " \
+                    f"{ResultKeys.title_signature.name} " \
+                    f"FROM {self.my_results_table_name} " \
+                    f"WHERE {ResultKeys.near_duplicate_of.name} IS NULL;"
+        my_database_cursor = self.connection().execute(sql_query)
+        try:
+            while True:
+                rows = my_database_cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield tuple(row)
+        finally:
+            my_database_cursor.close()
+
+    def search_results(self, query, limit=20, after=None):
+        # Every word is quoted, so the query is never parsed as FTS5 syntax, and joined with OR
+        # to rank partial matches like MySQL natural language mode does.
+        match_query = " OR ".join('"{}"'.format(word.replace('"', '""')) for word in query.split())
+        if not match_query:
+            return []
+        matches_query = f"SELECT {', '.join(self.result_columns())}, -bm25({self.my_results_search_table_name}) AS score " \
+                        f"FROM {self.my_results_search_table_name} " \
+                        f"JOIN {self.my_results_table_name} r " \
+                        f"ON r.{ResultKeys.result_number.name}={self.my_results_search_table_name}.rowid " \
+                        f"{self.companies_join()} " \
+                        f"WHERE {self.my_results_search_table_name} MATCH ?"
+        sql_query, values = self.search_page_query(matches_query, "?", limit, after)
+        with self.cursor() as my_database_cursor:
+            my_database_cursor.execute(sql_query, [match_query] + values)
+            search_results = [dict(row) for row in my_database_cursor.fetchall()]
+        logger.debug(f"Found {len(search_results)} results matching '{query}'.")
+        return search_results
+
+    def read_results_for_export(self, since=None, until=None, task_numbers=None, batch_size=10000):
+        sql_query, values = self.export_query("?", since, until, task_numbers)
+        my_database_cursor = self.connection().execute(sql_query, values)
+        try:
+            while True:
+                rows = my_database_cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield [dict(row) for row in rows]
+        finally:
+            my_database_cursor.close()
+
+    def read_task(self, task_number):
+        logger.info(f"Reading task number {task_number}...")
+        sql_query = f"SELECT * FROM {self.my_task_table_name} WHERE {TaskKeys.task_number.name}=?;"
+        with self.cursor() as my_database_cursor:
+            my_database_cursor.execute(sql_query, (task_number,))
+            row = my_database_cursor.fetchone()
+        return dict(row) if row else None
+
+    def due_tasks(self):
+        logger.debug(f"Preparing list of tasks due to scrapping...")
+        sql_query = f"SELECT * " \
+                    f"FROM {self.my_task_table_name} " \
+                    f"WHERE {TaskKeys.scrapping_datetime.name}<=? " \
+                    f"OR {TaskKeys.scrapping_datetime.name} IS NULL" \
+                    ";"
+        with self.cursor() as my_database_cursor:
+            my_database_cursor.execute(sql_query, (datetime.now(),))
+            tasks_list = [dict(row) for row in my_database_cursor.fetchall()]
+        logger.debug(f"Prepared list of {len(tasks_list)} tasks due to scrapping.")
+        return tasks_list
+
+    def next_due_datetime(self):
+        # A task can be claimed once it is due and its lease, if any, has expired.
+        sql_query = f"SELECT MIN(MAX(" \
+                    f"IFNULL({TaskKeys.scrapping_datetime.name}, '1000-01-01 00:00:00'), " \
+                    f"IFNULL({TaskKeys.lease_expiry_datetime.name}, '1000-01-01 00:00:00'))) " \
+                    f"AS \"next_due_datetime [DATETIME]\" " \
+                    f"FROM {self.my_task_table_name}" \
+                    ";"
+        with self.cursor() as my_database_cursor:
+            my_database_cursor.execute(sql_query)
+            next_due_datetime = my_database_cursor.fetchone()[0]
+        if next_due_datetime is None:
+            return None
+        return max(next_due_datetime, datetime.now())
+
+    def claim_due_tasks(self, lease_owner, tasks_count, lease_in_seconds):
+        now = datetime.now()
+        lease_expiry_datetime = now + timedelta(seconds=lease_in_seconds)
+        sql_query = f"SELECT * " \
+                    f"FROM {self.my_task_table_name} " \
+                    f"WHERE ({TaskKeys.scrapping_datetime.name}<=? OR {TaskKeys.scrapping_datetime.name} IS NULL) " \
+                    f"AND ({TaskKeys.lease_expiry_datetime.name} IS NULL OR {TaskKeys.lease_expiry_datetime.name}<=?) " \
+                    f"ORDER BY {TaskKeys.scrapping_datetime.name} " \
+                    f"LIMIT ?;"
+        with self.cursor() as my_database_cursor:
+            # SQLite has no row locks; the write lock taken up front makes select and update one atomic claim.
+            my_database_cursor.execute("BEGIN IMMEDIATE;")
+            my_database_cursor.execute(sql_query, (now, now, tasks_count))
+            tasks_list = [dict(row) for row in my_database_cursor.fetchall()]
+            if tasks_list:
+                task_numbers = [task_dict[TaskKeys.task_number.name] for task_dict in tasks_list]
+                my_database_cursor.execute(f"UPDATE {self.my_task_table_name} " \
+                                           f"SET {TaskKeys.lease_owner.name}=?, {TaskKeys.lease_expiry_datetime.name}=? " \
+                                           f"WHERE {TaskKeys.task_number.name} IN ({','.join(['?'] * len(task_numbers))});",
+                                           [lease_owner, lease_expiry_datetime] + task_numbers)
+        for task_dict in tasks_list:
+            task_dict[TaskKeys.lease_owner.name] = lease_owner
+            task_dict[TaskKeys.lease_expiry_datetime.name] = lease_expiry_datetime
+        logger.debug(f"Claimed {len(tasks_list)} due tasks for {lease_owner}.")
+        return tasks_list
+
+    def renew_task_leases(self, lease_owner, task_numbers, lease_in_seconds):
+        if not task_numbers:
+            return 0
+        lease_expiry_datetime = datetime.now() + timedelta(seconds=lease_in_seconds)
+        sql_query = f"UPDATE {self.my_task_table_name} " \
+                    f"SET {TaskKeys.lease_expiry_datetime.name}=? " \
+                    f"WHERE {TaskKeys.lease_owner.name}=? " \
+                    f"AND {TaskKeys.task_number.name} IN ({','.join(['?'] * len(task_numbers))});"
+        with self.cursor() as my_database_cursor:
+            my_database_cursor.execute(sql_query, [lease_expiry_datetime, lease_owner] + list(task_numbers))
+            return my_database_cursor.rowcount
+
+    def release_task_lease(self, lease_owner, task_number):
+        sql_query = f"UPDATE {self.my_task_table_name} " \
+                    f"SET {TaskKeys.lease_owner.name}=NULL, {TaskKeys.lease_expiry_datetime.name}=NULL " \
+                    f"WHERE {TaskKeys.task_number.name}=? AND {TaskKeys.lease_owner.name}=?;"
+        with self.cursor() as my_database_cursor:
+            my_database_cursor.execute(sql_query, (task_number, lease_owner))
+
+    def write_attribute_of_task(self, task_number, attribute_name, attribute_value):
+        logger.debug(f"Writing attribute by name '{attribute_name}' on task by number {task_number}...")
+        sql_query = f"UPDATE {self.my_task_table_name} " \
+                    f"SET {self.task_column_name(attribute_name)}=? " \
+                    f"WHERE {TaskKeys.task_number.name}=?;"
+        with self.cursor() as my_database_cursor:
+            my_database_cursor.execute(sql_query, (attribute_value, task_number))
+        logger.info(f"Wrote attribute by name '{attribute_name}' on task by number {task_number}.")
+
+    def read_attribute_of_task(self, task_number, attribute_name):
+        sql_query = f"SELECT {self.task_column_name(attribute_name)} " \
+                    f"FROM {self.my_task_table_name} " \
+                    f"WHERE {TaskKeys.task_number.name}=?;"
+        with self.cursor() as my_database_cursor:
+            my_database_cursor.execute(sql_query, (task_number,))
+            return my_database_cursor.fetchone()[0]
+
+    def read_company(self, normalized_company_name):
+        sql_query = f"SELECT * " \
+                    f"FROM {self.my_companies_table_name} " \
+                    f"WHERE {CompanyKeys.normalized_company_name.name}=?;"
+        with self.cursor() as my_database_cursor:
+            my_database_cursor.execute(sql_query, (normalized_company_name,))
+            row = my_database_cursor.fetchone()
+        return dict(row) if row else None
+
+    def read_company_numbers(self, normalized_company_names):
+        company_numbers = {}
+        if not normalized_company_names:
+            return company_numbers
+        value_placeholders = ",".join(["?"] * len(normalized_company_names))
+        sql_query = f"SELECT {CompanyKeys.normalized_company_name.name}, {CompanyKeys.company_number.name} " \
+                    f"FROM {self.my_companies_table_name} " \
+                    f"WHERE {CompanyKeys.normalized_company_name.name} IN ({value_placeholders});"
+        with self.cursor() as my_database_cursor:
+            my_database_cursor.execute(sql_query, list(normalized_company_names))
+            for normalized_company_name, company_number in my_database_cursor.fetchall():
+                company_numbers[normalized_company_name] = company_number
+        return company_numbers
+
+    def read_proxies(self):
+        with self.cursor() as my_database_cursor:
+            my_database_cursor.execute(f"SELECT * FROM {self.my_proxies_table_name};")
+            proxies_list = [dict(row) for row in my_database_cursor.fetchall()]
+        logger.debug(f"Read {len(proxies_list)} proxies.")
+        return proxies_list
+
+    def proxies_due_to_validation(self, validation_ttl_in_hours):
+        checked_before = datetime.now() - timedelta(hours=validation_ttl_in_hours)
+        sql_query = f"SELECT {ProxyKeys.proxy.name} " \
+                    f"FROM {self.my_proxies_table_name} " \
+                    f"WHERE {ProxyKeys.checked_datetime.name} IS NULL " \
+                    f"OR {ProxyKeys.checked_datetime.name}<?;"
+        with self.cursor() as my_database_cursor:
+            my_database_cursor.execute(sql_query, (checked_before,))
+            proxies_list = [row[0] for row in my_database_cursor.fetchall()]
+        logger.debug(f"Found {len(proxies_list)} proxies checked before {self.format_date_for_mysql(checked_before)}.")
+        return proxies_list
+
+    def create_tasks_table(self):
+        sql_query = f"CREATE TABLE IF NOT EXISTS {self.my_task_table_name} (" \
+                    f"{TaskKeys.task_number.name} INTEGER PRIMARY KEY, " \
+                    f"{TaskKeys.site_name.name} TEXT NOT NULL, " \
+                    f"{TaskKeys.search_keywords.name} TEXT NOT NULL, " \
+                    f"{TaskKeys.scrapping_link.name} TEXT NOT NULL, " \
+                    f"{TaskKeys.scrapping_period_in_hours.name} INTEGER NOT NULL, " \
+                    f"{TaskKeys.scrapping_datetime.name} DATETIME NULL, " \
+                    f"{TaskKeys.minimal_results_count.name} INTEGER DEFAULT 0, " \
+                    f"{TaskKeys.crawler_engine.name} TEXT NULL, " \
+                    f"{TaskKeys.max_results_count.name} INTEGER NOT NULL DEFAULT 10, " \
+                    f"{TaskKeys.max_result_pages_count.name} INTEGER NOT NULL DEFAULT 2, " \
+                    f"CONSTRAINT unique_task UNIQUE (" \
+                    f"{TaskKeys.search_keywords.name}, " \
+                    f"{TaskKeys.scrapping_link.name}" \
+                    ")" \
+                    ");"
+        self.__create_table(self.my_task_table_name, sql_query)
+
+    def create_results_table(self):
+        sql_query = f"CREATE TABLE IF NOT EXISTS {self.my_results_table_name} (" \
+                    f"{ResultKeys.result_number.name} INTEGER PRIMARY KEY, " \
+                    f"{ResultKeys.job_title.name} TEXT NOT NULL COLLATE NOCASE, " \
+                    f"{ResultKeys.application_link.name} TEXT, " \
+                    f"{ResultKeys.company_name.name} TEXT NOT NULL COLLATE NOCASE, " \
+                    f"{ResultKeys.company_size.name} TEXT, " \
+                    f"{ResultKeys.company_website.name} TEXT, " \
+                    f"{ResultKeys.company_number.name} INTEGER NULL, " \
+                    f"{ResultKeys.task_number.name} INTEGER NULL, " \
+                    f"{ResultKeys.scrapped_datetime.name} DATETIME NULL, " \
+                    f"{ResultKeys.title_signature.name} BLOB NULL, " \
+                    f"CONSTRAINT unique_application UNIQUE (" \
+                    f"{ResultKeys.job_title.name}, " \
+                    f"{ResultKeys.company_name.name}" \
+                    ")" \
+                    ");"
+        self.__create_table(self.my_results_table_name, sql_query)
+        self.__create_column(self.my_results_table_name, ResultKeys.task_number.name, "INTEGER NULL")
+        self.__create_column(self.my_results_table_name, ResultKeys.scrapped_datetime.name, "DATETIME NULL")
+        self.__create_column(self.my_results_table_name, ResultKeys.title_signature.name, "BLOB NULL")
+        self.__create_index(self.my_results_table_name, "company_number_index", ResultKeys.company_number.name)
+        self.__create_index(self.my_results_table_name, "scrapped_datetime_index", ResultKeys.scrapped_datetime.name)
+        self.create_results_search_table()
+
+    def create_results_search_table(self):
+        searched_columns = [result_key.name for result_key in searched_result_keys]
+        new_values = ", ".join(f"new.{column_name}" for column_name in searched_columns)
+        old_values = ", ".join(f"old.{column_name}" for column_name in searched_columns)
+        search_table_name = self.my_results_search_table_name
+        # External content table: FTS5 keeps only the index and triggers keep it in step with results.
+        with self.cursor() as my_database_cursor:
+            my_database_cursor.execute("SELECT COUNT(*) FROM sqlite_master WHERE name=?;", (search_table_name,))
+            is_search_table_created = my_database_cursor.fetchone()[0] > 0
+            my_database_cursor.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS {search_table_name} USING fts5(" \
+                                       f"{', '.join(searched_columns)}, " \
+                                       f"content='{self.my_results_table_name}', " \
+                                       f"content_rowid='{ResultKeys.result_number.name}');")
+            my_database_cursor.execute(f"CREATE TRIGGER IF NOT EXISTS {search_table_name}_insert " \
+                                       f"AFTER INSERT ON {self.my_results_table_name} BEGIN " \
+                                       f"INSERT INTO {search_table_name} (rowid, {', '.join(searched_columns)}) " \
+                                       f"VALUES (new.{ResultKeys.result_number.name}, {new_values}); " \
+                                       "END;")
+            my_database_cursor.execute(f"CREATE TRIGGER IF NOT EXISTS {search_table_name}_delete " \
+                                       f"AFTER DELETE ON {self.my_results_table_name} BEGIN " \
+                                       f"INSERT INTO {search_table_name} ({search_table_name}, rowid, {', '.join(searched_columns)}) " \
+                                       f"VALUES ('delete', old.{ResultKeys.result_number.name}, {old_values}); " \
+                                       "END;")
+            my_database_cursor.execute(f"CREATE TRIGGER IF NOT EXISTS {search_table_name}_update " \
+                                       f"AFTER UPDATE OF {', '.join(searched_columns)} ON {self.my_results_table_name} BEGIN " \
+                                       f"INSERT INTO {search_table_name} ({search_table_name}, rowid, {', '.join(searched_columns)}) " \
+                                       f"VALUES ('delete', old.{ResultKeys.result_number.name}, {old_values}); " \
+                                       f"INSERT INTO {search_table_name} (rowid, {', '.join(searched_columns)}) " \
+                                       f"VALUES (new.{ResultKeys.result_number.name}, {new_values}); " \
+                                       "END;")
+            if not is_search_table_created:
+                my_database_cursor.execute(f"INSERT INTO {search_table_name} ({search_table_name}) VALUES ('rebuild');")
+                logger.info(f"Built search index named '{search_table_name}'.")
+
+    def create_companies_table(self):
+        sql_query = f"CREATE TABLE IF NOT EXISTS {self.my_companies_table_name} (" \
+                    f"{CompanyKeys.company_number.name} INTEGER PRIMARY KEY, " \
+                    f"{CompanyKeys.normalized_company_name.name} TEXT NOT NULL, " \
+                    f"{CompanyKeys.company_name.name} TEXT NOT NULL, " \
+                    f"{CompanyKeys.company_size.name} TEXT, " \
+                    f"{CompanyKeys.company_website.name} TEXT, " \
+                    f"{CompanyKeys.refreshed_datetime.name} DATETIME NULL, " \
+                    f"CONSTRAINT unique_company UNIQUE ({CompanyKeys.normalized_company_name.name})" \
+                    ");"
+        self.__create_table(self.my_companies_table_name, sql_query)
+
+    def create_proxies_table(self):
+        sql_query = f"CREATE TABLE IF NOT EXISTS {self.my_proxies_table_name} (" \
+                    f"{ProxyKeys.proxy.name} TEXT NOT NULL PRIMARY KEY, " \
+                    f"{ProxyKeys.checked_datetime.name} DATETIME NULL, " \
+                    f"{ProxyKeys.latency_in_seconds.name} REAL NULL, " \
+                    f"{ProxyKeys.is_valid.name} BOOLEAN NULL" \
+                    ");"
+        self.__create_table(self.my_proxies_table_name, sql_query)
+        self.__create_index(self.my_proxies_table_name, "checked_datetime_index", ProxyKeys.checked_datetime.name)
+
+    def __create_table(self, table_name, sql_query):
+        with self.cursor() as my_database_cursor:
+            my_database_cursor.execute(sql_query)
+        logger.debug(f"Ensured table named '{table_name}' exists.")
+
+    def __create_column(self, table_name, column_name, column_definition):
+        with self.cursor() as my_database_cursor:
+            my_database_cursor.execute(f"PRAGMA table_info({table_name});")
+            if column_name in [row["name"] for row in my_database_cursor.fetchall()]:
+                return
+            my_database_cursor.execute(f"ALTER TABLE {table_name} ADD COLUMN {column_name} {column_definition};")
+        logger.info(f"Created column named '{column_name}' in table named '{table_name}'.")
+
+    def __create_index(self, table_name, index_name, column_names):
+        with self.cursor() as my_database_cursor:
+            my_database_cursor.execute(f"CREATE INDEX IF NOT EXISTS {index_name} ON {table_name} ({column_names});")
+
+    def __del__(self):
+        with self.__connections_lock:
+            for my_database_connection in self.__connections:
+                my_database_connection.close()
+            self.__connections.clear()
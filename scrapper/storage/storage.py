@@ -0,0 +1,250 @@
+import logging
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+
+from scrapper.enums.tasks import TaskKeys
+from scrapper.enums.results import ResultKeys
+from scrapper.enums.proxies import ProxyKeys
+from scrapper.enums.companies import CompanyKeys
+
+logger = logging.getLogger(__name__)
+
+exported_result_keys = [result_key for result_key in ResultKeys if result_key is not ResultKeys.title_signature]
+
+# Results keep company details only from before the companies table, which now holds them.
+company_result_keys = {ResultKeys.company_size: CompanyKeys.company_size,
+                       ResultKeys.company_website: CompanyKeys.company_website}
+
+# Company details are not indexed, since results no longer keep them.
+searched_result_keys = [ResultKeys.job_title, ResultKeys.company_name]
+
+
+class Storage(ABC):
+    my_task_table_name = "tasks"
+    my_results_table_name = "results"
+    my_proxies_table_name = "proxies"
+    my_companies_table_name = "companies"
+    my_schema_version_table_name = "schema_version"
+
+    # Columns of the unique key every table is upserted by.
+    unique_columns = {
+        my_task_table_name: (TaskKeys.search_keywords.name, TaskKeys.scrapping_link.name),
+        my_results_table_name: (ResultKeys.job_title.name, ResultKeys.company_name.name),
+        my_companies_table_name: (CompanyKeys.normalized_company_name.name,),
+        my_proxies_table_name: (ProxyKeys.proxy.name,),
+        }
+
+    @abstractmethod
+    def migrations(self):
+        pass
+
+    @abstractmethod
+    def read_schema_version(self):
+        pass
+
+    @abstractmethod
+    def write_schema_version(self, version, description):
+        pass
+
+    @abstractmethod
+    def recreate_tables(self):
+        pass
+
+    @abstractmethod
+    def append_records(self, records_list, table_name, update_records=True, batch_size=None):
+        pass
+
+    @abstractmethod
+    def records_count(self, table_name):
+        pass
+
+    @abstractmethod
+    def read_result_keys(self, batch_size=10000):
+        pass
+
+    @abstractmethod
+    def read_result_signatures(self, batch_size=10000):
+        pass
+
+    @abstractmethod
+    def read_results_for_export(self, since=None, until=None, task_numbers=None, batch_size=10000):
+        pass
+
+    @abstractmethod
+    def search_results(self, query, limit=20, after=None):
+        pass
+
+    @abstractmethod
+    def read_task(self, task_number):
+        pass
+
+    @abstractmethod
+    def due_tasks(self):
+        pass
+
+    @abstractmethod
+    def next_due_datetime(self):
+        pass
+
+    @abstractmethod
+    def claim_due_tasks(self, lease_owner, tasks_count, lease_in_seconds):
+        pass
+
+    @abstractmethod
+    def renew_task_leases(self, lease_owner, task_numbers, lease_in_seconds):
+        pass
+
+    @abstractmethod
+    def release_task_lease(self, lease_owner, task_number):
+        pass
+
+    @abstractmethod
+    def write_attribute_of_task(self, task_number, attribute_name, attribute_value):
+        pass
+
+    @abstractmethod
+    def read_attribute_of_task(self, task_number, attribute_name):
+        pass
+
+    @abstractmethod
+    def read_company(self, normalized_company_name):
+        pass
+
+    @abstractmethod
+    def read_company_numbers(self, normalized_company_names):
+        pass
+
+    @abstractmethod
+    def read_proxies(self):
+        pass
+
+    @abstractmethod
+    def proxies_due_to_validation(self, validation_ttl_in_hours):
+        pass
+
+    def close_thread_connection(self):
+        # Pooled connections go back to the pool after every query, so there is nothing left to close.
+        pass
+
+    def migrate(self):
+        # Every step runs once, in order, and is recorded so the next start continues after it.
+        schema_version = self.read_schema_version()
+        for version, description, upgrade in self.migrations():
+            if version <= schema_version:
+                continue
+            logger.info(f"Migrating schema to version {version}: {description}...")
+            upgrade()
+            self.write_schema_version(version, description)
+            schema_version = version
+        logger.debug(f"Schema is at version {schema_version}.")
+
+    def table_name(self, table_name):
+        if table_name not in [self.my_task_table_name, self.my_results_table_name,
+                              self.my_proxies_table_name, self.my_companies_table_name]:
+            raise ValueError(f"'{table_name}' is not a scrapper table.")
+        return table_name
+
+    def task_column_name(self, attribute_name):
+        # Column names cannot be query parameters, so they are checked against known task keys.
+        if attribute_name not in TaskKeys.__members__:
+            raise ValueError(f"'{attribute_name}' is not a task attribute.")
+        return attribute_name
+
+    def append_result(self, result_dict):
+        self.append_results([result_dict])
+
+    def append_results(self, results_list):
+        return self.append_records(results_list, self.my_results_table_name)
+
+    def append_record(self, records_dict, table_name):
+        return self.append_records([records_dict], table_name)
+
+    def append_task(self, task_dict):
+        self.append_tasks([task_dict])
+
+    def append_tasks(self, tasks_list):
+        return self.append_records(tasks_list, self.my_task_table_name)
+
+    def append_companies(self, companies_list, update_records=True):
+        return self.append_records(companies_list, self.my_companies_table_name, update_records)
+
+    def append_proxies(self, proxies_list):
+        proxies_records = [{ProxyKeys.proxy.name: proxy} for proxy in proxies_list]
+        return self.append_records(proxies_records, self.my_proxies_table_name, update_records=False)
+
+    def write_proxy_checks(self, proxies_records):
+        return self.append_records(proxies_records, self.my_proxies_table_name)
+
+    def set_new_due_time_on_task(self, task_number):
+        logger.debug(f"Setting new due time for task by number {task_number}...")
+        current_due_time = self.read_attribute_of_task(task_number, TaskKeys.scrapping_datetime.name)
+        scrapping_period_in_hours = self.read_attribute_of_task(task_number, TaskKeys.scrapping_period_in_hours.name)
+        new_due_time = datetime.now() + timedelta(hours=scrapping_period_in_hours)
+        self.write_attribute_of_task(task_number, TaskKeys.scrapping_datetime.name, new_due_time)
+        logger.debug(f"Set new due time {self.format_date_for_mysql(new_due_time)} " \
+                     f"from old {self.format_date_for_mysql(current_due_time)} " \
+                     f"on task by number {task_number}.")
+
+    def expected_results_count(self, task_number):
+        expected_results_count = self.read_attribute_of_task \
+            (task_number, TaskKeys.minimal_results_count.name)
+
+        if not expected_results_count:
+            expected_results_count = 0
+        return expected_results_count
+
+    def result_columns(self):
+        # Selected from results r joined by companies_join, so company details come from companies c.
+        return [f"COALESCE(c.{company_result_keys[result_key].name}, r.{result_key.name}) AS {result_key.name}"
+                if result_key in company_result_keys else f"r.{result_key.name}"
+                for result_key in exported_result_keys]
+
+    def companies_join(self):
+        return f"LEFT JOIN {self.my_companies_table_name} c " \
+               f"ON c.{CompanyKeys.company_number.name}=r.{ResultKeys.company_number.name}"
+
+    def export_query(self, placeholder, since=None, until=None, task_numbers=None):
+        result_columns = self.result_columns()
+        task_columns = [f"t.{TaskKeys.site_name.name}", f"t.{TaskKeys.search_keywords.name}"]
+        conditions = []
+        values = []
+        if since is not None:
+            conditions.append(f"r.{ResultKeys.scrapped_datetime.name}>={placeholder}")
+            values.append(since)
+        if until is not None:
+            conditions.append(f"r.{ResultKeys.scrapped_datetime.name}<{placeholder}")
+            values.append(until)
+        if task_numbers:
+            conditions.append(f"r.{ResultKeys.task_number.name} IN ({','.join([placeholder] * len(task_numbers))})")
+            values.extend(task_numbers)
+        sql_query = f"SELECT {', '.join(result_columns + task_columns)} " \
+                    f"FROM {self.my_results_table_name} r " \
+                    f"LEFT JOIN {self.my_task_table_name} t " \
+                    f"ON t.{TaskKeys.task_number.name}=r.{ResultKeys.task_number.name} " \
+                    f"{self.companies_join()}"
+        if conditions:
+            sql_query += f" WHERE {' AND '.join(conditions)}"
+        return sql_query + ";", values
+
+    def search_page_query(self, matches_query, placeholder, limit, after=None):
+        # Keyset pagination: the next page starts after the (score, result_number) of the last row,
+        # so deep pages cost the same as the first one instead of skipping rows like OFFSET does.
+        values = []
+        sql_query = f"SELECT * FROM ({matches_query}) matches"
+        if after is not None:
+            sql_query += f" WHERE score<{placeholder} " \
+                         f"OR (score={placeholder} AND {ResultKeys.result_number.name}<{placeholder})"
+            values.extend([after[0], after[0], after[1]])
+        sql_query += f" ORDER BY score DESC, {ResultKeys.result_number.name} DESC LIMIT {placeholder};"
+        values.append(limit)
+        return sql_query, values
+
+    def next_search_page(self, search_results):
+        if not search_results:
+            return None
+        return search_results[-1]["score"], search_results[-1][ResultKeys.result_number.name]
+
+    def format_date_for_mysql(self, date_time):
+        if date_time is None:
+            return ''
+        return date_time.strftime('%Y-%m-%d %H:%M:%S')
@@ -0,0 +1,77 @@
+import logging, re
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from scrapper.enums.companies import CompanyKeys
+from scrapper.enums.results import ResultKeys
+
+logger = logging.getLogger(__name__)
+
+whitespace_pattern = re.compile(r"\s+")
+
+
+def normalized_company_name(company_name):
+    return whitespace_pattern.sub(" ", company_name or "").strip().casefold()
+
+
+class Companies():
+    def __init__(self, database, refresh_ttl_in_days=30, cache_size=1024):
+        self.__database = database
+        self.__refresh_ttl = timedelta(days=refresh_ttl_in_days)
+        self.__cache_size = cache_size
+        self.__cache = OrderedDict()
+
+    def company(self, company_name, allow_stale=False):
+        company_dict = self.__cached_company(normalized_company_name(company_name))
+        if not company_dict:
+            return None
+        if not allow_stale and not self.is_fresh(company_dict):
+            return None
+        return company_dict
+
+    def is_fresh(self, company_dict):
+        refreshed_datetime = company_dict[CompanyKeys.refreshed_datetime.name]
+        return refreshed_datetime is not None and datetime.now() - refreshed_datetime < self.__refresh_ttl
+
+    def save_companies(self, results):
+        refreshed_companies = OrderedDict()
+        new_companies = OrderedDict()
+        for result in results:
+            company_name = result[ResultKeys.company_name.name]
+            company_key = normalized_company_name(company_name)
+            company_dict = {
+                CompanyKeys.normalized_company_name.name: company_key,
+                CompanyKeys.company_name.name: company_name,
+                CompanyKeys.company_size.name: result.get(ResultKeys.company_size.name),
+                CompanyKeys.company_website.name: result.get(ResultKeys.company_website.name),
+                CompanyKeys.refreshed_datetime.name: datetime.now(),
+                }
+            cached_company_dict = self.company(company_name)
+            if cached_company_dict and \
+               cached_company_dict[CompanyKeys.company_size.name] == company_dict[CompanyKeys.company_size.name] and \
+               cached_company_dict[CompanyKeys.company_website.name] == company_dict[CompanyKeys.company_website.name]:
+                continue
+            if company_dict[CompanyKeys.company_size.name] or company_dict[CompanyKeys.company_website.name]:
+                refreshed_companies[company_key] = company_dict
+            else:
+                company_dict[CompanyKeys.refreshed_datetime.name] = None
+                new_companies[company_key] = company_dict
+
+        self.__database.append_companies(list(refreshed_companies.values()))
+        self.__database.append_companies(list(new_companies.values()), update_records=False)
+        for company_key in list(refreshed_companies) + list(new_companies):
+            self.__cache.pop(company_key, None)
+
+        company_keys = {normalized_company_name(result[ResultKeys.company_name.name]) for result in results}
+        return self.__database.read_company_numbers(company_keys)
+
+    def __cached_company(self, company_key):
+        if company_key in self.__cache:
+            self.__cache.move_to_end(company_key)
+            return self.__cache[company_key]
+
+        company_dict = self.__database.read_company(company_key)
+        self.__cache[company_key] = company_dict
+        if len(self.__cache) > self.__cache_size:
+            self.__cache.popitem(last=False)
+        return company_dict
@@ -0,0 +1,309 @@
+import logging, select, socket, socketserver, threading, time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class UpstreamError(Exception):
+    def __init__(self,*args,**kwargs):
+        Exception.__init__(self,*args,**kwargs)
+
+
+class TargetError(Exception):
+    def __init__(self, status_line):
+        Exception.__init__(self, f"Upstream proxy answered '{status_line}'.")
+        self.status_line = status_line
+
+
+class ForwardProxyHandler(socketserver.BaseRequestHandler):
+    max_request_head_size = 65536
+
+    def handle(self):
+        request_head, request_rest = self.__read_request_head()
+        if not request_head:
+            return
+
+        request_line = request_head.split(b"\r\n", 1)[0].decode("latin-1")
+        try:
+            method, target, version = request_line.split(" ", 2)
+        except ValueError:
+            self.__send_error(400, "Bad Request")
+            return
+
+        if method.upper() == "CONNECT":
+            self.server.forward_proxy.tunnel(self.request, target)
+        else:
+            self.server.forward_proxy.forward(self.request, target, request_head + request_rest)
+
+    def __read_request_head(self):
+        data = b""
+        while b"\r\n\r\n" not in data:
+            chunk = self.request.recv(4096)
+            if not chunk:
+                return b"", b""
+            data += chunk
+            if len(data) > self.max_request_head_size:
+                self.__send_error(431, "Request Header Fields Too Large")
+                return b"", b""
+        request_head, request_rest = data.split(b"\r\n\r\n", 1)
+        return request_head + b"\r\n\r\n", request_rest
+
+    def __send_error(self, status_code, reason):
+        self.request.sendall(f"HTTP/1.1 {status_code} {reason}\r\nContent-Length: 0\r\n\r\n".encode("latin-1"))
+
+
+class ForwardProxyServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class ForwardProxy():
+    def __init__(self, proxies, host="127.0.0.1", port=0, pooled_connections_count=4,
+                 connect_timeout_in_seconds=5, max_upstream_switches=3, idle_connection_ttl_in_seconds=30,
+                 blocked_domains=None):
+        self.__proxies = proxies
+        self.__blocked_domains = frozenset(blocked_domain.lower() for blocked_domain in blocked_domains or [])
+        self.__pooled_connections_count = pooled_connections_count
+        self.__connect_timeout_in_seconds = connect_timeout_in_seconds
+        self.__max_upstream_switches = max_upstream_switches
+        self.__idle_connection_ttl_in_seconds = idle_connection_ttl_in_seconds
+        self.__upstream_proxy = None
+        self.__idle_connections = deque()
+        self.__active_sockets = set()
+        self.__lock = threading.RLock()
+        self.__pool_condition = threading.Condition(self.__lock)
+        self.__is_running = False
+        self.__server = ForwardProxyServer((host, port), ForwardProxyHandler)
+        self.__server.forward_proxy = self
+
+    @property
+    def address(self):
+        host, port = self.__server.server_address
+        return f"{host}:{port}"
+
+    def start(self):
+        logger.debug("Starting forward proxy...")
+        self.__is_running = True
+        threading.Thread(target=self.__server.serve_forever, name="forward-proxy", daemon=True).start()
+        threading.Thread(target=self.__fill_pool, name="forward-proxy-pool", daemon=True).start()
+        logger.info(f"Started forward proxy at {self.address}.")
+
+    def stop(self):
+        logger.debug("Stopping forward proxy...")
+        with self.__lock:
+            self.__is_running = False
+            self.__pool_condition.notify_all()
+        self.__server.shutdown()
+        self.__server.server_close()
+        self.__close_connections()
+        if self.__upstream_proxy:
+            self.__proxies.release(self.__upstream_proxy)
+        logger.info(f"Stopped forward proxy at {self.address}.")
+
+    def upstream_proxy(self):
+        with self.__lock:
+            if self.__upstream_proxy:
+                return self.__upstream_proxy
+
+        # Picking a proxy may validate it over the network, so it happens outside the lock.
+        # No proxy is left as None, so the next request tries to pick one again.
+        upstream_proxy = self.__proxies.next_valid_proxy() or None
+        with self.__lock:
+            if self.__upstream_proxy is None and upstream_proxy:
+                self.__upstream_proxy = upstream_proxy
+                logger.info(f"Forward proxy uses upstream proxy '{self.__upstream_proxy}'.")
+                self.__pool_condition.notify_all()
+            elif upstream_proxy and upstream_proxy != self.__upstream_proxy:
+                # Another connection picked an upstream proxy meanwhile.
+                self.__proxies.release(upstream_proxy)
+            return self.__upstream_proxy
+
+    def switch_upstream(self, is_captcha=False):
+        with self.__lock:
+            upstream_proxy = self.__upstream_proxy
+            if upstream_proxy:
+                if is_captcha:
+                    self.__proxies.report_captcha(upstream_proxy)
+                else:
+                    self.__proxies.report_failure(upstream_proxy)
+            self.__upstream_proxy = None
+            self.__close_connections()
+        logger.info(f"Forward proxy drops upstream proxy '{upstream_proxy}'.")
+        return self.upstream_proxy()
+
+    def report_success(self):
+        with self.__lock:
+            if self.__upstream_proxy:
+                self.__proxies.report_success(self.__upstream_proxy)
+
+    def tunnel(self, client_socket, target):
+        if self.__is_blocked(target):
+            self.__refuse(client_socket, target)
+            return
+        for upstream_switch in range(self.__max_upstream_switches + 1):
+            upstream_proxy = self.upstream_proxy()
+            try:
+                if upstream_proxy:
+                    upstream_socket = self.__upstream_connection(upstream_proxy)
+                    self.__connect_through_upstream(upstream_socket, target)
+                else:
+                    upstream_socket = self.__open_connection(target)
+            except TargetError as err:
+                # The upstream proxy works but cannot reach this target, so only this client gets the error.
+                logger.warning(f"Cannot tunnel to {target} through '{upstream_proxy}': {err}")
+                client_socket.sendall(f"{err.status_line}\r\nContent-Length: 0\r\n\r\n".encode("latin-1"))
+                return
+            except (OSError, UpstreamError) as err:
+                logger.warning(f"Cannot tunnel to {target} through '{upstream_proxy}': {err}")
+                if upstream_proxy and upstream_proxy == self.__upstream_proxy:
+                    self.switch_upstream()
+                continue
+
+            client_socket.sendall(b"HTTP/1.1 200 Connection established\r\n\r\n")
+            self.__relay(client_socket, upstream_socket)
+            return
+
+        client_socket.sendall(b"HTTP/1.1 502 Bad Gateway\r\nContent-Length: 0\r\n\r\n")
+
+    def forward(self, client_socket, target, request_data):
+        if self.__is_blocked(self.__target_address(target)):
+            self.__refuse(client_socket, target)
+            return
+        for upstream_switch in range(self.__max_upstream_switches + 1):
+            upstream_proxy = self.upstream_proxy()
+            try:
+                if upstream_proxy:
+                    upstream_socket = self.__upstream_connection(upstream_proxy)
+                else:
+                    upstream_socket = self.__open_connection(self.__target_address(target))
+                upstream_socket.sendall(request_data)
+            except OSError as err:
+                logger.warning(f"Cannot forward request to {target} through '{upstream_proxy}': {err}")
+                if upstream_proxy and upstream_proxy == self.__upstream_proxy:
+                    self.switch_upstream()
+                continue
+
+            self.__relay(client_socket, upstream_socket)
+            return
+
+        client_socket.sendall(b"HTTP/1.1 502 Bad Gateway\r\nContent-Length: 0\r\n\r\n")
+
+    def __is_blocked(self, target_address):
+        # Browser DNS overrides do not apply behind a proxy, so blocked domains are refused here,
+        # subdomains included, before any connection leaves the machine.
+        if not self.__blocked_domains:
+            return False
+        domain_labels = target_address.rsplit(":", 1)[0].strip("[]").lower().split(".")
+        return any(".".join(domain_labels[start:]) in self.__blocked_domains for start in range(len(domain_labels)))
+
+    def __refuse(self, client_socket, target):
+        logger.debug(f"Refused request to blocked {target}.")
+        client_socket.sendall(b"HTTP/1.1 403 Forbidden\r\nContent-Length: 0\r\n\r\n")
+
+    def __connect_through_upstream(self, upstream_socket, target):
+        upstream_socket.sendall(f"CONNECT {target} HTTP/1.1\r\nHost: {target}\r\n\r\n".encode("latin-1"))
+        response_head = b""
+        while b"\r\n\r\n" not in response_head:
+            chunk = upstream_socket.recv(4096)
+            if not chunk:
+                upstream_socket.close()
+                raise UpstreamError("Upstream proxy closed connection.")
+            response_head += chunk
+        status_line = response_head.split(b"\r\n", 1)[0].decode("latin-1")
+        status_parts = status_line.split(" ")
+        if len(status_parts) < 2 or not status_parts[1].isdigit() or status_parts[1] == "407":
+            upstream_socket.close()
+            raise UpstreamError(f"Upstream proxy answered '{status_line}'.")
+        if status_parts[1] != "200":
+            upstream_socket.close()
+            raise TargetError(status_line)
+
+    def __upstream_connection(self, upstream_proxy):
+        with self.__lock:
+            while self.__idle_connections:
+                connection_proxy, connected_at, upstream_socket = self.__idle_connections.popleft()
+                if connection_proxy == upstream_proxy and \
+                   time.monotonic() - connected_at < self.__idle_connection_ttl_in_seconds and \
+                   not self.__is_closed(upstream_socket):
+                    self.__pool_condition.notify_all()
+                    return upstream_socket
+                upstream_socket.close()
+            self.__pool_condition.notify_all()
+        return self.__open_connection(upstream_proxy)
+
+    def __open_connection(self, address):
+        host, port = address.rsplit(":", 1)
+        # The timeout also covers the CONNECT handshake, so a silent upstream proxy fails instead of hanging.
+        return socket.create_connection((host, int(port)), timeout=self.__connect_timeout_in_seconds)
+
+    def __target_address(self, target):
+        host_port = target.split("://", 1)[-1].split("/", 1)[0]
+        if ":" not in host_port:
+            host_port += ":80"
+        return host_port
+
+    def __is_closed(self, upstream_socket):
+        readable, _, _ = select.select([upstream_socket], [], [], 0)
+        return bool(readable)
+
+    def __fill_pool(self):
+        while True:
+            with self.__lock:
+                while self.__is_running and \
+                      (not self.__upstream_proxy or len(self.__idle_connections) >= self.__pooled_connections_count):
+                    self.__pool_condition.wait(self.__idle_connection_ttl_in_seconds)
+                    self.__drop_expired_connections()
+                if not self.__is_running:
+                    return
+                upstream_proxy = self.__upstream_proxy
+
+            try:
+                upstream_socket = self.__open_connection(upstream_proxy)
+            except OSError as err:
+                logger.debug(f"Cannot pool connection to '{upstream_proxy}': {err}")
+                time.sleep(1)
+                continue
+
+            with self.__lock:
+                if upstream_proxy == self.__upstream_proxy and self.__is_running:
+                    self.__idle_connections.append((upstream_proxy, time.monotonic(), upstream_socket))
+                else:
+                    upstream_socket.close()
+
+    def __drop_expired_connections(self):
+        now = time.monotonic()
+        while self.__idle_connections and now - self.__idle_connections[0][1] >= self.__idle_connection_ttl_in_seconds:
+            self.__idle_connections.popleft()[2].close()
+
+    def __close_connections(self):
+        with self.__lock:
+            while self.__idle_connections:
+                self.__idle_connections.popleft()[2].close()
+            for active_socket in list(self.__active_sockets):
+                try:
+                    active_socket.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+
+    def __relay(self, client_socket, upstream_socket):
+        upstream_socket.settimeout(None)
+        with self.__lock:
+            self.__active_sockets.add(upstream_socket)
+        try:
+            sockets = [client_socket, upstream_socket]
+            while True:
+                readable, _, errored = select.select(sockets, [], sockets, 60)
+                if errored or not readable:
+                    break
+                for readable_socket in readable:
+                    data = readable_socket.recv(65536)
+                    if not data:
+                        return
+                    other_socket = upstream_socket if readable_socket is client_socket else client_socket
+                    other_socket.sendall(data)
+        except OSError:
+            pass
+        finally:
+            with self.__lock:
+                self.__active_sockets.discard(upstream_socket)
+            upstream_socket.close()
@@ -0,0 +1,23 @@
+import re
+
+
+class KeywordMatcher():
+    def __init__(self, keywords, ignore_case=False):
+        self.keywords = [keyword for keyword in keywords if keyword]
+        self.__pattern = None
+        if self.keywords:
+            # One alternation scans each text once, whatever the number of keywords. Lookarounds
+            # instead of \b keep keywords such as "C++" matching as whole words too.
+            alternation = "|".join(re.escape(keyword) for keyword in self.keywords)
+            self.__pattern = re.compile(rf"(?<!\w)(?:{alternation})(?!\w)", re.IGNORECASE if ignore_case else 0)
+
+    def __bool__(self):
+        return self.__pattern is not None
+
+    def matches(self, text):
+        if self.__pattern is None or not isinstance(text, str):
+            return False
+        return self.__pattern.search(text) is not None
+
+    def matches_any(self, texts):
+        return any(self.matches(text) for text in texts)
@@ -0,0 +1,31 @@
+import hashlib, logging, time
+
+from scrapper.enums.results import ResultKeys
+
+logger = logging.getLogger(__name__)
+
+
+def result_key(job_title, company_name):
+    # MySQL compares the unique_application key case-insensitively, so the index does too.
+    key_text = f"{(job_title or '').strip().casefold()}\x1f{(company_name or '').strip().casefold()}"
+    return int.from_bytes(hashlib.blake2b(key_text.encode(), digest_size=8).digest(), "big")
+
+
+class KnownResults():
+    def __init__(self, database):
+        self.__keys = set()
+        logger.debug("Loading known results...")
+        started_at = time.monotonic()
+        for job_title, company_name in database.read_result_keys():
+            self.__keys.add(result_key(job_title, company_name))
+        logger.info(f"Loaded {len(self.__keys)} known results in {time.monotonic() - started_at:.1f} seconds.")
+
+    def __len__(self):
+        return len(self.__keys)
+
+    def contains(self, job_title, company_name):
+        return result_key(job_title, company_name) in self.__keys
+
+    def add_results(self, results):
+        for result in results:
+            self.__keys.add(result_key(result[ResultKeys.job_title.name], result[ResultKeys.company_name.name]))
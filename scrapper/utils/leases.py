@@ -0,0 +1,64 @@
+import logging, os, socket, threading, uuid
+
+from scrapper.enums.tasks import TaskKeys
+
+logger = logging.getLogger(__name__)
+
+
+def lease_owner_name():
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class LeaseKeeper():
+    def __init__(self, database, lease_in_seconds=600, renew_interval_in_seconds=120, lease_owner=None):
+        self.lease_owner = lease_owner or lease_owner_name()
+        self.lease_in_seconds = lease_in_seconds
+        self.__database = database
+        self.__renew_interval_in_seconds = renew_interval_in_seconds
+        self.__task_numbers = set()
+        self.__lock = threading.Lock()
+        self.__stop_event = threading.Event()
+        self.__thread = None
+
+    def start(self):
+        self.__thread = threading.Thread(target=self.__renew_leases, name="lease-keeper", daemon=True)
+        self.__thread.start()
+        logger.info(f"Leasing tasks as {self.lease_owner}.")
+
+    def stop(self):
+        self.__stop_event.set()
+        if self.__thread:
+            self.__thread.join()
+
+    def claim(self, tasks_count):
+        tasks_list = self.__database.claim_due_tasks(self.lease_owner, tasks_count, self.lease_in_seconds)
+        with self.__lock:
+            self.__task_numbers.update(task_dict[TaskKeys.task_number.name] for task_dict in tasks_list)
+        return tasks_list
+
+    def release(self, task_number):
+        with self.__lock:
+            self.__task_numbers.discard(task_number)
+        self.__database.release_task_lease(self.lease_owner, task_number)
+
+    def abandon_all(self):
+        # Leases that are no longer renewed expire, so other nodes retry those tasks after a lease period.
+        with self.__lock:
+            if self.__task_numbers:
+                logger.info(f"Abandoning leases of tasks {sorted(self.__task_numbers)}.")
+            self.__task_numbers.clear()
+
+    def __renew_leases(self):
+        while not self.__stop_event.wait(self.__renew_interval_in_seconds):
+            with self.__lock:
+                task_numbers = list(self.__task_numbers)
+            if not task_numbers:
+                continue
+            try:
+                renewed_count = self.__database.renew_task_leases(self.lease_owner, task_numbers, self.lease_in_seconds)
+            except Exception:
+                logger.exception("Cannot renew task leases.")
+                continue
+            if renewed_count < len(task_numbers):
+                logger.warning(f"Renewed {renewed_count} of {len(task_numbers)} task leases, " \
+                               f"the rest expired and may be run by another node.")
@@ -0,0 +1,132 @@
+import hashlib, logging, re, struct, threading, time
+
+from scrapper.enums.results import ResultKeys
+from scrapper.utils.companies import normalized_company_name
+
+logger = logging.getLogger(__name__)
+
+non_word_pattern = re.compile(r"[\W_]+")
+
+title_abbreviations = {
+    "sr": "senior",
+    "snr": "senior",
+    "jr": "junior",
+    "jnr": "junior",
+    "mgr": "manager",
+    "eng": "engineer",
+    "engr": "engineer",
+    "dev": "developer",
+    "assoc": "associate",
+    "asst": "assistant",
+    }
+
+
+def normalized_job_title(job_title):
+    words = non_word_pattern.sub(" ", job_title or "").casefold().split()
+    return " ".join(title_abbreviations.get(word, word) for word in words)
+
+
+roman_numeral_pattern = re.compile(r"^(?=[ivx])x{0,3}(ix|iv|v?i{0,3})$")
+
+
+def title_shingles(normalized_title):
+    # Whole words rather than character runs, so "java developer" and "javascript developer" share little.
+    return set(normalized_title.split()) or {""}
+
+
+def title_levels(normalized_title):
+    # Numbers and roman numerals tell levels or editions apart, so titles that differ in them never match.
+    return " ".join(sorted(word for word in normalized_title.split()
+                           if any(character.isdigit() for character in word) or roman_numeral_pattern.match(word)))
+
+
+class NearDuplicates():
+    def __init__(self, database, similarity_threshold=0.9, bands=8, rows=8):
+        self.__similarity_threshold = similarity_threshold
+        self.__bands = bands
+        self.__rows = rows
+        self.__band_index = {}
+        self.__titles = []
+        self.__signatures = []
+        self.__lock = threading.Lock()
+
+        logger.debug("Loading signatures of known results...")
+        started_at = time.monotonic()
+        computed_signatures_count = 0
+        for job_title, company_name, signature in database.read_result_signatures():
+            if not signature or len(signature) != bands * rows:
+                signature = self.signature(job_title)
+                computed_signatures_count += 1
+            self.__add(job_title, normalized_company_name(company_name), bytes(signature))
+        logger.info(f"Loaded {len(self.__titles)} result signatures in {time.monotonic() - started_at:.1f} seconds, " \
+                    f"{computed_signatures_count} of them computed from stored titles.")
+
+    def __len__(self):
+        return len(self.__titles)
+
+    def signature(self, job_title):
+        # Every little-endian 32 bit word of a shingle's extendable output acts as one independent hash function,
+        # so signatures stored by one machine match those computed on another.
+        hashes_count = self.__bands * self.__rows
+        shingle_hashes = [struct.unpack(f"<{hashes_count}I", hashlib.shake_128(shingle.encode()).digest(4 * hashes_count))
+                          for shingle in title_shingles(normalized_job_title(job_title))]
+        # Only the lowest byte of every minimum is kept, which is enough to estimate
+        # similarity and keeps millions of signatures small.
+        return bytes(hash_value & 0xFF for hash_value in map(min, zip(*shingle_hashes)))
+
+    def flag(self, results):
+        # Near-duplicates keep their own title and are only flagged with the title of the result seen first,
+        # so a wrong match never rewrites or hides a different job.
+        flagged_results = []
+        flagged_results_count = 0
+        with self.__lock:
+            for result in results:
+                job_title = result[ResultKeys.job_title.name]
+                signature = self.signature(job_title)
+                company = normalized_company_name(result[ResultKeys.company_name.name])
+                title_number = self.__similar_title_number(job_title, company, signature)
+                near_duplicate_of = None
+                if title_number is None:
+                    self.__add(job_title, company, signature)
+                elif self.__titles[title_number] != job_title:
+                    near_duplicate_of = self.__titles[title_number]
+                    logger.debug(f"Flagging '{job_title}' as near-duplicate of '{near_duplicate_of}' " \
+                                 f"at {result[ResultKeys.company_name.name]}.")
+                    flagged_results_count += 1
+                flagged_results.append(dict(result, **{ResultKeys.title_signature.name: signature,
+                                                       ResultKeys.near_duplicate_of.name: near_duplicate_of}))
+        if flagged_results_count:
+            logger.info(f"Flagged {flagged_results_count} of {len(results)} results as near-duplicates.")
+        return flagged_results
+
+    def __similar_title_number(self, job_title, company, signature):
+        checked_title_numbers = set()
+        for band_key in self.__band_keys(job_title, company, signature):
+            title_number = self.__band_index.get(band_key)
+            if title_number is None or title_number in checked_title_numbers:
+                continue
+            checked_title_numbers.add(title_number)
+            if self.__similarity(signature, self.__signatures[title_number]) >= self.__similarity_threshold:
+                return title_number
+        return None
+
+    def __similarity(self, signature, other_signature):
+        equal_values_rate = sum(value == other_value for value, other_value in zip(signature, other_signature)) / len(signature)
+        # One byte values of unrelated titles still collide once in 256 times.
+        return (equal_values_rate - 1 / 256) / (1 - 1 / 256)
+
+    def __add(self, job_title, company, signature):
+        title_number = len(self.__titles)
+        self.__titles.append(job_title)
+        self.__signatures.append(signature)
+        for band_key in self.__band_keys(job_title, company, signature):
+            self.__band_index.setdefault(band_key, title_number)
+
+    def __band_keys(self, job_title, company, signature):
+        # Band keys are digests rather than hash(), which is salted per process for strings.
+        # Levels are part of every key, so titles of different levels never become candidates.
+        levels = title_levels(normalized_job_title(job_title))
+        return [hashlib.blake2b(b"\0".join([company.encode(), levels.encode(), bytes([band]),
+                                            signature[band * self.__rows:(band + 1) * self.__rows]]),
+                                digest_size=8).digest()
+                for band in range(self.__bands)]
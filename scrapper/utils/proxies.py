@@ -1,91 +1,177 @@
-import logging, requests, signal, os
+import logging, os, threading, time
+from datetime import datetime
 
 from scrapper.crawler.hidemy import HideMy
-from selenium.common.exceptions import NoSuchElementException
+from scrapper.enums.proxies import ProxyKeys
+from scrapper.utils.proxy_validator import ProxyValidator
+from scrapper.utils.proxy_pool import ProxyHealth, ProxyPool
 
 logger = logging.getLogger(__name__)
 
 
 class Proxies():
-    def __init__(self, web_browser, proxies_filename=None):
-        signal.signal(signal.SIGALRM, self.__handler)
+    def __init__(self, web_browser, database, proxies_filename=None, validator=None, validation_ttl_in_hours=6,
+                 revalidation_interval_in_minutes=10):
         self.__web_browser = web_browser
-        self.__web_driver = web_browser.web_driver
-        self.current_proxy_index = 0
+        self.__database = database
+        self.__validation_ttl_in_hours = validation_ttl_in_hours
+        self.__revalidation_interval_in_minutes = revalidation_interval_in_minutes
+        self.__lock = threading.Lock()
+        self.__validator = validator
+        if not self.__validator:
+            self.__validator = ProxyValidator()
         self.__proxies_filename = proxies_filename
         if not self.__proxies_filename:
             self.__proxies_filename = os.path.join(os.path.join(os.path.abspath(os.curdir),\
                                                 "scrapper",\
                                                 "resources",\
                                                 "proxies.txt"))
-        self.__proxies = self.__read_proxies()
-
-    def next_valid_proxy(self, proxy_timeout_in_seconds = 3):
-        if not self.__is_my_api_website_alive():
-            logger.warning("Empty proxy returned.")
-            return ''
-
+        self.__pool = ProxyPool()
+        self.__known_proxies = {}
+        self.__load_proxies()
+        for proxy in self.__update_proxies(self.__read_proxies()):
+            self.__pool.add(proxy)
+
+    def next_valid_proxy(self):
+        # The lock is only held to pick and record, so other workers pick while a candidate is validated.
+        # A picked proxy stays leased, so no other worker validates the same one meanwhile.
         while True:
-            proxy = self.__next_proxy()
-            if not proxy or self.__is_proxy_valid(proxy, proxy_timeout_in_seconds):
-                break
-            self.__proxies.remove(proxy)
-
-        if not proxy:
-            logger.warning("Empty proxy returned.")
-
-        return proxy
-
-    def __next_proxy(self):
-        proxies_count = len(self.__proxies)
-        if proxies_count == 0:
-            logger.warning("No proxies available.")
-            self.current_proxy_index = 0
-            return ''
-
-        elif proxies_count == 1:
-            logger.warning("Only one proxy left, so no proxy rotation.")
-
-        next_proxy_index = self.current_proxy_index + 1
-
-        if next_proxy_index >= proxies_count:
-            next_proxy_index = 0
-        self.current_proxy_index = next_proxy_index
-        return self.__proxies[self.current_proxy_index]
+            with self.__lock:
+                proxy = self.__pool.acquire()
+                if not proxy:
+                    logger.warning("Empty proxy returned.")
+                    return ''
+
+                if self.__is_proxy_recently_validated(proxy):
+                    return proxy
+
+            proxy_check = self.__validator.validate_proxy(proxy)
+            if proxy_check.is_valid:
+                with self.__lock:
+                    self.__pool.report_success(proxy, proxy_check.latency_in_seconds)
+                return proxy
+
+            if not self.__validator.is_validation_url_alive():
+                logger.warning("Cannot validate proxy, so returning it unvalidated.")
+                return proxy
+            with self.__lock:
+                self.__pool.report_failure(proxy)
+
+    def report_success(self, proxy, latency_in_seconds=None):
+        if proxy:
+            self.__pool.report_success(proxy, latency_in_seconds)
+
+    def report_failure(self, proxy):
+        if proxy:
+            self.__pool.report_failure(proxy)
+
+    def report_captcha(self, proxy):
+        if proxy:
+            self.__pool.report_captcha(proxy)
+
+    def is_leased(self, proxy):
+        return bool(proxy) and self.__pool.is_leased(proxy)
+
+    def release(self, proxy):
+        if proxy:
+            self.__pool.release(proxy)
+
+    def __is_proxy_recently_validated(self, proxy):
+        health = self.__pool.health(proxy)
+        return health.last_success_time is not None and \
+               time.time() - health.last_success_time < self.__revalidation_interval_in_minutes * 60
 
     def download_new_proxies(self, proxy_url="https://hidemy.name/en/proxy-list/?maxtime=5000&type=h&anon=234#list"):
         logger.debug(f"Starting to download new proxies from {proxy_url}...")
         proxy_provider = HideMy(self.__web_browser)
         proxies = proxy_provider.scrape_proxies(proxy_url)
         logger.info(f"Downloaded {len(proxies)} proxies.")
-        self.__update_proxies(proxies)
-        self.__proxies = proxies
+        for proxy in self.__update_proxies(proxies):
+            self.__pool.add(proxy)
 
-    def prune_invalid_proxies(self, proxy_timeout_in_seconds = 2):
+    def prune_invalid_proxies(self, batch_size=100):
         logger.debug("Validating proxies...")
-        filtered_proxies = self.__filter_out_invalid_proxies(self.__proxies, proxy_timeout_in_seconds)
-        self.__write_proxies(filtered_proxies)
-        original_proxies_count = len(self.__proxies)
-        filtered_proxies_count = len(filtered_proxies)
-        self.__proxies = filtered_proxies
-        logger.info(f"{filtered_proxies_count}/{original_proxies_count} proxies are valid.")
+        proxies_to_validate = self.__database.proxies_due_to_validation(self.__validation_ttl_in_hours)
+        if not proxies_to_validate:
+            logger.info(f"All {len(self.__known_proxies)} proxies have been validated within {self.__validation_ttl_in_hours} hours.")
+            return
 
-    def save(self):
-        self.__write_proxies(self.__proxies)
+        if not self.__validator.is_validation_url_alive():
+            logger.error("Validation website is down and cannot filter out proxies.")
+            raise Exception()
 
-    def __update_proxies(self, proxies_list):
-        proxies_in_txt = self.__read_proxies()
-        proxies_to_write = self.__filter_out_duplicated_proxies(proxies_list + proxies_in_txt)
-        new_proxies_count = len(proxies_to_write) - len(proxies_in_txt)
-        self.__write_proxies(proxies_to_write)
-        logger.info(f"Updated with {new_proxies_count} new proxies.")
+        valid_proxies_count = 0
+        proxy_checks_records = []
+        for proxy_check in self.__validator.validate(proxies_to_validate):
+            if proxy_check.is_valid:
+                valid_proxies_count += 1
+                self.__pool.add(proxy_check.proxy)
+                self.__pool.report_success(proxy_check.proxy, proxy_check.latency_in_seconds)
+            else:
+                # Invalid proxies stay known and back off, so a later revalidation can bring them back.
+                self.__pool.add(proxy_check.proxy)
+                self.__pool.report_failure(proxy_check.proxy)
+            proxy_checks_records.append(self.__proxy_check_record(proxy_check))
+            if len(proxy_checks_records) >= batch_size:
+                self.__database.write_proxy_checks(proxy_checks_records)
+                proxy_checks_records = []
+        self.__database.write_proxy_checks(proxy_checks_records)
+
+        logger.info(f"{valid_proxies_count}/{len(proxies_to_validate)} revalidated proxies are valid, " \
+                    f"{len(self.__pool)}/{len(self.__known_proxies)} proxies are usable.")
 
-    def __write_proxies(self, proxies_list):
-        logger.debug(f"Writting {len(proxies_list)} proxies...")
+    def save(self):
+        proxy_checks_records = []
+        for proxy in self.__pool.proxies():
+            health = self.__pool.health(proxy)
+            checked_times = [checked_time for checked_time in (health.last_success_time, health.last_failure_time) if checked_time]
+            if not checked_times:
+                continue
+            proxy_checks_records.append({
+                ProxyKeys.proxy.name: proxy,
+                ProxyKeys.checked_datetime.name: datetime.fromtimestamp(max(checked_times)),
+                ProxyKeys.latency_in_seconds.name: health.median_latency() if health.latencies else None,
+                ProxyKeys.is_valid.name: health.consecutive_failures_count == 0,
+                ProxyKeys.successes_count.name: health.successes_count,
+                ProxyKeys.failures_count.name: health.failures_count,
+                ProxyKeys.captchas_count.name: health.captchas_count,
+                ProxyKeys.consecutive_failures_count.name: health.consecutive_failures_count,
+                })
+        self.__database.write_proxy_checks(proxy_checks_records)
+
+    def __load_proxies(self):
+        for proxy_dict in self.__database.read_proxies():
+            proxy = proxy_dict[ProxyKeys.proxy.name]
+            self.__known_proxies[proxy] = proxy_dict
+            self.__pool.restore(self.__proxy_health(proxy_dict))
+        logger.info(f"Loaded {len(self.__known_proxies)} proxies.")
+
+    def __proxy_health(self, proxy_dict):
+        # Invalid proxies are restored too: their cooldown decides when they are tried again.
+        health = ProxyHealth(proxy_dict[ProxyKeys.proxy.name])
+        health.successes_count = proxy_dict[ProxyKeys.successes_count.name]
+        health.failures_count = proxy_dict[ProxyKeys.failures_count.name]
+        health.captchas_count = proxy_dict[ProxyKeys.captchas_count.name]
+        health.consecutive_failures_count = proxy_dict[ProxyKeys.consecutive_failures_count.name]
+        if proxy_dict[ProxyKeys.latency_in_seconds.name] is not None:
+            health.latencies.append(proxy_dict[ProxyKeys.latency_in_seconds.name])
+        checked_datetime = proxy_dict[ProxyKeys.checked_datetime.name]
+        if checked_datetime:
+            if proxy_dict[ProxyKeys.is_valid.name] == 0:
+                health.last_failure_time = checked_datetime.timestamp()
+                # Proxies marked invalid before the counters were saved still start cooling down.
+                health.consecutive_failures_count = max(health.consecutive_failures_count, 1)
+            else:
+                health.last_success_time = checked_datetime.timestamp()
+        return health
 
-        with open(self.__proxies_filename, "w") as txt_file:
-            txt_file.writelines('\n'.join(proxies_list) + '\n')
-            logger.info(f"Wrote {len(proxies_list)} proxies.")
+    def __update_proxies(self, proxies_list):
+        new_proxies = [proxy for proxy in dict.fromkeys(proxies_list) if proxy and proxy not in self.__known_proxies]
+        for proxy in new_proxies:
+            self.__known_proxies[proxy] = {ProxyKeys.proxy.name: proxy}
+        self.__database.append_proxies(new_proxies)
+        logger.info(f"Updated with {len(new_proxies)} new proxies.")
+        return new_proxies
 
     def __read_proxies(self):
         logger.debug("Reading proxies.")
@@ -96,77 +182,10 @@ class Proxies():
         logger.info(f"Read {len(proxies)} proxies.")
         return proxies
 
-    def __filter_out_duplicated_proxies(self, unfiltered_proxies):
-        filtered_proxies = []
-        for i in unfiltered_proxies:
-          if i not in filtered_proxies:
-            filtered_proxies.append(i)
-        return filtered_proxies
-
-    def __handler(self, signum, frame):
-        raise Exception()
-
-    def __filter_out_invalid_proxies(self, all_proxies, proxy_timeout_in_seconds = 5):
-        if not self.__is_my_api_website_alive():
-            logger.error("www.myip.com is down and cannot filter out proxies.")
-            raise Exception()
-
-        all_proxies = self.__filter_out_duplicated_proxies(all_proxies)
-        all_proxies_count = len(all_proxies)
-        working_proxies = []
-
-        logger.debug(f"Checking {all_proxies_count} proxies...")
-
-        proxy_index = 0
-        for proxy in all_proxies:
-            proxy_index += 1
-            is_proxy_valid = self.__is_proxy_valid(proxy, proxy_timeout_in_seconds)
-            if is_proxy_valid:
-                working_proxies.append(proxy)
-            proxy_of_proxies = f"{proxy_index}/{all_proxies_count}"
-            logger.debug(f"Proxy {proxy:{21}} which is {proxy_of_proxies:{7}} is {'valid' if is_proxy_valid else 'invalid'}.")
-
-        return working_proxies
-
-    def __is_proxy_valid(self, proxy, proxy_timeout_in_seconds=2):
-        if not proxy:
-            return False
-
-        request_proxies = {"http": proxy, "https": proxy}
-        signal.alarm(proxy_timeout_in_seconds)
-        is_proxy_valid = True
-        try:
-            request_response = requests.get("https://api.myip.com", proxies=request_proxies)
-        except Exception:
-            is_proxy_valid = False
-        finally:
-            signal.alarm(0)
-
-        if is_proxy_valid and request_response.status_code != requests.codes.ok:
-            is_proxy_valid = False
-
-        if is_proxy_valid and self.__is_error_page_open():
-            is_proxy_valid = False
-
-        return is_proxy_valid
-
-    def __is_error_page_open(self):
-        try:
-            self.__web_driver.find_element_by_id("errorPageContainer")
-        except NoSuchElementException:
-            return False
-        else:
-            return True
-
-    def __is_my_api_website_alive(self):
-        is_my_api_website_alive = True
-        try:
-            request_response = requests.get("https://api.myip.com")
-        except Exception:
-            is_my_api_website_alive = False
-
-        if is_my_api_website_alive and request_response.status_code != requests.codes.ok:
-            is_my_api_website_alive = False
-        if not is_my_api_website_alive:
-            logger.warning("www.myip.com is down.")
-        return is_my_api_website_alive
\ No newline at end of file
+    def __proxy_check_record(self, proxy_check):
+        return {
+            ProxyKeys.proxy.name: proxy_check.proxy,
+            ProxyKeys.checked_datetime.name: datetime.now(),
+            ProxyKeys.latency_in_seconds.name: proxy_check.latency_in_seconds,
+            ProxyKeys.is_valid.name: proxy_check.is_valid,
+            }
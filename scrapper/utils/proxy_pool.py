@@ -0,0 +1,174 @@
+import logging, heapq, itertools, statistics, threading, time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class ProxyHealth():
+    unknown_latency_in_seconds = 5.0
+    captcha_penalty_in_seconds = 2.0
+
+    def __init__(self, proxy):
+        self.proxy = proxy
+        self.successes_count = 0
+        self.failures_count = 0
+        self.captchas_count = 0
+        self.consecutive_failures_count = 0
+        self.latencies = deque(maxlen=15)
+        self.last_success_time = None
+        self.last_failure_time = None
+        self.cooldown_until = 0.0
+
+    def success_rate(self):
+        return (self.successes_count + 1) / (self.successes_count + self.failures_count + 2)
+
+    def median_latency(self):
+        if not self.latencies:
+            return self.unknown_latency_in_seconds
+        return statistics.median(self.latencies)
+
+    def score(self):
+        return self.median_latency() / self.success_rate() + self.captchas_count * self.captcha_penalty_in_seconds
+
+
+class ProxyPool():
+    def __init__(self, base_cooldown_in_seconds=30, max_cooldown_in_seconds=3600):
+        self.__base_cooldown_in_seconds = base_cooldown_in_seconds
+        self.__max_cooldown_in_seconds = max_cooldown_in_seconds
+        self.__healths = {}
+        self.__versions = {}
+        self.__leased_proxies = set()
+        self.__ready_heap = []
+        self.__cooling_heap = []
+        self.__counter = itertools.count()
+        self.__lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.__healths)
+
+    def __contains__(self, proxy):
+        return proxy in self.__healths
+
+    def proxies(self):
+        with self.__lock:
+            return sorted(self.__healths, key=lambda proxy: self.__healths[proxy].score())
+
+    def health(self, proxy):
+        return self.__healths.get(proxy)
+
+    def is_leased(self, proxy):
+        return proxy in self.__leased_proxies
+
+    def add(self, proxy, latency_in_seconds=None):
+        with self.__lock:
+            if proxy not in self.__healths:
+                self.__healths[proxy] = ProxyHealth(proxy)
+            if latency_in_seconds is not None:
+                self.__healths[proxy].latencies.append(latency_in_seconds)
+            if proxy not in self.__leased_proxies:
+                self.__make_available(proxy)
+
+    def restore(self, health):
+        # Saved proxies keep cooling down for what is left of the backoff of their last failure.
+        with self.__lock:
+            self.__healths[health.proxy] = health
+            if health.consecutive_failures_count and health.last_failure_time:
+                cooldown_left_in_seconds = health.last_failure_time + self.__cooldown_in_seconds(health) - time.time()
+                health.cooldown_until = time.monotonic() + max(cooldown_left_in_seconds, 0.0)
+            self.__make_available(health.proxy)
+
+    def remove(self, proxy):
+        with self.__lock:
+            self.__healths.pop(proxy, None)
+            self.__versions.pop(proxy, None)
+            self.__leased_proxies.discard(proxy)
+
+    def acquire(self):
+        with self.__lock:
+            self.__wake_up_cooled_down_proxies()
+            while self.__ready_heap:
+                score, version, proxy = heapq.heappop(self.__ready_heap)
+                if self.__versions.get(proxy) != version:
+                    continue
+                self.__versions.pop(proxy)
+                self.__leased_proxies.add(proxy)
+                logger.debug(f"Acquired proxy {proxy} with score {score:.2f}.")
+                return proxy
+
+            if self.__healths:
+                logger.warning(f"All {len(self.__healths)} proxies are leased or cooling down.")
+            else:
+                logger.warning("No proxies available.")
+            return None
+
+    def release(self, proxy):
+        with self.__lock:
+            if proxy in self.__leased_proxies:
+                self.__leased_proxies.discard(proxy)
+                self.__make_available(proxy)
+
+    def report_success(self, proxy, latency_in_seconds=None):
+        with self.__lock:
+            health = self.__healths.get(proxy)
+            if not health:
+                return
+            health.successes_count += 1
+            health.consecutive_failures_count = 0
+            health.last_success_time = time.time()
+            if latency_in_seconds is not None:
+                health.latencies.append(latency_in_seconds)
+            if proxy not in self.__leased_proxies:
+                self.__make_available(proxy)
+
+    def report_failure(self, proxy):
+        with self.__lock:
+            health = self.__healths.get(proxy)
+            if not health:
+                return
+            health.failures_count += 1
+            self.__cool_down(health)
+
+    def report_captcha(self, proxy):
+        with self.__lock:
+            health = self.__healths.get(proxy)
+            if not health:
+                return
+            health.captchas_count += 1
+            self.__cool_down(health)
+
+    def __cool_down(self, health):
+        health.consecutive_failures_count += 1
+        health.last_failure_time = time.time()
+        cooldown_in_seconds = self.__cooldown_in_seconds(health)
+        health.cooldown_until = time.monotonic() + cooldown_in_seconds
+        self.__leased_proxies.discard(health.proxy)
+        self.__push_cooling(health.proxy)
+        logger.debug(f"Proxy {health.proxy} cools down for {cooldown_in_seconds} seconds.")
+
+    def __cooldown_in_seconds(self, health):
+        return min(self.__base_cooldown_in_seconds * 2 ** (health.consecutive_failures_count - 1),
+                   self.__max_cooldown_in_seconds)
+
+    def __wake_up_cooled_down_proxies(self):
+        now = time.monotonic()
+        while self.__cooling_heap and self.__cooling_heap[0][0] <= now:
+            cooldown_until, version, proxy = heapq.heappop(self.__cooling_heap)
+            if self.__versions.get(proxy) == version:
+                self.__push(proxy)
+
+    def __make_available(self, proxy):
+        # A proxy that is still cooling down waits for its deadline even if it is added or succeeds meanwhile.
+        if self.__healths[proxy].cooldown_until > time.monotonic():
+            self.__push_cooling(proxy)
+        else:
+            self.__push(proxy)
+
+    def __push_cooling(self, proxy):
+        version = next(self.__counter)
+        self.__versions[proxy] = version
+        heapq.heappush(self.__cooling_heap, (self.__healths[proxy].cooldown_until, version, proxy))
+
+    def __push(self, proxy):
+        version = next(self.__counter)
+        self.__versions[proxy] = version
+        heapq.heappush(self.__ready_heap, (self.__healths[proxy].score(), version, proxy))
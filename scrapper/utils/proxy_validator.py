@@ -0,0 +1,81 @@
+import logging, threading, time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+ProxyCheck = namedtuple("ProxyCheck", ["proxy", "is_valid", "latency_in_seconds", "error"])
+
+
+class ProxyValidator():
+    def __init__(self, validation_url="https://api.myip.com", workers_count=64,
+                 connect_timeout_in_seconds=2, read_timeout_in_seconds=3, validation_text=None):
+        self.__validation_url = validation_url
+        self.__validation_text = validation_text
+        self.__workers_count = workers_count
+        self.__timeout = (connect_timeout_in_seconds, read_timeout_in_seconds)
+        self.__thread_data = threading.local()
+
+    def is_validation_url_alive(self):
+        try:
+            request_response = self.__session().get(self.__validation_url, timeout=self.__timeout)
+        except requests.RequestException:
+            is_alive = False
+        else:
+            is_alive = request_response.status_code == requests.codes.ok
+        if not is_alive:
+            logger.warning(f"{self.__validation_url} is down.")
+        return is_alive
+
+    def validate(self, proxies):
+        proxies = list(dict.fromkeys(proxies))
+        proxies_count = len(proxies)
+        logger.debug(f"Checking {proxies_count} proxies with {self.__workers_count} workers...")
+
+        valid_proxies_count = 0
+        started_at = time.monotonic()
+        with ThreadPoolExecutor(max_workers=self.__workers_count, thread_name_prefix="proxy-validator") as executor:
+            futures = [executor.submit(self.validate_proxy, proxy) for proxy in proxies]
+            for proxy_index, future in enumerate(as_completed(futures), start=1):
+                proxy_check = future.result()
+                if proxy_check.is_valid:
+                    valid_proxies_count += 1
+                proxy_of_proxies = f"{proxy_index}/{proxies_count}"
+                logger.debug(f"Proxy {proxy_check.proxy:{21}} which is {proxy_of_proxies:{11}} is " \
+                             f"{'valid' if proxy_check.is_valid else 'invalid'}.")
+                yield proxy_check
+
+        elapsed_seconds = time.monotonic() - started_at
+        logger.info(f"Checked {proxies_count} proxies in {elapsed_seconds:.1f} seconds, {valid_proxies_count} are valid.")
+
+    def validate_proxy(self, proxy):
+        if not proxy:
+            return ProxyCheck(proxy, False, None, "Empty proxy.")
+
+        request_proxies = {"http": f"http://{proxy}", "https": f"http://{proxy}"}
+        started_at = time.monotonic()
+        try:
+            request_response = self.__session().get(self.__validation_url, proxies=request_proxies, timeout=self.__timeout)
+        except requests.RequestException as err:
+            return ProxyCheck(proxy, False, None, type(err).__name__)
+
+        latency_in_seconds = time.monotonic() - started_at
+        if request_response.status_code != requests.codes.ok:
+            return ProxyCheck(proxy, False, latency_in_seconds, f"HTTP {request_response.status_code}")
+        # Some proxies answer with their own error or login page, so the body must come from the validation URL.
+        if self.__validation_text and self.__validation_text not in request_response.text:
+            return ProxyCheck(proxy, False, latency_in_seconds, "Unexpected body")
+        return ProxyCheck(proxy, True, latency_in_seconds, None)
+
+    def __session(self):
+        session = getattr(self.__thread_data, "session", None)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=1, max_retries=0)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            self.__thread_data.session = session
+        return session
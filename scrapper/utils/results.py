@@ -1,65 +1,112 @@
-import logging, re
+import logging
+from datetime import datetime
 
-from scrapper.enums.tasks import TaskKeys
 from scrapper.enums.results import ResultKeys
+from scrapper.utils.companies import normalized_company_name
+from scrapper.utils.keyword_matcher import KeywordMatcher
 
 logger = logging.getLogger(__name__)
 
 class Results():
-    def __init__(self, results, database, mail, settings):
-        self.__results = results
+    def __init__(self, database, mail, settings, companies=None, known_results=None, batch_size=50, task_number=None, near_duplicates=None):
+        self.__results = []
+        self.__near_duplicates = near_duplicates
+        self.__task_number = task_number
         self.__database = database
+        self.__companies = companies
+        self.__known_results = known_results
         self.__mail = mail
         self.__settings = settings
+        self.__batch_size = batch_size
+        self.__excluding_keywords = KeywordMatcher([])
+        self.__including_keywords = KeywordMatcher([])
+        self.__appended_results_count = 0
+        self.__saved_results_count = 0
+
+    def results(self):
+        return self.__results
+
+    def saved_results_count(self):
+        return self.__saved_results_count
+
+    def append(self, result):
+        self.__appended_results_count += 1
+        if not self.__is_result_passing_filters(result):
+            return
+        self.__results.append(result)
+        if len(self.__results) >= self.__batch_size:
+            self.save()
 
     def save(self):
-        self.__database.append_results(self.__results)
+        if not self.__results:
+            return
+
+        logger.debug(f"Saving batch of {len(self.__results)} results...")
+        scrapped_datetime = datetime.now()
+        results = self.__results
+        if self.__near_duplicates is not None:
+            results = self.__near_duplicates.flag(results)
+        if not self.__companies:
+            results_records = [dict(result) for result in results]
+        else:
+            company_numbers = self.__companies.save_companies(results)
+            results_records = []
+            for result in results:
+                results_records.append({
+                    ResultKeys.job_title.name: result[ResultKeys.job_title.name],
+                    ResultKeys.application_link.name: result[ResultKeys.application_link.name],
+                    ResultKeys.company_name.name: result[ResultKeys.company_name.name],
+                    ResultKeys.company_number.name: company_numbers.get(normalized_company_name(result[ResultKeys.company_name.name])),
+                    })
+        for result, results_record in zip(results, results_records):
+            results_record[ResultKeys.task_number.name] = self.__task_number
+            results_record[ResultKeys.scrapped_datetime.name] = scrapped_datetime
+            # Without near-duplicate detection the columns are left out, so stored signatures are not overwritten.
+            if self.__near_duplicates is not None:
+                results_record[ResultKeys.title_signature.name] = result.get(ResultKeys.title_signature.name)
+                results_record[ResultKeys.near_duplicate_of.name] = result.get(ResultKeys.near_duplicate_of.name)
+        self.__database.append_results(results_records)
+
+        if self.__known_results is not None:
+            self.__known_results.add_results(self.__results)
+        self.__saved_results_count += len(self.__results)
+        self.__results = []
 
-    def exclude_by_keywords(self, keywords):
+    def exclude_by_keywords(self, keywords, ignore_case=False):
         logger.debug("Excluding results by keywords.")
-        filtered_results = []
-        previous_results_count = len(self.__results)
-        for result in self.__results:
-            if not self.__are_keywords_in_result(result, keywords):
-                filtered_results.append(result)
-        self.__results = filtered_results
-        next_results_count = len(self.__results)
-        logger.info(f"{next_results_count}/{previous_results_count} left due to filtering.")
+        self.__excluding_keywords = KeywordMatcher(keywords, ignore_case)
+        self.__filter_results()
 
-    def include_by_keywords(self, keywords):
+    def include_by_keywords(self, keywords, ignore_case=False):
         logger.debug("Including results by keywords.")
-        filtered_results = []
+        self.__including_keywords = KeywordMatcher(keywords, ignore_case)
+        self.__filter_results()
+
+    def __filter_results(self):
         previous_results_count = len(self.__results)
-        for result in self.__results:
-            if self.__are_keywords_in_result(result, keywords):
-                filtered_results.append(result)
-        self.__results = filtered_results
+        self.__results = [result for result in self.__results if self.__is_result_passing_filters(result)]
         next_results_count = len(self.__results)
-        logger.info(f"{next_results_count}/{previous_results_count} left due to filtering.")
-
-    def __are_keywords_in_result(self, result, keywords):
-        for keyword in keywords:
-            if self.__is_keyword_in_result(result, keyword):
-                return True
-        return False
+        if previous_results_count:
+            logger.info(f"{next_results_count}/{previous_results_count} left due to filtering.")
 
-    def __is_keyword_in_result(self, result, keyword):
-        for result_key in ResultKeys:
-            try:
-                if re.search(r"\b{}\b".format(keyword), result[result_key.name]) is not None:
-                    return True
-            except KeyError:
-                continue
-            except TypeError:
-                continue
+    def __is_result_passing_filters(self, result):
+        if self.__excluding_keywords and self.__are_keywords_in_result(result, self.__excluding_keywords):
+            return False
+        if self.__including_keywords and not self.__are_keywords_in_result(result, self.__including_keywords):
+            return False
+        return True
 
-        return False
+    def __are_keywords_in_result(self, result, keyword_matcher):
+        return keyword_matcher.matches_any(result.get(result_key.name) for result_key in ResultKeys)
 
-    def check_count(self, expected_results_count):
+    def check_count(self, expected_results_count, scrapping_link, skipped_results_count=0):
         logger.debug("Checking if there is enough results.")
-        results_count = len(self.__results)
+        results_count = self.__saved_results_count + len(self.__results)
+        logger.info(f"{results_count}/{self.__appended_results_count} results left due to filtering.")
+        # Known offers are skipped before they are appended, but they are still there on the site.
+        results_count += skipped_results_count
         if results_count < expected_results_count:
             logger.warning(f"Got {results_count} results. Expected at least {expected_results_count} results.")
             if self.__settings.notify_by_mail():
-                self.__mail.warn_about_results(self.__task_dict[TaskKeys.scrapping_link.name], results_count, expected_results_count)
+                self.__mail.warn_about_results(scrapping_link, results_count, expected_results_count)
         logger.info(f"Got {results_count} results. Expected at least {expected_results_count} results.")
\ No newline at end of file
@@ -0,0 +1,125 @@
+import logging, threading, time
+from collections import deque
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket():
+    def __init__(self, rate_per_minute, burst=1):
+        self.rate_per_minute = rate_per_minute
+        self.__burst = burst
+        self.__tokens = burst
+        self.__updated_at = time.monotonic()
+        self.__lock = threading.Lock()
+
+    def reserve(self):
+        with self.__lock:
+            now = time.monotonic()
+            self.__tokens = min(self.__burst, self.__tokens + (now - self.__updated_at) * self.rate_per_minute / 60)
+            self.__updated_at = now
+            self.__tokens -= 1
+            if self.__tokens >= 0:
+                return 0
+            return -self.__tokens * 60 / self.rate_per_minute
+
+
+class SiteThrottle():
+    def __init__(self, rate_per_minute, burst, window_size):
+        self.bucket = TokenBucket(rate_per_minute, burst)
+        self.outcomes = deque(maxlen=window_size)
+        self.pages_since_adjustment = 0
+
+    def record_captcha(self):
+        # Every page was recorded as captcha-free when acquired, so the captcha turns the latest such
+        # outcome instead of adding a second one for the same page.
+        for outcome_number in range(len(self.outcomes) - 1, -1, -1):
+            if not self.outcomes[outcome_number]:
+                self.outcomes[outcome_number] = True
+                return
+        self.outcomes.append(True)
+
+    def captcha_rate(self):
+        if not self.outcomes:
+            return 0
+        return sum(self.outcomes) / len(self.outcomes)
+
+
+class Scheduler():
+    def __init__(self, site_rate_per_minute=12, proxy_rate_per_minute=6, burst=3,
+                 min_rate_per_minute=2, max_rate_per_minute=60, rate_increase_per_minute=1,
+                 rate_decrease_factor=0.5, target_captcha_rate=0.02, window_size=20, sites=None):
+        self.__site_rate_per_minute = site_rate_per_minute
+        self.__proxy_rate_per_minute = proxy_rate_per_minute
+        self.__burst = burst
+        self.__min_rate_per_minute = min_rate_per_minute
+        self.__max_rate_per_minute = max_rate_per_minute
+        self.__rate_increase_per_minute = rate_increase_per_minute
+        self.__rate_decrease_factor = rate_decrease_factor
+        self.__target_captcha_rate = target_captcha_rate
+        self.__window_size = window_size
+        self.__sites = sites or {}
+        self.__site_throttles = {}
+        self.__proxy_buckets = {}
+        self.__lock = threading.Lock()
+
+    def acquire(self, web_page_url, proxy_address=""):
+        site = urlparse(web_page_url).hostname
+        if not site:
+            return
+
+        with self.__lock:
+            site_throttle = self.__site_throttle(site)
+            wait_in_seconds = site_throttle.bucket.reserve()
+            if proxy_address:
+                wait_in_seconds = max(wait_in_seconds, self.__proxy_bucket(proxy_address).reserve())
+            self.__record_page(site, site_throttle)
+
+        if wait_in_seconds > 0:
+            logger.debug(f"Waiting {wait_in_seconds:.1f} seconds before loading page of {site} through '{proxy_address}'.")
+            time.sleep(wait_in_seconds)
+
+    def report_captcha(self, web_page_url):
+        site = urlparse(web_page_url).hostname
+        if not site:
+            return
+
+        with self.__lock:
+            site_throttle = self.__site_throttle(site)
+            site_throttle.record_captcha()
+            site_throttle.pages_since_adjustment = 0
+            rate_per_minute = max(self.__min_rate_per_minute,
+                                  site_throttle.bucket.rate_per_minute * self.__rate_decrease_factor)
+            site_throttle.bucket.rate_per_minute = rate_per_minute
+        logger.info(f"Lowered rate for {site} to {rate_per_minute:.1f} pages per minute " \
+                    f"after captcha, captcha rate is {site_throttle.captcha_rate():.0%}.")
+
+    def rate_per_minute(self, site):
+        with self.__lock:
+            return self.__site_throttle(site).bucket.rate_per_minute
+
+    def __record_page(self, site, site_throttle):
+        site_throttle.outcomes.append(False)
+        site_throttle.pages_since_adjustment += 1
+        if site_throttle.pages_since_adjustment < self.__window_size:
+            return
+
+        site_throttle.pages_since_adjustment = 0
+        if site_throttle.captcha_rate() > self.__target_captcha_rate or \
+           site_throttle.bucket.rate_per_minute >= self.__max_rate_per_minute:
+            return
+        rate_per_minute = min(self.__max_rate_per_minute,
+                              site_throttle.bucket.rate_per_minute + self.__rate_increase_per_minute)
+        site_throttle.bucket.rate_per_minute = rate_per_minute
+        logger.debug(f"Raised rate for {site} to {rate_per_minute:.1f} pages per minute.")
+
+    def __site_throttle(self, site):
+        if site not in self.__site_throttles:
+            rate_per_minute = self.__sites.get(site, {}).get("rate_per_minute", self.__site_rate_per_minute)
+            self.__site_throttles[site] = SiteThrottle(rate_per_minute, self.__burst, self.__window_size)
+        return self.__site_throttles[site]
+
+    def __proxy_bucket(self, proxy_address):
+        if proxy_address not in self.__proxy_buckets:
+            self.__proxy_buckets[proxy_address] = TokenBucket(self.__proxy_rate_per_minute, self.__burst)
+        return self.__proxy_buckets[proxy_address]
@@ -0,0 +1,108 @@
+import json, os, logging, threading
+from datetime import datetime, timedelta
+from urllib.parse import urljoin
+
+logger = logging.getLogger(__name__)
+
+session_cookie_keys = ["name", "value", "path", "domain", "secure", "httpOnly", "expiry"]
+
+local_storage_reading_script = """
+var items = {};
+for (var i = 0; i < localStorage.length; i++) {
+    var key = localStorage.key(i);
+    items[key] = localStorage.getItem(key);
+}
+return items;
+"""
+
+local_storage_writing_script = """
+var items = arguments[0];
+for (var key in items) {
+    localStorage.setItem(key, items[key]);
+}
+"""
+
+
+class Sessions():
+    lock = threading.Lock()
+
+    def __init__(self, web_browser, session_ttl_in_hours=24, sessions_directory=None):
+        self.__web_browser = web_browser
+        self.__session_ttl = timedelta(hours=session_ttl_in_hours)
+        if not sessions_directory:
+            sessions_directory = os.path.join(os.path.abspath(os.curdir), "scrapper", "resources", "sessions")
+        self.__sessions_directory = sessions_directory
+
+    def restore(self, crawler_id, web_page, proxy_address):
+        session_dict = self.__read_session(crawler_id, proxy_address)
+        if not session_dict:
+            return False
+
+        expiry_datetime = datetime.fromisoformat(session_dict["expiry_datetime"])
+        if expiry_datetime <= datetime.now():
+            logger.debug(f"Session of '{crawler_id}' through '{proxy_address}' expired at {expiry_datetime}.")
+            self.discard(crawler_id, proxy_address)
+            return False
+
+        now_timestamp = datetime.now().timestamp()
+        cookies = [cookie for cookie in session_dict["cookies"]
+                   if "expiry" not in cookie or cookie["expiry"] > now_timestamp]
+        if not cookies:
+            self.discard(crawler_id, proxy_address)
+            return False
+
+        logger.debug(f"Restoring session of '{crawler_id}' through '{proxy_address}'...")
+        # Cookies and storage can only be set on a page of the same origin, so load the cheapest one.
+        self.__web_browser.load_web_page(urljoin(web_page, "/robots.txt"))
+        self.__web_browser.add_cookies(cookies, reload=False)
+        if session_dict["local_storage"]:
+            self.__web_browser.web_driver.execute_script(local_storage_writing_script, session_dict["local_storage"])
+        logger.info(f"Restored session of '{crawler_id}' through '{proxy_address}' with {len(cookies)} cookies " \
+                    f"and {len(session_dict['local_storage'])} storage items.")
+        return True
+
+    def save(self, crawler_id, proxy_address):
+        web_driver = self.__web_browser.web_driver
+        cookies = []
+        for cookie in web_driver.get_cookies():
+            cookies.append({key: cookie[key] for key in session_cookie_keys if key in cookie})
+        local_storage = web_driver.execute_script(local_storage_reading_script) or {}
+
+        saved_datetime = datetime.now()
+        session_dict = {
+            "saved_datetime": saved_datetime.isoformat(),
+            "expiry_datetime": (saved_datetime + self.__session_ttl).isoformat(),
+            "cookies": cookies,
+            "local_storage": local_storage,
+            }
+
+        session_path = self.__session_path(crawler_id, proxy_address)
+        with self.lock:
+            os.makedirs(self.__sessions_directory, exist_ok=True)
+            with open(session_path + ".tmp", "w") as session_file:
+                json.dump(session_dict, session_file)
+            os.replace(session_path + ".tmp", session_path)
+        logger.info(f"Saved session of '{crawler_id}' through '{proxy_address}' with {len(cookies)} cookies.")
+
+    def discard(self, crawler_id, proxy_address):
+        with self.lock:
+            try:
+                os.remove(self.__session_path(crawler_id, proxy_address))
+            except FileNotFoundError:
+                return
+        logger.debug(f"Discarded session of '{crawler_id}' through '{proxy_address}'.")
+
+    def __read_session(self, crawler_id, proxy_address):
+        session_path = self.__session_path(crawler_id, proxy_address)
+        try:
+            with open(session_path, "r") as session_file:
+                return json.load(session_file)
+        except FileNotFoundError:
+            return None
+        except ValueError:
+            logger.warning(f"Cannot read session from {session_path}.")
+            return None
+
+    def __session_path(self, crawler_id, proxy_address):
+        proxy_name = proxy_address.replace(":", "_") if proxy_address else "direct"
+        return os.path.join(self.__sessions_directory, f"{crawler_id}_{proxy_name}.json")
@@ -1,58 +1,263 @@
-import os, yaml
+import os, threading, yaml
+from collections import namedtuple
 from logging.config import dictConfig
 
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
+number = (int, float)
+
+general_settings_types = {
+    "use_proxy": bool,
+    "download_proxy_list": bool,
+    "prune_invalid_proxies": bool,
+    "notify_by_mail": bool,
+    "tasks_from_yaml": bool,
+    "headless_web_browser": bool,
+    "workers": int,
+    "failed_task_retry_in_minutes": number,
+    "scrape_by_script": bool,
+    "crawler_engine": str,
+    "company_details_ttl_in_days": number,
+    "results_batch_size": int,
+    "prefetch_result_pages": bool,
+    "session_ttl_in_hours": number,
+    "log_web_page_statistics": bool,
+    "lean_web_browser": dict,
+    "near_duplicates": dict,
+    "task_leasing": dict,
+    "daemon": dict,
+    }
+
+smtp_settings_types = {
+    "host": str,
+    "port": int,
+    "username": str,
+    "password": str,
+    "from_address": str,
+    "to_address": str,
+    }
+
+proxy_settings_types = {
+    "address": str,
+    "validation_url": str,
+    "validation_text": str,
+    "validation_workers": int,
+    "validation_connect_timeout_in_seconds": number,
+    "validation_read_timeout_in_seconds": number,
+    "validation_ttl_in_hours": number,
+    }
+
+database_settings_types = {
+    "backend": str,
+    "database_name": str,
+    }
+
+scheduler_settings_types = {
+    "enabled": bool,
+    "site_rate_per_minute": number,
+    "proxy_rate_per_minute": number,
+    "burst": number,
+    "min_rate_per_minute": number,
+    "max_rate_per_minute": number,
+    "rate_increase_per_minute": number,
+    "rate_decrease_factor": number,
+    "target_captcha_rate": number,
+    "window_size": int,
+    }
+
+GeneralSettings = namedtuple("GeneralSettings", general_settings_types)
+
+
+class FrozenDict(dict):
+    def __readonly(self, *args, **kwargs):
+        raise TypeError("Settings are read-only.")
+
+    __setitem__ = __delitem__ = clear = pop = popitem = setdefault = update = __readonly
+
+
+def frozen(value):
+    if isinstance(value, dict):
+        return FrozenDict((key, frozen(item)) for key, item in value.items())
+    if isinstance(value, list):
+        return tuple(frozen(item) for item in value)
+    return value
+
+
 class Settings:
+    __loaded_files = {}
+    __lock = threading.Lock()
+
     @classmethod
     def notify_by_mail(cls):
-        return cls.__read_general_settings()["notify_by_mail"]
+        return cls.__general_settings().notify_by_mail
 
     @classmethod
     def use_proxy(cls):
-        return cls.__read_general_settings()["use_proxy"]
+        return cls.__general_settings().use_proxy
 
     @classmethod
     def download_proxy_list(cls):
-        return cls.__read_general_settings()["download_proxy_list"]
+        return cls.__general_settings().download_proxy_list
 
     @classmethod
     def prune_invalid_proxies(cls):
-        return cls.__read_general_settings()["prune_invalid_proxies"]
+        return cls.__general_settings().prune_invalid_proxies
 
     @classmethod
     def tasks_from_yaml(cls):
-        return cls.__read_general_settings()["tasks_from_yaml"]
+        return cls.__general_settings().tasks_from_yaml
 
     @classmethod
     def headless_web_browser(cls):
-        return cls.__read_general_settings()["headless_web_browser"]
+        return cls.__general_settings().headless_web_browser
+
+    @classmethod
+    def scrape_by_script(cls):
+        return cls.__general_settings().scrape_by_script
+
+    @classmethod
+    def crawler_engine(cls):
+        return cls.__general_settings().crawler_engine
+
+    @classmethod
+    def company_details_ttl_in_days(cls):
+        return cls.__general_settings().company_details_ttl_in_days
+
+    @classmethod
+    def results_batch_size(cls):
+        return cls.__general_settings().results_batch_size
+
+    @classmethod
+    def prefetch_result_pages(cls):
+        return cls.__general_settings().prefetch_result_pages
+
+    @classmethod
+    def session_ttl_in_hours(cls):
+        return cls.__general_settings().session_ttl_in_hours
+
+    @classmethod
+    def workers(cls):
+        return cls.__general_settings().workers
+
+    @classmethod
+    def failed_task_retry_in_minutes(cls):
+        return cls.__general_settings().failed_task_retry_in_minutes
+
+    @classmethod
+    def lean_web_browser(cls):
+        lean_settings = cls.__general_settings().lean_web_browser
+        if not lean_settings or not lean_settings["enabled"]:
+            return None
+        return lean_settings
+
+    @classmethod
+    def near_duplicates(cls):
+        near_duplicates_settings = cls.__general_settings().near_duplicates
+        if not near_duplicates_settings or not near_duplicates_settings["enabled"]:
+            return None
+        return near_duplicates_settings
+
+    @classmethod
+    def task_leasing(cls):
+        task_leasing_settings = cls.__general_settings().task_leasing
+        if not task_leasing_settings or not task_leasing_settings["enabled"]:
+            return None
+        return task_leasing_settings
+
+    @classmethod
+    def log_web_page_statistics(cls):
+        return cls.__general_settings().log_web_page_statistics
+
+    @classmethod
+    def daemon(cls):
+        return cls.__general_settings().daemon
 
     @classmethod
     def smtp(cls):
-        return cls.__read_settings_from_yaml(os.path.join(cls.__configuration_directory(), "smtp.yaml"))
+        return cls.__read_settings("smtp.yaml", smtp_settings_types)
 
     @classmethod
     def proxy(cls):
-        return cls.__read_settings_from_yaml(os.path.join(cls.__configuration_directory(), "proxy.yaml"))
+        return cls.__read_settings("proxy.yaml", proxy_settings_types)
+
+    @classmethod
+    def forward_proxy(cls):
+        forward_proxy_settings = cls.proxy().get("forward_proxy")
+        if not forward_proxy_settings or not forward_proxy_settings["enabled"]:
+            return None
+        return forward_proxy_settings
+
+    @classmethod
+    def scheduler(cls):
+        scheduler_settings = cls.__read_settings("scheduler.yaml", scheduler_settings_types)
+        if not scheduler_settings["enabled"]:
+            return None
+        return scheduler_settings
 
     @classmethod
     def database(cls):
-        return cls.__read_settings_from_yaml(os.path.join(cls.__configuration_directory(), "database.yaml"))
+        return cls.__read_settings("database.yaml", database_settings_types)
 
     @classmethod
     def setup_logging(cls):
+        # dictConfig changes the dictionary it gets, so logging settings are never cached.
         my_logging = cls.__read_settings_from_yaml(os.path.join(cls.__configuration_directory(), "logging.yaml"))
         dictConfig(my_logging)
 
+    @classmethod
+    def reload(cls):
+        with cls.__lock:
+            cls.__loaded_files.clear()
+
     @classmethod
     def __configuration_directory(cls):
         return os.path.join(os.path.join(os.path.abspath(os.curdir), "scrapper", "config"))
 
     @classmethod
-    def __read_general_settings(cls):
-        return cls.__read_settings_from_yaml(os.path.join(cls.__configuration_directory(), "general.yaml"))
+    def __general_settings(cls):
+        return cls.__read_settings("general.yaml", general_settings_types, GeneralSettings)
+
+    @classmethod
+    def __read_settings(cls, yaml_file_name, settings_types, settings_type=None):
+        yaml_file_path = os.path.join(cls.__configuration_directory(), yaml_file_name)
+        modification_time = os.stat(yaml_file_path).st_mtime_ns
+        loaded_file = cls.__loaded_files.get(yaml_file_path)
+        if loaded_file and loaded_file[0] == modification_time:
+            return loaded_file[1]
+
+        with cls.__lock:
+            loaded_file = cls.__loaded_files.get(yaml_file_path)
+            if loaded_file and loaded_file[0] == modification_time:
+                return loaded_file[1]
+
+            configuration_dict = cls.__read_settings_from_yaml(yaml_file_path)
+            cls.__validate_settings(yaml_file_name, configuration_dict, settings_types)
+            configuration = frozen(configuration_dict)
+            if settings_type:
+                configuration = settings_type(**{key: configuration[key] for key in settings_type._fields})
+            cls.__loaded_files[yaml_file_path] = (modification_time, configuration)
+            return configuration
+
+    @classmethod
+    def __validate_settings(cls, yaml_file_name, configuration_dict, settings_types):
+        if not isinstance(configuration_dict, dict):
+            raise ValueError(f"Settings in {yaml_file_name} are not a mapping.")
+        for setting_name, setting_type in settings_types.items():
+            if setting_name not in configuration_dict:
+                raise ValueError(f"Setting '{setting_name}' is missing in {yaml_file_name}.")
+            setting_value = configuration_dict[setting_name]
+            if setting_value is None and setting_type is dict:
+                continue
+            if not isinstance(setting_value, setting_type) or \
+               (isinstance(setting_value, bool) and setting_type is not bool):
+                raise ValueError(f"Setting '{setting_name}' in {yaml_file_name} " \
+                                 f"is {type(setting_value).__name__}, not of expected type.")
 
     @classmethod
     def __read_settings_from_yaml(cls, yaml_file_name):
         with open(yaml_file_name, 'r') as yaml_file_content:
-            configuration_dict = yaml.safe_load(yaml_file_content)
-        return configuration_dict
\ No newline at end of file
+            configuration_dict = yaml.load(yaml_file_content, Loader=SafeLoader)
+        return configuration_dict
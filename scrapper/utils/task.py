@@ -2,60 +2,146 @@ import logging
 from datetime import datetime
 from datetime import timedelta
 
-from scrapper.crawler.factory import crawler_by_scrapping_link
 from scrapper.enums.tasks import TaskKeys
-from scrapper.exceptions.exceptions import CaptchaEncountered
+from scrapper.enums.crawlers import CrawlerEngines
+from scrapper.exceptions.exceptions import CaptchaEncountered, IncompleteResults
 
 logger = logging.getLogger(__name__)
 
 class Task():
 
-    def __init__(self, task_dict, database, web_browser, mail, proxies, settings):
+    def __init__(self, task_dict, database, web_browser, crawler_factory, mail, proxies, settings, known_results=None, companies=None, forward_proxy=None):
         self.__task_dict = task_dict
+        self.__forward_proxy = forward_proxy
+        self.__known_results = known_results
+        self.__companies = companies
+        self.__skipped_results_count = 0
+        self.__crawler_factory = crawler_factory
         self.__mail = mail
         self.__proxies = proxies
         self.__settings = settings
         self.__web_browser = web_browser
         self.__database = database
-        self.__results = []
 
-    def run(self):
+    def run(self, results):
         max_tries = 5
         for try_no in range(max_tries):
-            if self.__settings.use_proxy():
-                self.__web_browser.set_proxy(self.__proxies.next_valid_proxy())
+            self.__skipped_results_count = 0
+            if self.__forward_proxy:
+                proxy_address = self.__forward_proxy.upstream_proxy()
+            else:
+                if self.__settings.use_proxy() and not self.__proxies.is_leased(self.__web_browser.proxy_address):
+                    self.__web_browser.set_proxy(self.__proxies.next_valid_proxy())
+                proxy_address = self.__web_browser.proxy_address
 
             try:
-                crawler = crawler_by_scrapping_link(self.__web_browser, self.__task_dict[TaskKeys.scrapping_link.name])
-                self.__results = crawler.run_task(self.__task_dict)
+                for result in self.__run_crawler():
+                    results.append(result)
             except CaptchaEncountered:
+                results.save()
+                if self.__web_browser.scheduler:
+                    self.__web_browser.scheduler.report_captcha(self.scrapping_link())
                 if self.__settings.use_proxy():
                     logger.warning(f"Encountered captcha, try {try_no}. Continuing...")
+                    if self.__forward_proxy:
+                        self.__forward_proxy.switch_upstream(is_captcha=True)
+                    else:
+                        self.__proxies.report_captcha(proxy_address)
                     continue
                 raise
             except Exception:
+                results.save()
                 logger.exception(f"Task by number {self.__task_dict[TaskKeys.task_number.name]} met unresolvable error.")
+                if self.__forward_proxy:
+                    self.__forward_proxy.switch_upstream()
+                elif self.__settings.use_proxy():
+                    self.__proxies.report_failure(proxy_address)
                 if self.__settings.notify_by_mail():
                     self.__mail.send_log()
                 raise
+            if self.__forward_proxy:
+                self.__forward_proxy.report_success()
+            elif self.__settings.use_proxy():
+                self.__proxies.report_success(proxy_address)
             break
 
+    def __run_crawler(self):
+        scrapping_link = self.__task_dict[TaskKeys.scrapping_link.name]
+        crawler_engine = self.crawler_engine()
+        crawler = self.__crawler_factory.crawler_by_scrapping_link(scrapping_link, crawler_engine)
+        if crawler_engine == CrawlerEngines.browser.name:
+            yield from self.__run_task_on_crawler(crawler, self.__task_dict)
+            return
+
+        scraped_results_count = 0
+        try:
+            for result in self.__run_task_on_crawler(crawler, self.__task_dict):
+                scraped_results_count += 1
+                yield result
+            return
+        except (CaptchaEncountered, IncompleteResults) as err:
+            logger.warning(f"'{crawler_engine}' engine failed with {type(err).__name__} " \
+                           f"on result page {crawler.result_page_number}, " \
+                           f"so falling back to '{CrawlerEngines.browser.name}' engine from that page.")
+
+        # Results already scraped over HTTP count towards the task limit, so the fallback only scrapes the rest.
+        task_dict = dict(self.__task_dict)
+        task_dict[TaskKeys.max_results_count.name] -= scraped_results_count
+        # Offers of the failing page handled over HTTP are skipped, so they are not scraped twice.
+        failed_result_page_number = crawler.result_page_number
+        failed_offer_index = crawler.result_offer_index
+        crawler = self.__crawler_factory.crawler_by_scrapping_link(scrapping_link, CrawlerEngines.browser.name)
+        yield from self.__run_task_on_crawler(crawler, task_dict,
+                                              starting_result_page_number=failed_result_page_number,
+                                              starting_offer_index=failed_offer_index)
+
+    def __run_task_on_crawler(self, crawler, task_dict, **run_options):
+        try:
+            yield from crawler.run_task(task_dict, self.__known_results, self.__companies, **run_options)
+        finally:
+            # Offers skipped before a fallback to the browser engine are not scraped again, so they count too.
+            self.__skipped_results_count += crawler.skipped_results_count
+            if crawler.skipped_results_count:
+                logger.info(f"Task by number {self.__task_dict[TaskKeys.task_number.name]} " \
+                            f"skipped {crawler.skipped_results_count} known results.")
+
+    def crawler_engine(self):
+        crawler_engine = self.__task_dict.get(TaskKeys.crawler_engine.name)
+        if not crawler_engine:
+            crawler_engine = self.__settings.crawler_engine()
+        return crawler_engine
+
+    def task_number(self):
+        return self.__task_dict[TaskKeys.task_number.name]
+
     def set_new_due_time(self):
         task_number = self.__task_dict[TaskKeys.task_number.name]
         logger.debug(f"Setting new due time for task by number {task_number}...")
         current_due_time = self.__task_dict[TaskKeys.scrapping_datetime.name]
         scrapping_period_in_hours = self.__task_dict[TaskKeys.scrapping_period_in_hours.name]
-        new_due_time = datetime.now() #+ timedelta(hours = scrapping_period_in_hours)
+        new_due_time = datetime.now() + timedelta(hours=scrapping_period_in_hours)
         self.__database.write_attribute_of_task(task_number, TaskKeys.scrapping_datetime.name, new_due_time)
         logger.debug(f"Set new due time {self.__database.format_date_for_mysql(new_due_time)} " \
                      f"from old {self.__database.format_date_for_mysql(current_due_time)} " \
                      f"on task by number {task_number}.")
 
-    def results(self):
-        return self.__results
+    def postpone(self, retry_in_minutes):
+        task_number = self.__task_dict[TaskKeys.task_number.name]
+        scrapping_period_in_hours = self.__task_dict[TaskKeys.scrapping_period_in_hours.name]
+        retry_delay = min(timedelta(minutes=retry_in_minutes), timedelta(hours=scrapping_period_in_hours))
+        new_due_time = datetime.now() + retry_delay
+        self.__database.write_attribute_of_task(task_number, TaskKeys.scrapping_datetime.name, new_due_time)
+        logger.info(f"Postponed failed task by number {task_number} " \
+                    f"to {self.__database.format_date_for_mysql(new_due_time)}.")
+
+    def skipped_results_count(self):
+        return self.__skipped_results_count
 
     def keywords_list(self):
         return self.__task_dict[TaskKeys.search_keywords.name].split(';')
 
+    def scrapping_link(self):
+        return self.__task_dict[TaskKeys.scrapping_link.name]
+
     def minimal_results_count(self):
         return self.__task_dict[TaskKeys.minimal_results_count.name]
\ No newline at end of file
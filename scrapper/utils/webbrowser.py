@@ -1,24 +1,73 @@
 import logging
 
 from selenium import webdriver
-from selenium.common.exceptions import InvalidSessionIdException, WebDriverException
+from selenium.common.exceptions import InvalidSessionIdException, WebDriverException, TimeoutException
+from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.firefox.options import Options
 
 logger = logging.getLogger(__name__)
 
-class WebBrowser():
-    web_driver = None
+lean_preferences = {
+    "permissions.default.image": 2,
+    "browser.display.use_document_fonts": 0,
+    "gfx.downloadable_fonts.enabled": False,
+    "media.autoplay.default": 5,
+    "media.autoplay.enabled": False,
+    "privacy.trackingprotection.enabled": True,
+    "privacy.trackingprotection.socialtracking.enabled": True,
+    "privacy.trackingprotection.cryptomining.enabled": True,
+    "privacy.trackingprotection.fingerprinting.enabled": True,
+    }
+
+web_page_statistics_script = """
+var navigation = performance.getEntriesByType("navigation")[0];
+var resources = performance.getEntriesByType("resource");
+var transferredBytes = navigation ? navigation.transferSize : 0;
+for (var i = 0; i < resources.length; i++) {
+    transferredBytes += resources[i].transferSize;
+}
+return {
+    transferred_bytes: transferredBytes,
+    resources_count: resources.length,
+    load_time_in_milliseconds: navigation ? navigation.loadEventEnd - navigation.startTime : null
+};
+"""
 
-    def __init__(self, headless=True):
-        self.start_web_driver(headless)
+class WebBrowser():
+    proxy_address = ""
+    forward_proxy = None
+    scheduler = None
+    commands_count = 0
+
+    def __init__(self, headless=True, lean_settings=None, log_web_page_statistics=False):
+        self.headless = headless
+        self.lean_settings = lean_settings
+        self.log_web_page_statistics = log_web_page_statistics
+        self.__web_driver = None
+
+    @property
+    def web_driver(self):
+        # Firefox starts on first use, so workers crawling over HTTP only start it when falling back to the browser.
+        if self.__web_driver is None:
+            self.start_web_driver(self.headless)
+        return self.__web_driver
 
     def set_web_driver(self, web_driver):
-        self.web_driver = web_driver
+        self.__web_driver = web_driver
+
+    def upstream_proxy_address(self):
+        if self.forward_proxy:
+            return self.forward_proxy.upstream_proxy()
+        return self.proxy_address
 
     def reset_proxy(self):
         self.set_proxy("")
 
     def set_proxy(self, proxy_address):
+        if self.__web_driver is None:
+            logger.debug(f"Web driver is not started, so proxy {proxy_address} is set once it starts.")
+            self.proxy_address = proxy_address
+            return
         logger.debug(f"Setting proxy to {proxy_address}...")
         if proxy_address:
             host, port = proxy_address.split(":")
@@ -40,6 +89,7 @@ class WebBrowser():
                                     prefs.setIntPref("network.proxy.ftp_port", "{port}");"""
         self.web_driver.execute_script(proxy_setting_script)
         self.close_tab_by_number(1)
+        self.proxy_address = proxy_address
 
 
     def open_new_tab(self):
@@ -48,6 +98,23 @@ class WebBrowser():
         tabs_count = self.tabs_count()
         self.switch_to_tab_by_number(tabs_count-1)
 
+    def open_background_tab(self, web_page_url):
+        if self.scheduler:
+            self.scheduler.acquire(web_page_url, self.upstream_proxy_address())
+        logger.debug(f"Loading {web_page_url} in background tab...")
+        self.web_driver.execute_script("window.open(arguments[0], '_blank');", web_page_url)
+
+    def close_background_tabs(self):
+        while self.tabs_count() > 1:
+            self.close_tab_by_number(self.tabs_count() - 1)
+
+    def wait_for_web_page_load(self, timeout_in_seconds=30):
+        wait = WebDriverWait(self.web_driver, timeout_in_seconds)
+        try:
+            wait.until(lambda web_driver: web_driver.execute_script("return document.readyState;") == "complete")
+        except TimeoutException:
+            logger.warning(f"Web page {self.web_driver.current_url} didn't load in {timeout_in_seconds} seconds.")
+
     def close_tab_by_number(self, tab_number):
         logger.debug(f"Closing tab {tab_number} in web browser...")
         tabs_count = self.tabs_count()
@@ -69,9 +136,60 @@ class WebBrowser():
             logger.debug("Starting web driver...")
             options = Options()
             options.headless = headless
+            if self.lean_settings:
+                self.__set_lean_preferences(options)
 
-            self.web_driver = webdriver.Firefox(timeout=120, options=options, log_path="/var/tmp/geckodriver.log")
+            self.__web_driver = webdriver.Firefox(timeout=120, options=options, log_path="/var/tmp/geckodriver.log")
+            self.__count_web_driver_commands()
             logger.info("Started web driver...")
+            if self.lean_settings and self.lean_settings.get("allowlist"):
+                self.allow_content(self.lean_settings["allowlist"])
+            if self.proxy_address:
+                self.set_proxy(self.proxy_address)
+
+    def __set_lean_preferences(self, options):
+        logger.debug("Setting lean web browser preferences...")
+        for preference_name, preference_value in lean_preferences.items():
+            options.set_preference(preference_name, preference_value)
+
+        blocked_domains = self.lean_settings.get("blocked_domains")
+        if blocked_domains:
+            # Blocked domains resolve to localhost, so their requests fail without leaving the machine.
+            # Behind a proxy the proxy resolves names instead, so ForwardProxy refuses these domains too.
+            options.set_preference("network.dns.localDomains", ",".join(blocked_domains))
+
+    def allow_content(self, allowlist):
+        logger.debug(f"Allowing content for {len(allowlist)} sites...")
+        self.open_new_tab()
+        self.load_web_page("about:config")
+
+        permission_setting_script = """var permissions = Components.classes["@mozilla.org/permissionmanager;1"]
+                                        .getService(Components.interfaces.nsIPermissionManager);
+                                    var ioService = Components.classes["@mozilla.org/network/io-service;1"]
+                                        .getService(Components.interfaces.nsIIOService);
+                                    var securityManager = Components.classes["@mozilla.org/scriptsecuritymanager;1"]
+                                        .getService(Components.interfaces.nsIScriptSecurityManager);
+                                    var createPrincipal = (securityManager.createContentPrincipal ||
+                                                           securityManager.createCodebasePrincipal).bind(securityManager);
+                                    var allowlist = arguments[0];
+                                    for (var host in allowlist) {
+                                        var principal = createPrincipal(ioService.newURI("https://" + host), {});
+                                        allowlist[host].forEach(function(permissionType) {
+                                            permissions.addFromPrincipal(principal, permissionType, permissions.ALLOW_ACTION);
+                                        });
+                                    }"""
+        self.web_driver.execute_script(permission_setting_script, allowlist)
+        self.close_tab_by_number(1)
+        logger.info(f"Allowed content for {len(allowlist)} sites.")
+
+    def __count_web_driver_commands(self):
+        execute = self.web_driver.execute
+
+        def counted_execute(driver_command, params=None):
+            self.commands_count += 1
+            return execute(driver_command, params)
+
+        self.web_driver.execute = counted_execute
 
     def is_web_driver_alive(self):
         is_driver_dead = True
@@ -88,15 +206,32 @@ class WebBrowser():
 
     def load_web_page(self, web_page_url):
         if self.web_driver.current_url != web_page_url:
+            if self.scheduler:
+                self.scheduler.acquire(web_page_url, self.upstream_proxy_address())
             logger.info(f"Loading {web_page_url}...")
             self.web_driver.get(web_page_url)
-
-    def add_cookies(self, cookies):
+            if self.log_web_page_statistics:
+                self.__log_web_page_statistics(web_page_url)
+
+    def __log_web_page_statistics(self, web_page_url):
+        try:
+            statistics = self.web_driver.execute_script(web_page_statistics_script)
+        except WebDriverException:
+            logger.debug(f"Cannot read statistics of {web_page_url}.")
+            return
+        load_time_in_milliseconds = statistics["load_time_in_milliseconds"]
+        load_time = f"{load_time_in_milliseconds / 1000:.2f} seconds" if load_time_in_milliseconds else "unknown time"
+        logger.info(f"Loaded {web_page_url} with {statistics['resources_count']} resources, " \
+                    f"{statistics['transferred_bytes'] / 1024:.0f} KiB in {load_time}.")
+
+    def add_cookies(self, cookies, reload=True):
         logger.debug(f"Adding {len(cookies)} cookies...")
         for cookie in cookies:
             self.web_driver.add_cookie(cookie)
-        self.web_driver.execute_script("location.reload()")
+        if reload:
+            self.web_driver.execute_script("location.reload()")
         logger.info(f"Added {len(cookies)} cookies...")
 
     def __del__(self):
-        self.web_driver.close()
\ No newline at end of file
+        if self.__web_driver is not None:
+            self.__web_driver.close()
\ No newline at end of file
@@ -1,9 +1,9 @@
 from scrapper.utils.webbrowser import WebBrowser
 
-def get_web_browser_instance(headless=True):
+def get_web_browser_instance(headless=True, lean_settings=None, log_web_page_statistics=False):
     global web_browser_singleton
     try:
         return web_browser_singleton
     except NameError:
-        web_browser_singleton = WebBrowser(headless)
+        web_browser_singleton = WebBrowser(headless, lean_settings, log_web_page_statistics)
         return web_browser_singleton
\ No newline at end of file
@@ -0,0 +1,112 @@
+import logging, queue, threading
+
+from scrapper.crawler.factory import CrawlerFactory
+from scrapper.enums.tasks import TaskKeys
+from scrapper.utils.task import Task
+from scrapper.utils.results import Results
+from scrapper.utils.companies import Companies
+
+logger = logging.getLogger(__name__)
+
+
+class Worker():
+    def __init__(self, worker_number, web_browser, database, mail, proxies, settings, known_results=None, forward_proxy=None, near_duplicates=None, lease_keeper=None):
+        self.worker_number = worker_number
+        self.__lease_keeper = lease_keeper
+        self.__near_duplicates = near_duplicates
+        self.__forward_proxy = forward_proxy
+        self.__known_results = known_results
+        self.__web_browser = web_browser
+        self.__database = database
+        self.__mail = mail
+        self.__proxies = proxies
+        self.__settings = settings
+        self.__crawler_factory = CrawlerFactory(web_browser, settings)
+        self.__companies = Companies(database, settings.company_details_ttl_in_days())
+
+    def run_tasks(self, task_queue, errors):
+        try:
+            while True:
+                try:
+                    task_dict = task_queue.get_nowait()
+                except queue.Empty:
+                    break
+
+                try:
+                    self.run_task(task_dict)
+                except Exception as err:
+                    logger.exception(f"Worker {self.worker_number} failed task by number {task_dict[TaskKeys.task_number.name]}, " \
+                                     f"so continuing with next task.")
+                    errors.append(err)
+                finally:
+                    task_queue.task_done()
+        finally:
+            # WorkerPool starts new threads for every batch, so the connection of this one is closed with it.
+            self.__database.close_thread_connection()
+
+    def run_task(self, task_dict):
+        my_task_object = Task(task_dict=task_dict,
+                              database=self.__database,
+                              web_browser=self.__web_browser,
+                              crawler_factory=self.__crawler_factory,
+                              mail=self.__mail,
+                              proxies=self.__proxies,
+                              settings=self.__settings,
+                              known_results=self.__known_results,
+                              companies=self.__companies,
+                              forward_proxy=self.__forward_proxy)
+
+        my_results_object = Results(database=self.__database,
+                              mail=self.__mail,
+                              settings=self.__settings,
+                              companies=self.__companies,
+                              known_results=self.__known_results,
+                              batch_size=self.__settings.results_batch_size(),
+                              task_number=my_task_object.task_number(),
+                              near_duplicates=self.__near_duplicates)
+
+        my_results_object.exclude_by_keywords(my_task_object.keywords_list())
+        try:
+            my_task_object.run(my_results_object)
+        except Exception:
+            # Failed tasks are retried after a delay, so the next run does not fail and mail about them right away.
+            my_task_object.postpone(self.__settings.failed_task_retry_in_minutes())
+            if self.__lease_keeper:
+                self.__lease_keeper.release(my_task_object.task_number())
+            raise
+        my_results_object.save()
+        my_results_object.check_count(my_task_object.minimal_results_count(), my_task_object.scrapping_link(),
+                                      my_task_object.skipped_results_count())
+        my_task_object.set_new_due_time()
+        if self.__lease_keeper:
+            self.__lease_keeper.release(my_task_object.task_number())
+
+
+class WorkerPool():
+    def __init__(self, workers):
+        self.__workers = workers
+
+    def run_tasks(self, task_list):
+        task_queue = queue.Queue()
+        for task_dict in task_list:
+            task_queue.put(task_dict)
+
+        workers_count = min(len(self.__workers), len(task_list))
+        logger.debug(f"Running {len(task_list)} tasks on {workers_count} workers...")
+
+        errors = []
+        threads = []
+        for worker in self.__workers[:workers_count]:
+            thread = threading.Thread(target=worker.run_tasks,
+                                      args=(task_queue, errors),
+                                      name=f"worker-{worker.worker_number}")
+            thread.start()
+            threads.append(thread)
+
+        for thread in threads:
+            thread.join()
+
+        if errors:
+            logger.error(f"{len(errors)} of {len(task_list)} tasks failed on {workers_count} workers.")
+            raise errors[0]
+        logger.info(f"Ran {len(task_list)} tasks on {workers_count} workers.")
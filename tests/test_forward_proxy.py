@@ -0,0 +1,159 @@
+import socket, socketserver, threading, unittest
+
+from scrapper.utils.forward_proxy import ForwardProxy
+
+
+class DummyUpstreamHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        request_head = b""
+        while b"\r\n\r\n" not in request_head:
+            chunk = self.request.recv(4096)
+            if not chunk:
+                return
+            request_head += chunk
+        request_line = request_head.split(b"\r\n", 1)[0].decode("latin-1")
+        self.server.request_lines.append(request_line)
+        if " bad.example:" in request_line:
+            self.request.sendall(b"HTTP/1.1 502 Bad Gateway\r\n\r\n")
+            return
+        self.request.sendall(b"HTTP/1.1 200 Connection established\r\n\r\n")
+        while True:
+            data = self.request.recv(4096)
+            if not data:
+                return
+            self.request.sendall(data)
+
+
+class SilentUpstreamHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        while self.request.recv(4096):
+            pass
+
+
+class DummyUpstream(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, handler=DummyUpstreamHandler):
+        super().__init__(("127.0.0.1", 0), handler)
+        self.request_lines = []
+
+    @property
+    def address(self):
+        host, port = self.server_address
+        return f"{host}:{port}"
+
+
+class DummyProxies():
+    def __init__(self, proxies_list):
+        self.proxies_list = list(proxies_list)
+        self.released_proxies = []
+        self.failed_proxies = []
+        self.picks_count = 0
+        self.forward_proxy = None
+        self.was_lock_free = None
+
+    def next_valid_proxy(self):
+        self.picks_count += 1
+        if self.forward_proxy:
+            # report_success takes the forward proxy lock, so it only returns while the lock is free.
+            reporter = threading.Thread(target=self.forward_proxy.report_success, daemon=True)
+            reporter.start()
+            reporter.join(timeout=1)
+            self.was_lock_free = not reporter.is_alive()
+        return self.proxies_list.pop(0) if self.proxies_list else ""
+
+    def report_success(self, proxy, latency_in_seconds=None):
+        pass
+
+    def report_failure(self, proxy):
+        self.failed_proxies.append(proxy)
+
+    def report_captcha(self, proxy):
+        pass
+
+    def release(self, proxy):
+        self.released_proxies.append(proxy)
+
+
+class ForwardProxyTest(unittest.TestCase):
+    def setUp(self):
+        self.upstream = DummyUpstream()
+        threading.Thread(target=self.upstream.serve_forever, daemon=True).start()
+
+    def tearDown(self):
+        self.upstream.shutdown()
+        self.upstream.server_close()
+
+    def start_forward_proxy(self, proxies):
+        forward_proxy = ForwardProxy(proxies, pooled_connections_count=0, connect_timeout_in_seconds=1)
+        forward_proxy.start()
+        self.addCleanup(forward_proxy.stop)
+        return forward_proxy
+
+    def start_upstream(self, handler):
+        upstream = DummyUpstream(handler)
+        threading.Thread(target=upstream.serve_forever, daemon=True).start()
+        self.addCleanup(upstream.server_close)
+        self.addCleanup(upstream.shutdown)
+        return upstream
+
+    def open_tunnel(self, forward_proxy, target):
+        host, port = forward_proxy.address.split(":")
+        client_socket = socket.create_connection((host, int(port)), timeout=5)
+        self.addCleanup(client_socket.close)
+        client_socket.sendall(f"CONNECT {target} HTTP/1.1\r\nHost: {target}\r\n\r\n".encode("latin-1"))
+        return client_socket, client_socket.recv(4096)
+
+    def test_tunnels_through_upstream_proxy(self):
+        forward_proxy = self.start_forward_proxy(DummyProxies([self.upstream.address]))
+        client_socket, response = self.open_tunnel(forward_proxy, "example.com:443")
+        self.assertEqual(response, b"HTTP/1.1 200 Connection established\r\n\r\n")
+        client_socket.sendall(b"ping")
+        self.assertEqual(client_socket.recv(4096), b"ping")
+        self.assertEqual(self.upstream.request_lines, ["CONNECT example.com:443 HTTP/1.1"])
+
+    def test_keeps_upstream_proxy_after_target_error(self):
+        proxies = DummyProxies([self.upstream.address, "127.0.0.1:9"])
+        forward_proxy = self.start_forward_proxy(proxies)
+        good_socket, response = self.open_tunnel(forward_proxy, "example.com:443")
+        self.assertEqual(response, b"HTTP/1.1 200 Connection established\r\n\r\n")
+
+        bad_socket, response = self.open_tunnel(forward_proxy, "bad.example:443")
+        self.assertTrue(response.startswith(b"HTTP/1.1 502 Bad Gateway\r\n"))
+        good_socket.sendall(b"ping")
+        self.assertEqual(good_socket.recv(4096), b"ping")
+        self.assertEqual(proxies.failed_proxies, [])
+        self.assertEqual(proxies.picks_count, 1)
+        self.assertEqual(forward_proxy.upstream_proxy(), self.upstream.address)
+
+    def test_switches_from_silent_upstream_proxy(self):
+        silent_upstream = self.start_upstream(SilentUpstreamHandler)
+        silent_address = "{}:{}".format(*silent_upstream.server_address)
+        proxies = DummyProxies([silent_address, self.upstream.address])
+        forward_proxy = self.start_forward_proxy(proxies)
+        client_socket, response = self.open_tunnel(forward_proxy, "example.com:443")
+        self.assertEqual(response, b"HTTP/1.1 200 Connection established\r\n\r\n")
+        self.assertEqual(proxies.failed_proxies, [silent_address])
+        client_socket.sendall(b"ping")
+        self.assertEqual(client_socket.recv(4096), b"ping")
+
+    def test_picks_upstream_proxy_outside_lock(self):
+        proxies = DummyProxies([self.upstream.address])
+        forward_proxy = self.start_forward_proxy(proxies)
+        proxies.forward_proxy = forward_proxy
+        self.assertEqual(forward_proxy.upstream_proxy(), self.upstream.address)
+        self.assertTrue(proxies.was_lock_free)
+
+    def test_retries_picking_after_empty_proxy(self):
+        proxies = DummyProxies([])
+        forward_proxy = self.start_forward_proxy(proxies)
+        self.assertIsNone(forward_proxy.upstream_proxy())
+        proxies.proxies_list.append(self.upstream.address)
+        self.assertEqual(forward_proxy.upstream_proxy(), self.upstream.address)
+        self.assertEqual(forward_proxy.upstream_proxy(), self.upstream.address)
+        self.assertEqual(proxies.picks_count, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+import multiprocessing, os, tempfile, time, unittest
+from datetime import datetime, timedelta
+
+from scrapper.enums.tasks import TaskKeys
+from scrapper.storage.sqlite import SqliteDatabase
+from scrapper.utils.leases import LeaseKeeper
+
+
+def open_database(database_path):
+    return SqliteDatabase({"database_name": "scrapper", "sqlite_path": database_path})
+
+
+def run_node(database_path, lease_owner, claimed_task_numbers):
+    # Every node claims small batches until no due task is left, and reschedules what it ran like a worker does.
+    database = open_database(database_path)
+    lease_keeper = LeaseKeeper(database, lease_in_seconds=60, lease_owner=lease_owner)
+    while True:
+        tasks_list = lease_keeper.claim(2)
+        if not tasks_list:
+            return
+        for task_dict in tasks_list:
+            task_number = task_dict[TaskKeys.task_number.name]
+            claimed_task_numbers.put(task_number)
+            database.write_attribute_of_task(task_number, TaskKeys.scrapping_datetime.name,
+                                             datetime.now() + timedelta(hours=1))
+            lease_keeper.release(task_number)
+
+
+def crash_after_claim(database_path, lease_owner, lease_in_seconds):
+    # The node dies without releasing its leases, so they are only freed by expiring.
+    LeaseKeeper(open_database(database_path), lease_in_seconds=lease_in_seconds, lease_owner=lease_owner).claim(100)
+
+
+class LeaseKeeperTest(unittest.TestCase):
+    tasks_count = 40
+
+    def setUp(self):
+        database_directory = tempfile.TemporaryDirectory()
+        self.addCleanup(database_directory.cleanup)
+        self.database_path = os.path.join(database_directory.name, "scrapper.sqlite3")
+        database = open_database(self.database_path)
+        database.append_tasks([{
+            TaskKeys.site_name.name: "glassdoor",
+            TaskKeys.search_keywords.name: f"keywords {task_number}",
+            TaskKeys.scrapping_link.name: f"https://www.glassdoor.com/Job/jobs.htm?task={task_number}",
+            TaskKeys.scrapping_period_in_hours.name: 24,
+            TaskKeys.scrapping_datetime.name: datetime.now() - timedelta(minutes=1),
+            } for task_number in range(self.tasks_count)])
+        database.close_thread_connection()
+        self.context = multiprocessing.get_context("spawn")
+
+    def run_processes(self, target, args_list):
+        processes = [self.context.Process(target=target, args=args) for args in args_list]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join(60)
+            self.assertEqual(process.exitcode, 0)
+
+    def test_claims_every_task_once_across_processes(self):
+        claimed_task_numbers = self.context.Queue()
+        self.run_processes(run_node, [(self.database_path, f"node-{node_number}", claimed_task_numbers)
+                                      for node_number in range(4)])
+
+        task_numbers = [claimed_task_numbers.get(timeout=5) for task_number in range(self.tasks_count)]
+        self.assertEqual(sorted(task_numbers), sorted(set(task_numbers)))
+        self.assertEqual(len(task_numbers), self.tasks_count)
+        self.assertTrue(claimed_task_numbers.empty())
+
+    def test_reclaims_expired_leases(self):
+        self.run_processes(crash_after_claim, [(self.database_path, "crashed-node", 1)])
+        lease_keeper = LeaseKeeper(open_database(self.database_path), lease_owner="live-node")
+        self.assertEqual(lease_keeper.claim(100), [])
+
+        time.sleep(1.1)
+        tasks_list = lease_keeper.claim(100)
+        self.assertEqual(len(tasks_list), self.tasks_count)
+        self.assertTrue(all(task_dict[TaskKeys.lease_owner.name] == "live-node" for task_dict in tasks_list))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+import threading, time, unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+from scrapper.utils.proxy_validator import ProxyValidator
+
+
+class DummyProxyHandler(BaseHTTPRequestHandler):
+    # Requests through a proxy send the absolute URL, so the path tells which answer is expected.
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path == "/slow":
+            time.sleep(2)
+        status_code = 503 if path == "/bad-status" else 200
+        body = b"<html>Proxy login</html>" if path == "/bad-body" else b'{"ip": "127.0.0.1"}'
+        self.send_response(status_code)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ProxyValidatorTest(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), DummyProxyHandler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        host, port = self.server.server_address
+        self.proxy = f"{host}:{port}"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def validator(self, path):
+        return ProxyValidator(validation_url=f"http://validation.test{path}", workers_count=4,
+                              connect_timeout_in_seconds=1, read_timeout_in_seconds=0.5, validation_text='"ip"')
+
+    def test_accepts_good_proxy(self):
+        proxy_check = self.validator("/good").validate_proxy(self.proxy)
+        self.assertTrue(proxy_check.is_valid)
+        self.assertIsNotNone(proxy_check.latency_in_seconds)
+
+    def test_rejects_slow_proxy(self):
+        started_at = time.monotonic()
+        proxy_check = self.validator("/slow").validate_proxy(self.proxy)
+        self.assertFalse(proxy_check.is_valid)
+        self.assertEqual(proxy_check.error, "ReadTimeout")
+        self.assertLess(time.monotonic() - started_at, 2)
+
+    def test_rejects_bad_status(self):
+        proxy_check = self.validator("/bad-status").validate_proxy(self.proxy)
+        self.assertFalse(proxy_check.is_valid)
+        self.assertEqual(proxy_check.error, "HTTP 503")
+
+    def test_rejects_unexpected_body(self):
+        proxy_check = self.validator("/bad-body").validate_proxy(self.proxy)
+        self.assertFalse(proxy_check.is_valid)
+        self.assertEqual(proxy_check.error, "Unexpected body")
+
+    def test_streams_checks_of_unique_proxies(self):
+        proxy_checks = list(self.validator("/good").validate([self.proxy, "", self.proxy]))
+        self.assertEqual(sorted(proxy_check.is_valid for proxy_check in proxy_checks), [False, True])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,43 @@
+import os, tempfile, unittest
+
+from scrapper.storage.sqlite import SqliteDatabase
+from scrapper.utils.workers import Worker, WorkerPool
+
+
+class DummySettings():
+    def company_details_ttl_in_days(self):
+        return 30
+
+
+class QueryingWorker(Worker):
+    def __init__(self, worker_number, database):
+        super().__init__(worker_number, None, database, None, None, DummySettings())
+        self.database = database
+
+    def run_task(self, task_dict):
+        self.database.records_count(self.database.my_task_table_name)
+
+
+@unittest.skipUnless(os.path.isdir("/proc/self/fd"), "Open files are counted in /proc/self/fd.")
+class WorkerPoolTest(unittest.TestCase):
+    def setUp(self):
+        database_directory = tempfile.TemporaryDirectory()
+        self.addCleanup(database_directory.cleanup)
+        self.database = SqliteDatabase({"database_name": "scrapper",
+                                        "sqlite_path": os.path.join(database_directory.name, "scrapper.sqlite3")})
+
+    def test_closes_worker_connections_after_every_batch(self):
+        workers = [QueryingWorker(worker_number, self.database) for worker_number in range(4)]
+        task_list = [{"task_number": task_number} for task_number in range(8)]
+        WorkerPool(workers).run_tasks(task_list)
+        open_files_count = len(os.listdir("/proc/self/fd"))
+
+        for batch_number in range(50):
+            WorkerPool(workers).run_tasks(task_list)
+        # SQLite defers closing the file of a connection while another one holds a lock on it,
+        # so up to one descriptor per worker may still be open, while leaked connections add two per worker and batch.
+        self.assertLessEqual(len(os.listdir("/proc/self/fd")), open_files_count + len(workers))
+
+
+if __name__ == "__main__":
+    unittest.main()